@@ -5,6 +5,10 @@ Root module.
 # disable unused imports ruff check
 # ruff: noqa: F401
 
+# Execution backends
+# noinspection PyProtectedMember
+from officialeye._api.backend import Backend
+
 # Config
 # noinspection PyProtectedMember
 from officialeye._api.config import Config, InterpretationConfig, MatcherConfig, MutatorConfig, SupervisorConfig
@@ -15,7 +19,7 @@ from officialeye._api.context import Context
 
 # Misc
 # noinspection PyProtectedMember
-from officialeye._api.future import Future, wait
+from officialeye._api.future import Future, wait, wait_async
 
 # Image-processing
 # noinspection PyProtectedMember
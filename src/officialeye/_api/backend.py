@@ -0,0 +1,342 @@
+"""
+Module implementing the execution backends a context can run its tasks on.
+"""
+
+from __future__ import annotations
+
+import enum
+import functools
+import os
+from collections import deque
+from concurrent.futures import CancelledError, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import Future as PythonFuture
+from concurrent.futures.process import BrokenProcessPool
+from threading import Condition, Lock
+from typing import Callable, Deque, Dict, Hashable, Iterable, List, Set, Tuple
+
+
+class Backend(enum.Enum):
+    """
+    Execution backend of a context.
+    """
+
+    INLINE = "inline"
+    """ Every task runs synchronously in the calling thread as soon as it is submitted. Suitable for tiny jobs and for debugging. """
+
+    THREAD = "thread"
+    """ The tasks run in a pool of threads of the current process, which avoids the cost of passing the data between processes. """
+
+    PROCESS = "process"
+    """
+    The tasks run in a pool of worker processes, which provides the most parallelism for CPU-heavy jobs.
+    Tasks concerning the same template are preferably run by the same workers, so that every worker only caches some of the templates.
+    """
+
+
+class _InlineExecutor(Executor):
+    """
+    Executor running every task synchronously in the calling thread, as soon as it is submitted.
+    """
+
+    def __init__(self, /, *, initializer: Callable[[], None] | None = None):
+        self._shutdown = False
+        self._shutdown_lock = Lock()
+
+        if initializer is not None:
+            initializer()
+
+    def submit(self, fn, /, *args, **kwargs) -> PythonFuture:
+
+        with self._shutdown_lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+
+        future = PythonFuture()
+
+        if not future.set_running_or_notify_cancel():
+            return future
+
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as err:
+            future.set_exception(err)
+        else:
+            future.set_result(result)
+
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._shutdown_lock:
+            self._shutdown = True
+
+
+class _WorkItem:
+
+    def __init__(self, future: PythonFuture, affinity_key: Hashable | None, fn, args: tuple, kwargs: Dict[str, any], /):
+        self.future = future
+        self.affinity_key = affinity_key
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+
+class AffinityExecutor(Executor):
+    """
+    Pool of worker processes that keeps a separate queue of tasks for every worker process.
+
+    Every worker process caches the templates it has loaded, so running the tasks concerning a template on an arbitrary worker
+    makes every worker eventually load and analyze every template. Instead, tasks are submitted together with an affinity key,
+    such as the path of the template they concern, and are queued for a worker that has already run tasks with the same key.
+    Whenever a worker becomes idle while its own queue is empty, it steals a task from the longest queue of another worker.
+    """
+
+    def __init__(self, max_workers: int, /, *, initializer: Callable[[], None] | None = None, warm_keys: Iterable[Hashable] = ()):
+        """
+        Arguments:
+            max_workers: The number of worker processes.
+            initializer: Function that should be run by every worker before it runs any task. It must be picklable.
+            warm_keys: Affinity keys that every worker is known to have cached since it has been initialized.
+        """
+
+        assert max_workers >= 1
+
+        self._initializer = initializer
+        self._initial_warm_keys = frozenset(warm_keys)
+
+        # every worker is a pool with a single process, so that tasks can be directed to a specific worker
+        self._workers: List[ProcessPoolExecutor] = [self._create_worker() for _ in range(max_workers)]
+
+        self._queues: List[Deque[_WorkItem]] = [deque() for _ in range(max_workers)]
+        self._busy: List[bool] = [False for _ in range(max_workers)]
+        self._warm_keys: List[Set[Hashable]] = [set(self._initial_warm_keys) for _ in range(max_workers)]
+
+        self._condition = Condition()
+        self._shutdown = False
+        self._workers_shut_down = False
+
+    def _create_worker(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=1, initializer=self._initializer)
+
+    def _replace_worker(self, worker_index: int, broken_worker: ProcessPoolExecutor, /) -> None:
+        """
+        Replaces a worker whose process has died, e.g., because it has been killed or has run out of memory, by a fresh one.
+        Must be called while holding the lock.
+        """
+
+        if self._workers[worker_index] is not broken_worker:
+            # the worker has already been replaced
+            return
+
+        broken_worker.shutdown(wait=False)
+
+        self._workers[worker_index] = self._create_worker()
+
+        # the fresh worker has lost all the data cached by the broken one
+        self._warm_keys[worker_index] = set(self._initial_warm_keys)
+
+    def submit(self, fn, /, *args, **kwargs) -> PythonFuture:
+        return self.submit_with_affinity(None, fn, *args, **kwargs)
+
+    def submit_with_affinity(self, affinity_key: Hashable | None, fn, /, *args, **kwargs) -> PythonFuture:
+        """
+        Submits a task, preferably to a worker that has already run tasks with the same affinity key.
+
+        Arguments:
+            affinity_key: Key identifying the data that the task benefits from having cached, or None if there is no such data.
+            fn: The task.
+            args: Positional arguments of the task.
+            kwargs: Keyword arguments of the task.
+        """
+
+        future = PythonFuture()
+
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+
+            worker_index = self._choose_worker(affinity_key)
+            self._queues[worker_index].append(_WorkItem(future, affinity_key, fn, args, kwargs))
+
+            started = self._dispatch()
+
+        self._watch(started)
+
+        return future
+
+    def _get_load(self, worker_index: int, /) -> int:
+        return len(self._queues[worker_index]) + int(self._busy[worker_index])
+
+    def _choose_worker(self, affinity_key: Hashable | None, /) -> int:
+
+        candidates = range(len(self._workers))
+
+        if affinity_key is not None:
+            warm_candidates = [worker_index for worker_index in candidates if affinity_key in self._warm_keys[worker_index]]
+
+            if len(warm_candidates) > 0:
+                candidates = warm_candidates
+
+        # among equally loaded workers, prefer the one that has cached the least data, to spread the keys evenly
+        return min(candidates, key=lambda worker_index: (self._get_load(worker_index), len(self._warm_keys[worker_index])))
+
+    def _take_work(self, worker_index: int, /, *, steal: bool) -> _WorkItem | None:
+
+        if not steal:
+            queue = self._queues[worker_index]
+            return queue.popleft() if len(queue) > 0 else None
+
+        victim_index = max(range(len(self._queues)), key=lambda queue_index: len(self._queues[queue_index]))
+        victim_queue = self._queues[victim_index]
+
+        if len(victim_queue) == 0:
+            return None
+
+        # the victim is going to run the tasks at the front of its queue soon, so take the one that it would run last
+        return victim_queue.pop()
+
+    def _submit_to_worker(self, worker_index: int, item: _WorkItem, /) -> PythonFuture:
+
+        try:
+            return self._workers[worker_index].submit(item.fn, *item.args, **item.kwargs)
+        except BrokenProcessPool:
+            # the process of the worker has died while the worker has been idle, so run the task on a fresh worker instead
+            self._replace_worker(worker_index, self._workers[worker_index])
+            return self._workers[worker_index].submit(item.fn, *item.args, **item.kwargs)
+
+    def _dispatch(self) -> List[Tuple[int, ProcessPoolExecutor, _WorkItem, PythonFuture]]:
+        """
+        Starts work on all idle workers. Must be called while holding the lock.
+
+        Returns:
+            The started work items, which have to be passed to `_watch` once the lock is released.
+        """
+
+        started = []
+
+        # let every idle worker work on its own queue first, and only then steal the remaining work
+        for steal in (False, True):
+            for worker_index in range(len(self._workers)):
+                while not self._busy[worker_index]:
+                    item = self._take_work(worker_index, steal=steal)
+
+                    if item is None:
+                        break
+
+                    if not item.future.set_running_or_notify_cancel():
+                        # the future has been cancelled while waiting in the queue
+                        continue
+
+                    try:
+                        inner_future = self._submit_to_worker(worker_index, item)
+                    except Exception as err:
+                        # the worker is broken or has been shut down, so fail the task and move on to the next one
+                        item.future.set_exception(err)
+                        continue
+
+                    self._busy[worker_index] = True
+
+                    if item.affinity_key is not None:
+                        self._warm_keys[worker_index].add(item.affinity_key)
+
+                    started.append((worker_index, self._workers[worker_index], item, inner_future))
+
+        return started
+
+    def _watch(self, started: List[Tuple[int, ProcessPoolExecutor, _WorkItem, PythonFuture]], /) -> None:
+        for worker_index, worker, item, inner_future in started:
+            inner_future.add_done_callback(functools.partial(self._on_done, worker_index, worker, item))
+
+    def _on_done(self, worker_index: int, worker: ProcessPoolExecutor, item: _WorkItem, inner_future: PythonFuture, /) -> None:
+
+        if inner_future.cancelled():
+            item.future.set_exception(CancelledError())
+        elif inner_future.exception() is not None:
+            item.future.set_exception(inner_future.exception())
+        else:
+            item.future.set_result(inner_future.result())
+
+        with self._condition:
+            self._busy[worker_index] = False
+
+            if not inner_future.cancelled() and isinstance(inner_future.exception(), BrokenProcessPool) and not self._workers_shut_down:
+                # the process of the worker has died while running the task, so that worker can no longer run any other tasks
+                self._replace_worker(worker_index, worker)
+
+            started = self._dispatch()
+            self._condition.notify_all()
+
+            shut_down_workers = self._shutdown and not self._workers_shut_down and self._is_drained()
+
+            if shut_down_workers:
+                self._workers_shut_down = True
+
+        self._watch(started)
+
+        if shut_down_workers:
+            # the executor has been shut down without waiting, and this was the last task it has been waiting for
+            for worker in self._workers:
+                worker.shutdown(wait=False)
+
+    def _is_drained(self) -> bool:
+        return not any(self._busy) and all(len(queue) == 0 for queue in self._queues)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+
+        with self._condition:
+            self._shutdown = True
+
+            if cancel_futures:
+                for queue in self._queues:
+                    for item in queue:
+                        item.future.cancel()
+                    queue.clear()
+
+            if wait:
+                self._condition.wait_for(self._is_drained)
+
+            shut_down_workers = not self._workers_shut_down and self._is_drained()
+
+            if shut_down_workers:
+                self._workers_shut_down = True
+
+        if shut_down_workers:
+            for worker in self._workers:
+                worker.shutdown(wait=wait)
+
+
+def get_worker_count(backend: Backend, max_workers: int | None, /) -> int:
+    """
+    Determines the number of tasks the executor created for the given backend can run at the same time.
+    """
+
+    if backend == Backend.INLINE:
+        return 1
+
+    if max_workers is not None:
+        return max_workers
+
+    return os.cpu_count() or 1
+
+
+def create_executor(backend: Backend, max_workers: int | None, /, *, initializer: Callable[[], None] | None = None,
+                    warm_keys: Iterable[Hashable] = ()) -> Executor:
+    """
+    Creates an executor for the given backend.
+
+    Arguments:
+        backend: The backend to create the executor for.
+        max_workers: The maximal number of workers, or None to use the default number.
+        initializer: Function that should be run by every worker before it runs any task. It must be picklable.
+        warm_keys: Affinity keys that every worker is known to have cached once it has been initialized.
+    """
+
+    if backend == Backend.INLINE:
+        return _InlineExecutor(initializer=initializer)
+
+    if backend == Backend.THREAD:
+        return ThreadPoolExecutor(max_workers=get_worker_count(backend, max_workers), thread_name_prefix="officialeye_worker",
+                                  initializer=initializer)
+
+    assert backend == Backend.PROCESS
+
+    return AffinityExecutor(get_worker_count(backend, max_workers), initializer=initializer, warm_keys=warm_keys)
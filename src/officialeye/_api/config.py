@@ -41,6 +41,10 @@ class Config(ABC):
 
         return _value
 
+    def get_dict(self) -> ConfigDict:
+        """ Returns a copy of the configuration dictionary. """
+        return dict(self._config_dict)
+
 
 class MutatorConfig(Config):
 
@@ -4,42 +4,143 @@ Module represeting the OfficialEye context.
 
 from __future__ import annotations
 
+import functools
+import os
+import uuid
+from concurrent.futures import Executor
 from concurrent.futures import Future as PythonFuture
-from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from threading import Lock
 from types import TracebackType
-from typing import TYPE_CHECKING, Dict
+from typing import TYPE_CHECKING, Dict, Hashable, Iterable, Set, Tuple
 
+from officialeye._api.backend import AffinityExecutor, Backend, create_executor, get_worker_count
 from officialeye._api.future import Future
 from officialeye._api.mutator import IMutator
 
 # noinspection PyProtectedMember
 from officialeye._api_builtins.init import initialize_builtins
 
+# noinspection PyProtectedMember
+from officialeye._internal.context.singleton import get_internal_context
+
 # noinspection PyProtectedMember
 from officialeye._internal.feedback.abstract import AbstractFeedbackInterface
 
 # noinspection PyProtectedMember
 from officialeye._internal.feedback.dummy import DummyFeedbackInterface
-from officialeye.error.errors.general import ErrInvalidIdentifier
+
+# noinspection PyProtectedMember
+from officialeye._internal.image_transport import SharedImage
+from officialeye.error.errors.general import ErrInvalidArgument, ErrInvalidIdentifier
 from officialeye.error.errors.internal import ErrInvalidState
 from officialeye.error.errors.template import ErrTemplateInvalidMutator
 
 if TYPE_CHECKING:
+    import numpy as np
+
+    # noinspection PyProtectedMember
+    from officialeye._internal.image_transport import ImageSource
     from officialeye.types import ConfigDict, InterpretationFactory, MatcherFactory, MutatorFactory, SupervisorFactory
 
 
 class Context:
 
-    def __init__(self, /, *, afi: AbstractFeedbackInterface | None = None):
+    def __init__(self, /, *, afi: AbstractFeedbackInterface | None = None, descriptor_cache_path: str | None = None,
+                 backend: Backend | str = Backend.PROCESS, max_workers: int | None = None, preload_templates: Iterable[str] | None = None,
+                 share_images: bool = False, interpretation_threads: int = 1, interpretation_cache_size: int = 0,
+                 interpretation_cache_path: str | None = None):
+        """
+        Arguments:
+            afi: The feedback interface that should be used to report progress and messages. By default, all feedback is discarded.
+            descriptor_cache_path: Path to a directory in which the descriptors of template keypoints should be persisted,
+                so that they are not recomputed by every worker and every run of the program. By default, no persistent cache is used.
+            backend: The backend the tasks should be executed on, or the name of such a backend. By default, a pool of processes is used.
+            max_workers: The maximal number of tasks that the backend runs at the same time. Ignored by the inline backend.
+                By default, the number of processors.
+            preload_templates: Paths to templates that every worker should load, together with the descriptors of their keypoints,
+                before running any task. This reduces the latency of the first tasks using these templates.
+            share_images: Whether target images should be decoded only once, in the main process, with the decoded pixels being shared
+                by all tasks concerning the image, instead of every task decoding the image file again. With the process backend,
+                the pixels are placed in shared memory, so enough of it has to be available. Disabled by default.
+            interpretation_threads: The maximal number of features of a document that a task interprets at the same time.
+                Worthwhile if the interpretation methods mostly wait for external programs, as OCR does.
+                By default, the features are interpreted one after another.
+            interpretation_cache_size: The maximal number of interpretations that every worker keeps in memory, so that features
+                whose warped and mutated images are identical to previously interpreted ones are not interpreted again.
+                Only interpretation methods that declare their results cacheable are cached. By default, no interpretations are kept.
+            interpretation_cache_path: Path to an SQLite database in which interpretations should be persisted,
+                so that they are shared by all workers and by every run of the program. By default, no persistent cache is used.
+
+        Raises:
+            ErrInvalidArgument: In case the backend, the maximal number of workers, the number of interpretation threads
+                or the size of the interpretation cache is invalid.
+        """
+
+        try:
+            self._backend = Backend(backend)
+        except ValueError as err:
+            raise ErrInvalidArgument(
+                "while creating the api context.",
+                f"Unknown backend '{backend}', expected one of: {', '.join(b.value for b in Backend)}."
+            ) from err
+
+        if max_workers is not None and max_workers < 1:
+            raise ErrInvalidArgument(
+                "while creating the api context.",
+                f"The maximal number of workers must be positive, got {max_workers}."
+            )
+
+        self._max_workers = max_workers
+
+        if interpretation_threads < 1:
+            raise ErrInvalidArgument(
+                "while creating the api context.",
+                f"The number of interpretation threads must be positive, got {interpretation_threads}."
+            )
+
+        self._interpretation_threads = interpretation_threads
+
+        if interpretation_cache_size < 0:
+            raise ErrInvalidArgument(
+                "while creating the api context.",
+                f"The size of the interpretation cache cannot be negative, got {interpretation_cache_size}."
+            )
+
+        self._interpretation_cache_size = interpretation_cache_size
+        self._interpretation_cache_path = interpretation_cache_path
+
         self._entered: bool = False
         self._disposed: bool = False
 
+        # identifies the templates loaded on behalf of this context, so that they are not shared with other contexts running their tasks
+        # in the same process, which may have different registries
+        self._context_key = uuid.uuid4().hex
+
         if afi is None:
             self._afi = DummyFeedbackInterface()
         else:
             self._afi = afi
 
-        self._executor = ProcessPoolExecutor()
+        self._descriptor_cache_path = descriptor_cache_path
+        self._preload_templates = [] if preload_templates is None else list(preload_templates)
+
+        self._share_images = share_images
+
+        # shared memory segments holding decoded images, which have to be released at the latest when the context is disposed
+        self._shared_images: Set[SharedImage] = set()
+        self._shared_images_lock = Lock()
+
+        # tasks may be submitted and joined from multiple threads, but feedback interfaces are not required to be thread-safe
+        self._afi_lock = Lock()
+
+        # the executor is only created once the first task is submitted, so that contexts that never run any tasks stay cheap
+        self._executor: Executor | None = None
+        self._executor_lock = Lock()
+
+        # incremented whenever a factory is registered, so that registries installed in worker processes can be detected to be outdated
+        self._registry_version = 0
+        self._executor_registry_version = 0
 
         self._mutator_factories: Dict[str, MutatorFactory] = {}
         self._matcher_factories: Dict[str, MatcherFactory] = {}
@@ -52,11 +153,139 @@ class Context:
     def _get_afi(self) -> AbstractFeedbackInterface:
         return self._afi
 
-    def _submit_task(self, task, description: str, *args, **kwargs) -> Future:
+    def _join_afi(self, afi_fork: AbstractFeedbackInterface, python_future: PythonFuture, /) -> None:
+        with self._afi_lock:
+            self._afi.join(afi_fork, python_future)
+
+    def _get_registries(self) -> Dict[str, any]:
+        return {
+            "mutator_factories": dict(self._mutator_factories),
+            "matcher_factories": dict(self._matcher_factories),
+            "supervisor_factories": dict(self._supervisor_factories),
+            "interpretation_factories": dict(self._interpretation_factories),
+            "descriptor_cache_path": self._descriptor_cache_path,
+            "interpretation_cache_size": self._interpretation_cache_size,
+            "interpretation_cache_path": self._interpretation_cache_path
+        }
+
+    def _get_executor(self) -> Tuple[Executor, bool]:
+        """
+        Retrieves the executor of this context, creating it if necessary.
+
+        Returns:
+            The executor, and whether its workers have the current registries installed, so that they need not be sent along with the tasks.
+        """
+
+        # noinspection PyProtectedMember
+        from officialeye._internal.api.worker import worker_initialize
+
+        with self._executor_lock:
+            if self._executor is None:
+                # worker processes are private to this context, whereas threads share the internal context with everything else in this process
+                install_registries = self._backend == Backend.PROCESS
+
+                initializer = functools.partial(
+                    worker_initialize,
+                    self._preload_templates,
+                    install_registries=install_registries,
+                    context_key=self._context_key,
+                    **self._get_registries()
+                )
+
+                if self._backend == Backend.PROCESS:
+                    # The workers attaching to shared memory segments, such as shared images and cancellation tokens, have to report
+                    # to the same resource tracker as this process, otherwise every worker would start its own tracker,
+                    # which would consider the segments leaked once the worker exits.
+                    resource_tracker.ensure_running()
+
+                # every worker has the preloaded templates cached from the start
+                warm_keys = [self._get_affinity_key(template_path) for template_path in self._preload_templates]
+
+                self._executor = create_executor(self._backend, self._max_workers, initializer=initializer, warm_keys=warm_keys)
+                self._executor_registry_version = self._registry_version
 
-        afi_fork = self._afi.fork(description)
+            registries_installed = self._backend == Backend.PROCESS and self._executor_registry_version == self._registry_version
 
-        python_future: PythonFuture = self._executor.submit(
+            return self._executor, registries_installed
+
+    def _get_worker_count(self) -> int:
+        """ Determines the number of tasks the backend of this context runs at the same time. """
+        return get_worker_count(self._backend, self._max_workers)
+
+    def _get_interpretation_threads(self) -> int:
+        return self._interpretation_threads
+
+    def _shares_images(self) -> bool:
+        return self._share_images
+
+    def _share_image(self, img: np.ndarray, /) -> ImageSource:
+        """
+        Makes a decoded image available to the workers. The returned source has to be released with `_release_image_source`.
+        """
+
+        if self._backend != Backend.PROCESS:
+            # the workers run in this process, so they can use the image directly, as long as nobody modifies it
+            img_view = img.view()
+            img_view.flags.writeable = False
+            return img_view
+
+        shared_image = SharedImage(img)
+
+        with self._shared_images_lock:
+            self._shared_images.add(shared_image)
+
+        return shared_image
+
+    def _release_image_source(self, source: ImageSource, /) -> None:
+
+        if not isinstance(source, SharedImage):
+            return
+
+        with self._shared_images_lock:
+            if source not in self._shared_images:
+                # the image has already been released when disposing the context
+                return
+
+            self._shared_images.remove(source)
+
+        source.unlink()
+
+    @staticmethod
+    def _get_affinity_key(template_paths: str | Iterable[str], /) -> Hashable:
+
+        if isinstance(template_paths, str):
+            return os.path.abspath(template_paths)
+
+        return tuple(sorted(os.path.abspath(template_path) for template_path in template_paths))
+
+    def _submit_task(self, task, description: str, *args, affinity: str | Iterable[str] | None = None, **kwargs) -> Future:
+        """
+        Submits a task to the backend of this context.
+
+        Arguments:
+            task: The internal implementation of the task.
+            description: Description of the task, which is reported to the feedback interface.
+            args: Positional arguments of the task.
+            affinity: Path to the template the task concerns, or paths to all such templates if there are multiple of them.
+                The task is preferably run by a worker that has already run tasks concerning the same templates.
+            kwargs: Keyword arguments of the task.
+        """
+
+        executor, registries_installed = self._get_executor()
+
+        with self._afi_lock:
+            afi_fork = self._afi.fork(description)
+
+        # the registries only need to be sent along with the task if the worker does not have them installed already,
+        # i.e., if the backend does not support installing them, or if a factory has been registered after the workers have started
+        registries = {} if registries_installed else self._get_registries()
+
+        if isinstance(executor, AffinityExecutor):
+            submit = functools.partial(executor.submit_with_affinity, None if affinity is None else self._get_affinity_key(affinity))
+        else:
+            submit = executor.submit
+
+        python_future: PythonFuture = submit(
             task,
             *args,
             **kwargs,
@@ -64,10 +293,8 @@ class Context:
             # It is very important that the argument dictionary is picklable, because it will be passed from the parent
             # process to a child process by the ProcessPoolExecutor.
             afi=afi_fork,
-            mutator_factories=self._mutator_factories,
-            matcher_factories=self._matcher_factories,
-            supervisor_factories=self._supervisor_factories,
-            interpretation_factories=self._interpretation_factories
+            context_key=self._context_key,
+            **registries
         )
 
         return Future(self, python_future, afi_fork=afi_fork)
@@ -81,6 +308,7 @@ class Context:
             )
 
         self._mutator_factories[mutator_id] = factory
+        self._registry_version += 1
 
     def register_matcher(self, matcher_id: str, factory: MatcherFactory, /) -> None:
 
@@ -91,16 +319,18 @@ class Context:
             )
 
         self._matcher_factories[matcher_id] = factory
+        self._registry_version += 1
 
     def register_supervisor(self, supervisor_id: str, factory: SupervisorFactory, /) -> None:
 
-        if supervisor_id in self._matcher_factories:
+        if supervisor_id in self._supervisor_factories:
             raise ErrInvalidIdentifier(
-                f"while adding the '{supervisor_id}' matcher.",
+                f"while adding the '{supervisor_id}' supervisor.",
                 "A supervisor with the same id has already been registered."
             )
 
         self._supervisor_factories[supervisor_id] = factory
+        self._registry_version += 1
 
     def register_interpretation(self, interpretation_id: str, factory: InterpretationFactory, /) -> None:
 
@@ -111,6 +341,7 @@ class Context:
             )
 
         self._interpretation_factories[interpretation_id] = factory
+        self._registry_version += 1
 
     def get_mutator(self, mutator_id: str, config: ConfigDict, /) -> IMutator:
 
@@ -147,5 +378,21 @@ class Context:
 
     def dispose(self, exception_type: any = None, exception_value: BaseException | None = None, traceback: TracebackType | None = None) -> None:
         self._afi.dispose(exception_type, exception_value, traceback)
-        self._executor.shutdown(wait=True)
+
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+        if self._backend != Backend.PROCESS:
+            # the tasks have run in this process, which keeps the templates they have loaded until told otherwise
+            get_internal_context().forget_context(self._context_key)
+
+        with self._shared_images_lock:
+            shared_images = list(self._shared_images)
+            self._shared_images.clear()
+
+        for shared_image in shared_images:
+            shared_image.unlink()
+
         self._disposed = True
@@ -1,92 +1,409 @@
 from __future__ import annotations
 
-from concurrent.futures import ALL_COMPLETED
-from typing import TYPE_CHECKING, List
+import asyncio
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import Future as PythonFuture
+from concurrent.futures import wait as python_wait
+from typing import TYPE_CHECKING, Any, Dict, Generator, Iterable, Iterator, List, Set, Tuple, TypeVar
 
-from officialeye._api.future import Future, wait
+from officialeye._api.future import Future, wait, wait_async
+from officialeye._api.image import Image
 from officialeye._api.template.supervision_result import ISupervisionResult
+from officialeye._api.template.template import Template
+
+# noinspection PyProtectedMember
+from officialeye._internal.api.detect import templates_route
+
+# noinspection PyProtectedMember
+from officialeye._internal.context.cancellation import CancellationToken
 
 # noinspection PyProtectedMember
 from officialeye._internal.feedback.verbosity import Verbosity
 
 # noinspection PyProtectedMember
 from officialeye._internal.template.external_supervision_result import ExternalSupervisionResult
+
+# noinspection PyProtectedMember
+from officialeye._internal.template.external_template import ExternalTemplate
+
+# noinspection PyProtectedMember
+from officialeye._internal.template.template_signature import compare_signatures, compute_signature
 from officialeye.error.error import OEError
+from officialeye.error.errors.general import ErrInvalidArgument
 from officialeye.error.errors.internal import ErrInternal
 from officialeye.error.errors.supervision import ErrSupervisionCorrespondenceNotFound
 
 if TYPE_CHECKING:
     from officialeye._api.context import Context
     from officialeye._api.image import IImage
+    from officialeye._api.template.interpretation_result import IInterpretationResult
     from officialeye._api.template.template_interface import ITemplate
 
+    # noinspection PyProtectedMember
+    from officialeye._internal.template.prepared_target import PreparedTarget
+
+    # noinspection PyProtectedMember
+    from officialeye._internal.template.template_index import TemplateVotes
+
+
+_T = TypeVar("_T")
+
+# The analysis of a target image is implemented as a pipeline, i.e., a generator that yields whenever it needs to wait for some futures,
+# together with the condition to wait for, and which is then sent the set of futures that have completed.
+# This way, the same implementation can be driven both by blocking calls and by an asyncio event loop.
+_Pipeline = Generator[Tuple[Set[Future], str], Set[Future], _T]
+
+
+def _run_pipeline(pipeline: _Pipeline[_T], /) -> _T:
+
+    try:
+        futures, return_when = next(pipeline)
+
+        while True:
+            done, _ = wait(futures, return_when=return_when)
+            futures, return_when = pipeline.send(done)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def _run_pipeline_async(pipeline: _Pipeline[_T], /) -> _T:
+
+    try:
+        futures, return_when = next(pipeline)
+
+        while True:
+            try:
+                done, _ = await wait_async(futures, return_when=return_when)
+            except asyncio.CancelledError:
+                # the awaiting task has been cancelled, hence the work it has started is no longer needed
+                for future in futures:
+                    future.cancel()
+
+                # let the pipeline release its resources
+                pipeline.close()
+                raise
+
+            futures, return_when = pipeline.send(done)
+    except StopIteration as stop:
+        return stop.value
+
+
+def _wait_all(futures: Iterable[Future], /) -> _Pipeline[None]:
+
+    futures = set(futures)
+
+    if len(futures) > 0:
+        yield futures, ALL_COMPLETED
+
+
+def _get_external_template(template: ITemplate, /) -> ExternalTemplate | None:
+
+    if isinstance(template, ExternalTemplate):
+        return template
+
+    if isinstance(template, Template):
+        # noinspection PyProtectedMember
+        return template._get_external_template()
+
+    return None
+
+
+def _get_external_templates(templates: Iterable[ITemplate], /) -> _Pipeline[List[ExternalTemplate | None]]:
+    """
+    Loads all templates that have not yet been loaded, concurrently.
+    """
+
+    templates = list(templates)
+
+    load_futures: List[Tuple[Template, Future]] = []
+
+    for template in templates:
+
+        if not isinstance(template, Template):
+            continue
+
+        # noinspection PyProtectedMember
+        future = template._submit_load()
+
+        if future is not None:
+            load_futures.append((template, future))
+
+    yield from _wait_all(future for _, future in load_futures)
+
+    for template, future in load_futures:
+        # noinspection PyProtectedMember
+        template._complete_load(future)
+
+    return [_get_external_template(template) for template in templates]
+
+
+def _get_auxiliary_result(future: Future, while_text: str, /) -> Any:
+
+    error = future.exception()
+
+    if error is None:
+        return future.result()
+
+    if isinstance(error, OEError):
+        raise error
+
+    err = ErrInternal(
+        while_text,
+        "The worker has crashed due to an external error."
+    )
+    err.add_external_cause(error)
+    raise err
 
-def detect(context: Context, *templates: ITemplate, target: IImage) -> ISupervisionResult:
+
+def _prefilter_templates(context: Context, external_templates: Iterable[ExternalTemplate], target: IImage,
+                        threshold: float, /) -> _Pipeline[Set[str]]:
+    """
+    Compares the global signature of the target image with the signatures of the templates.
+    The signatures of templates are computed concurrently when they are needed for the first time, and remembered afterward.
+
+    Returns:
+        The ids of templates whose signature is less similar to the signature of the target image than the given threshold.
+    """
+
+    external_templates = list(external_templates)
+
+    signature_futures: List[Tuple[ExternalTemplate, Future]] = []
+
+    for external_template in external_templates:
+        # noinspection PyProtectedMember
+        future = external_template._submit_get_signature()
+
+        if future is not None:
+            signature_futures.append((external_template, future))
+
+    yield from _wait_all(future for _, future in signature_futures)
+
+    for external_template, future in signature_futures:
+        _get_auxiliary_result(future, f"while computing the signature of template '{external_template.identifier}'.")
+        # noinspection PyProtectedMember
+        external_template._complete_get_signature(future)
+
+    if isinstance(target, Image):
+        # noinspection PyProtectedMember
+        target_signature = compute_signature(target._load_preview())
+    else:
+        target_signature = compute_signature(target.load())
+
+    rejected_template_ids: Set[str] = set()
+
+    for external_template in external_templates:
+        similarity = compare_signatures(external_template.get_signature(), target_signature)
+
+        # noinspection PyProtectedMember
+        context._get_afi().info(
+            Verbosity.DEBUG_VERBOSE,
+            f"Global similarity of the target image and template '{external_template.identifier}' is {similarity:.3f}."
+        )
+
+        if similarity < threshold:
+            rejected_template_ids.add(external_template.identifier)
+
+    if len(rejected_template_ids) > 0:
+        # noinspection PyProtectedMember
+        context._get_afi().info(Verbosity.DEBUG, f"Prefilter has discarded templates {sorted(rejected_template_ids)}.")
+
+    return rejected_template_ids
+
+
+def _prepare_target(external_templates: Iterable[ExternalTemplate], target: IImage, /) -> _Pipeline[Dict[str, PreparedTarget]]:
+    """
+    Prepares the target image once for every target preparation key shared by at least two of the given templates.
+
+    Returns:
+        A dictionary mapping target preparation keys to the corresponding prepared targets.
+    """
+
+    # keys: target preparation keys
+    # values: templates with that key
+    template_groups: Dict[str, List[ExternalTemplate]] = {}
+
+    for external_template in external_templates:
+        template_groups.setdefault(external_template.get_target_preparation_key(), []).append(external_template)
+
+    # preparing the target in a separate task only pays off if the result can be shared between multiple templates
+    futures: Dict[str, Future] = {
+        preparation_key: template_group[0].prepare_target_async(target=target)
+        for preparation_key, template_group in template_groups.items()
+        if len(template_group) >= 2
+    }
+
+    yield from _wait_all(futures.values())
+
+    return {
+        preparation_key: _get_auxiliary_result(future, "while preparing the target image for analysis against multiple templates.")
+        for preparation_key, future in futures.items()
+    }
+
+
+def _route_templates(context: Context, external_templates: Iterable[ExternalTemplate], prepared_targets: Dict[str, PreparedTarget],
+                     top_k: int, /) -> _Pipeline[Set[str]]:
+    """
+    Estimates which templates are likely to match the target image, by letting the descriptors of the prepared target images vote
+    for the templates in a combined descriptor index. Only templates sharing a prepared target image take part in the same vote.
+
+    The vote counts of templates with different target preparation keys are not comparable, since they depend on the number of
+    descriptors found in the respectively prepared target images. Therefore, the top-k templates are selected within each group of
+    templates sharing a prepared target image separately.
+
+    Returns:
+        The ids of templates that have received fewer votes than the top-k templates of their group, and hence need not be analyzed further.
+    """
+
+    # keys: target preparation keys
+    # values: paths of templates with that key
+    template_groups: Dict[str, List[str]] = {}
+
+    for external_template in external_templates:
+        preparation_key = external_template.get_target_preparation_key()
+
+        if preparation_key in prepared_targets:
+            template_groups.setdefault(preparation_key, []).append(external_template.get_path())
+
+    # groups with no more than k templates would keep all of them anyway
+    template_groups = {
+        preparation_key: template_group for preparation_key, template_group in template_groups.items() if len(template_group) > top_k
+    }
+
+    if len(template_groups) == 0:
+        return set()
 
     futures: List[Future] = [
-        template.detect_async(target=target) for template in templates
+        # noinspection PyProtectedMember
+        context._submit_task(
+            templates_route,
+            "Routing target image...",
+            template_group,
+            prepared_target=prepared_targets[preparation_key],
+            affinity=template_group
+        )
+        for preparation_key, template_group in template_groups.items()
     ]
 
-    done, not_done = wait(futures, return_when=ALL_COMPLETED)
+    yield from _wait_all(futures)
+
+    rejected_template_ids: Set[str] = set()
+
+    for future in futures:
+        template_votes: TemplateVotes = _get_auxiliary_result(future, "while routing the target image to the most promising templates.")
+
+        # keys: template ids
+        # values: number of votes the template has received
+        votes = template_votes.votes
+
+        if votes is None or len(votes) <= top_k:
+            continue
+
+        # templates tied with the k-th best template of the group are kept as well
+        vote_threshold = sorted(votes.values(), reverse=True)[top_k - 1]
+
+        group_rejected_template_ids = {template_id for template_id, template_votes in votes.items() if template_votes < vote_threshold}
 
-    if len(not_done) > 0:
         # noinspection PyProtectedMember
-        context._get_afi().warn(Verbosity.DEBUG, "Some template analysis futures were not completed.")
+        context._get_afi().info(
+            Verbosity.DEBUG,
+            f"Routing has discarded {len(group_rejected_template_ids)} of {len(votes)} templates (votes: {votes})."
+        )
+
+        rejected_template_ids |= group_rejected_template_ids
+
+    return rejected_template_ids
+
+
+def _select_result(context: Context, futures: List[Future], /, *, early_exit_threshold: float | None = None,
+                   cancellation_token: CancellationToken | None = None) -> _Pipeline[ISupervisionResult]:
+    """
+    Waits for the template analysis futures to complete, and selects the result with the highest score.
+    If an early exit threshold is given, the first result whose normalized score reaches the threshold is selected instead,
+    and the remaining work is cancelled.
+    """
 
     regular_errors: List[OEError] = []
 
     best_result: ISupervisionResult | None = None
     best_result_score: float = -1.0
 
-    for completed_future in done:
+    not_done: Set[Future] = set(futures)
 
-        assert isinstance(completed_future, Future)
+    while len(not_done) > 0:
 
-        if completed_future.cancelled():
-            # noinspection PyProtectedMember
-            context._get_afi().warn(Verbosity.DEBUG, "A template analysis future was cancelled.")
-            continue
+        done = yield not_done, ALL_COMPLETED if early_exit_threshold is None else FIRST_COMPLETED
+        not_done = not_done - done
 
-        error = completed_future.exception()
+        for completed_future in done:
 
-        if error is not None:
-            # there has been an error during the execution of the future
-            # the cause of the error might have been critical, in which case we should raise an exception immediately,
-            # or it might be, for example, due to one of the templates not matching the image at all, which is regular behavior
-            # therefore, we need to distinguish between a critical error and a regular one
+            assert isinstance(completed_future, Future)
 
-            if not isinstance(error, OEError):
-                err = ErrInternal(
-                    "while analyzing target image against multiple templates.",
-                    "One of the individual analysis workers has crashed due to an external error."
-                )
-                err.add_external_cause(error)
-                raise err
+            if completed_future.cancelled():
+                # noinspection PyProtectedMember
+                context._get_afi().warn(Verbosity.DEBUG, "A template analysis future was cancelled.")
+                continue
+
+            error = completed_future.exception()
+
+            if error is not None:
+                # there has been an error during the execution of the future
+                # the cause of the error might have been critical, in which case we should raise an exception immediately,
+                # or it might be, for example, due to one of the templates not matching the image at all, which is regular behavior
+                # therefore, we need to distinguish between a critical error and a regular one
+
+                if not isinstance(error, OEError):
+                    err = ErrInternal(
+                        "while analyzing target image against multiple templates.",
+                        "One of the individual analysis workers has crashed due to an external error."
+                    )
+                    err.add_external_cause(error)
+                    raise err
+
+                assert isinstance(error, OEError)
+
+                if error.is_regular:
+                    # noinspection PyProtectedMember
+                    context._get_afi().warn(
+                        Verbosity.DEBUG,
+                        f"A template analysis worker has returned a regular error {error.code} ({error.code_text})."
+                    )
+                    regular_errors.append(error)
+                    continue
+
+                # we are dealing with a non-regular OfficialEye error
+                raise error
+
+            result = completed_future.result()
+            assert result is not None
+            assert isinstance(result, ExternalSupervisionResult)
+
+            # noinspection PyProtectedMember
+            context._get_afi().info(
+                Verbosity.DEBUG,
+                f"Template analysis worker yielded a result with score {result.score} "
+                f"(normalized score {result.get_normalized_score():.3f})."
+            )
+
+            if early_exit_threshold is not None and result.get_normalized_score() >= early_exit_threshold:
 
-            assert isinstance(error, OEError)
+                for pending_future in not_done:
+                    pending_future.cancel()
+
+                # some of the pending futures might have already been running, and hence could not be cancelled above
+                if cancellation_token is not None:
+                    cancellation_token.cancel()
 
-            if error.is_regular:
                 # noinspection PyProtectedMember
-                context._get_afi().warn(
+                context._get_afi().info(
                     Verbosity.DEBUG,
-                    f"A template analysis worker has returned a regular error {error.code} ({error.code_text})."
+                    f"Accepting the result early, abandoning {len(not_done)} template analysis futures."
                 )
-                regular_errors.append(error)
-                continue
 
-            # we are dealing with a non-regular OfficialEye error
-            raise error
-
-        result = completed_future.result()
-        assert result is not None
-        assert isinstance(result, ExternalSupervisionResult)
-
-        # noinspection PyProtectedMember
-        context._get_afi().info(Verbosity.DEBUG, f"Template analysis worker yielded a result with score {result.score}.")
+                return result
 
-        if result.score > best_result_score:
-            best_result_score = result.score
-            best_result = result
+            if result.score > best_result_score:
+                best_result_score = result.score
+                best_result = result
 
     if best_result is None:
         error = ErrSupervisionCorrespondenceNotFound(
@@ -100,3 +417,315 @@ def detect(context: Context, *templates: ITemplate, target: IImage) -> ISupervis
         raise error
 
     return best_result
+
+
+def _check_detect_options(*, route_top_k: int | None, prefilter_threshold: float | None, early_exit_threshold: float | None) -> None:
+
+    if route_top_k is not None and route_top_k < 1:
+        raise ErrInvalidArgument(
+            "while analyzing the target image against multiple templates.",
+            f"The number of templates to route the target image to must be positive, got {route_top_k}."
+        )
+
+    if prefilter_threshold is not None and not 0.0 <= prefilter_threshold <= 1.0:
+        raise ErrInvalidArgument(
+            "while analyzing the target image against multiple templates.",
+            f"The prefilter threshold must be between 0 and 1, got {prefilter_threshold}."
+        )
+
+    if early_exit_threshold is not None and not 0.0 <= early_exit_threshold <= 1.0:
+        raise ErrInvalidArgument(
+            "while analyzing the target image against multiple templates.",
+            f"The early exit threshold must be between 0 and 1, got {early_exit_threshold}."
+        )
+
+
+def _detect(context: Context, templates: Iterable[ITemplate], target: IImage, /, *, route_top_k: int | None,
+            prefilter_threshold: float | None, early_exit_threshold: float | None,
+            interpretation_target: IImage | None = None) -> _Pipeline[ISupervisionResult]:
+    """
+    Arguments:
+        interpretation_target: If specified, and the target image ends up being analyzed against a single template only,
+            that analysis also interprets the features in this image, and the supervision result carries the interpretation result.
+    """
+
+    _check_detect_options(route_top_k=route_top_k, prefilter_threshold=prefilter_threshold, early_exit_threshold=early_exit_threshold)
+
+    templates = tuple(templates)
+
+    external_templates = yield from _get_external_templates(templates)
+
+    rejected_template_ids: Set[str] = set()
+
+    if prefilter_threshold is not None:
+        rejected_template_ids |= yield from _prefilter_templates(
+            context, (t for t in external_templates if t is not None), target, prefilter_threshold
+        )
+
+    candidate_templates: List[ExternalTemplate] = [
+        t for t in external_templates if t is not None and t.identifier not in rejected_template_ids
+    ]
+
+    prepared_targets = yield from _prepare_target(candidate_templates, target)
+
+    if route_top_k is not None:
+        rejected_template_ids |= yield from _route_templates(context, candidate_templates, prepared_targets, route_top_k)
+
+    # a cancellation token is only needed if some of the tasks may become obsolete while they are still running
+    cancellation_token: CancellationToken | None = CancellationToken() if early_exit_threshold is not None else None
+
+    analyzed_templates: List[Tuple[ITemplate, ExternalTemplate | None]] = [
+        (template, external_template) for template, external_template in zip(templates, external_templates, strict=True)
+        if external_template is None or external_template.identifier not in rejected_template_ids
+    ]
+
+    # Interpreting the features right after the supervision spares passing the supervision result back to a worker.
+    # However, if there are multiple candidate templates, only the best of them should be interpreted, which is not yet known at this point.
+    interpret = interpretation_target is not None and len(analyzed_templates) == 1 and analyzed_templates[0][1] is not None
+
+    try:
+        futures: List[Future] = []
+
+        for template, external_template in analyzed_templates:
+
+            if external_template is None:
+                futures.append(template.detect_async(target=target))
+                continue
+
+            prepared_target = prepared_targets.get(external_template.get_target_preparation_key())
+
+            if interpret:
+                futures.append(external_template.detect_and_interpret_async(
+                    target=target,
+                    interpretation_target=interpretation_target,
+                    prepared_target=prepared_target,
+                    cancellation_token=cancellation_token
+                ))
+                continue
+
+            futures.append(external_template.detect_async(
+                target=target,
+                prepared_target=prepared_target,
+                cancellation_token=cancellation_token
+            ))
+
+        return (yield from _select_result(context, futures, early_exit_threshold=early_exit_threshold, cancellation_token=cancellation_token))
+    finally:
+        if cancellation_token is not None:
+            cancellation_token.close()
+
+
+def detect(context: Context, *templates: ITemplate, target: IImage, route_top_k: int | None = None,
+           prefilter_threshold: float | None = None, early_exit_threshold: float | None = None) -> ISupervisionResult:
+    """
+    Analyzes the target image against each of the given templates, and returns the result with the highest score.
+
+    Arguments:
+        context: The context to run the analysis in.
+        templates: The templates to analyze the target image against.
+        target: The target image.
+        route_top_k: If specified, the templates are first ranked by how many descriptors of the target image vote for them
+            in a combined descriptor index, and only the best `route_top_k` templates (and those tied with them) are fully analyzed.
+            Templates whose target images are prepared differently (e.g. with a different pyramid scale) are ranked separately,
+            so the best `route_top_k` templates of each such group are kept.
+            Templates whose matcher does not support descriptor-based routing are always analyzed.
+        prefilter_threshold: If specified, templates whose colour histogram intersects the colour histogram of the target image
+            less than this fraction (a value between 0 and 1) are discarded before any other analysis takes place.
+            Since the histogram of the target image is affected by its background, this is most useful with low thresholds,
+            or with target images that mostly consist of the document itself, such as scans.
+        early_exit_threshold: If specified, the first result whose normalized score (a value between 0 and 1, see
+            `ISupervisionResult.get_normalized_score`) reaches this threshold is returned immediately, even if it is not the best one,
+            and the analysis against the remaining templates is cancelled.
+    """
+
+    return _run_pipeline(_detect(
+        context, templates, target,
+        route_top_k=route_top_k, prefilter_threshold=prefilter_threshold, early_exit_threshold=early_exit_threshold
+    ))
+
+
+async def detect_async(context: Context, *templates: ITemplate, target: IImage, route_top_k: int | None = None,
+                       prefilter_threshold: float | None = None, early_exit_threshold: float | None = None) -> ISupervisionResult:
+    """
+    Counterpart of `detect` to be awaited in an asyncio event loop, which it does not block while waiting for the workers.
+    If the awaiting task is cancelled, the work that has not yet started is cancelled too.
+    """
+
+    return await _run_pipeline_async(_detect(
+        context, templates, target,
+        route_top_k=route_top_k, prefilter_threshold=prefilter_threshold, early_exit_threshold=early_exit_threshold
+    ))
+
+
+def _detect_and_interpret(context: Context, templates: Iterable[ITemplate], target: IImage, interpretation_target: IImage, /, *,
+                          route_top_k: int | None, prefilter_threshold: float | None,
+                          early_exit_threshold: float | None) -> _Pipeline[Tuple[ISupervisionResult, IInterpretationResult]]:
+
+    result = yield from _detect(
+        context, templates, target,
+        route_top_k=route_top_k, prefilter_threshold=prefilter_threshold, early_exit_threshold=early_exit_threshold,
+        interpretation_target=interpretation_target
+    )
+
+    if isinstance(result, ExternalSupervisionResult):
+        # noinspection PyProtectedMember
+        interpretation_result = result._take_interpretation_result()
+
+        if interpretation_result is not None:
+            return result, interpretation_result
+
+    # the target image has been analyzed against multiple templates, hence the best result has to be interpreted separately
+    future = result.interpret_async(target=interpretation_target)
+
+    yield from _wait_all((future,))
+
+    interpretation_result = future.result()
+
+    if isinstance(result, ExternalSupervisionResult):
+        # the supervision result has been detached from the context in order to be passed to the worker
+        result.set_api_context(context)
+
+    return result, interpretation_result
+
+
+def detect_and_interpret(context: Context, *templates: ITemplate, target: IImage, interpretation_target: IImage | None = None,
+                         route_top_k: int | None = None, prefilter_threshold: float | None = None,
+                         early_exit_threshold: float | None = None) -> Tuple[ISupervisionResult, IInterpretationResult]:
+    """
+    Analyzes the target image against each of the given templates like `detect`, and interprets the features of the best result.
+    If the target image is analyzed against a single template, the features are interpreted by the same task that has found the template,
+    while the target image is still loaded, which is considerably cheaper than calling `interpret` on the result of `detect`.
+
+    Arguments:
+        context: The context to run the analysis in.
+        templates: The templates to analyze the target image against.
+        target: The target image.
+        interpretation_target: The image the features should be interpreted in, which must have the same shape as the target image.
+            By default, the features are interpreted in the target image.
+        route_top_k: See `detect`.
+        prefilter_threshold: See `detect`.
+        early_exit_threshold: See `detect`.
+
+    Returns:
+        The supervision result and the interpretation result.
+    """
+
+    return _run_pipeline(_detect_and_interpret(
+        context, templates, target, target if interpretation_target is None else interpretation_target,
+        route_top_k=route_top_k, prefilter_threshold=prefilter_threshold, early_exit_threshold=early_exit_threshold
+    ))
+
+
+async def detect_and_interpret_async(context: Context, *templates: ITemplate, target: IImage, interpretation_target: IImage | None = None,
+                                     route_top_k: int | None = None, prefilter_threshold: float | None = None,
+                                     early_exit_threshold: float | None = None) -> Tuple[ISupervisionResult, IInterpretationResult]:
+    """
+    Counterpart of `detect_and_interpret` to be awaited in an asyncio event loop, which it does not block while waiting for the workers.
+    If the awaiting task is cancelled, the work that has not yet started is cancelled too.
+    """
+
+    return await _run_pipeline_async(_detect_and_interpret(
+        context, templates, target, target if interpretation_target is None else interpretation_target,
+        route_top_k=route_top_k, prefilter_threshold=prefilter_threshold, early_exit_threshold=early_exit_threshold
+    ))
+
+
+def _detect_or_error(context: Context, templates: Tuple[ITemplate, ...], target: IImage, options: Dict[str, Any], /) -> ISupervisionResult | OEError:
+    try:
+        return detect(context, *templates, target=target, **options)
+    except OEError as err:
+        return err
+    except Exception as error:
+        # an unexpected error concerning a single target image should not abort the analysis of all the other ones
+        err = ErrInternal(
+            "while analyzing one of many target images.",
+            "An unexpected error has occurred."
+        )
+        err.add_external_cause(error)
+        return err
+    finally:
+        # the decoded target image is no longer needed by any worker, and it is decoded again in case it is interpreted later on
+        # noinspection PyProtectedMember
+        target._release_source()
+
+
+def detect_many(context: Context, templates: Iterable[ITemplate], targets: Iterable[IImage], /, *, max_in_flight: int | None = None,
+                route_top_k: int | None = None, prefilter_threshold: float | None = None,
+                early_exit_threshold: float | None = None) -> Iterator[Tuple[IImage, ISupervisionResult | OEError]]:
+    """
+    Analyzes many target images against the same templates.
+    Unlike calling `detect` for every target image in turn, the analyses of multiple target images overlap,
+    so that the workers do not become idle while the results for a target image are being collected.
+
+    Arguments:
+        context: The context to run the analysis in.
+        templates: The templates to analyze the target images against.
+        targets: The target images. They are consumed lazily, so this may be a generator producing an unbounded stream of images.
+        max_in_flight: The maximal number of target images being analyzed at the same time.
+            By default, the number of tasks the backend of the context runs at the same time.
+        route_top_k: See `detect`.
+        prefilter_threshold: See `detect`.
+        early_exit_threshold: See `detect`.
+
+    Yields:
+        Pairs consisting of a target image and its analysis result, in the order in which the analyses complete.
+        If the analysis of a target image fails, the error is yielded in place of the result.
+    """
+
+    _check_detect_options(route_top_k=route_top_k, prefilter_threshold=prefilter_threshold, early_exit_threshold=early_exit_threshold)
+
+    if max_in_flight is None:
+        # noinspection PyProtectedMember
+        max_in_flight = context._get_worker_count()
+
+    if max_in_flight < 1:
+        raise ErrInvalidArgument(
+            "while analyzing multiple target images.",
+            f"The maximal number of target images analyzed at the same time must be positive, got {max_in_flight}."
+        )
+
+    templates = tuple(templates)
+
+    # load the templates before they are shared between threads, so that every template is loaded only once
+    for template in templates:
+        _get_external_template(template)
+
+    options = {
+        "route_top_k": route_top_k,
+        "prefilter_threshold": prefilter_threshold,
+        "early_exit_threshold": early_exit_threshold
+    }
+
+    # the threads merely orchestrate the analysis of the individual target images, the actual work is done by the context's workers
+    executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="officialeye_detect_many")
+
+    # keys: futures of the analyses of target images
+    # values: the corresponding target images
+    pending: Dict[PythonFuture, IImage] = {}
+
+    target_iterator = iter(targets)
+    targets_exhausted = False
+
+    try:
+        while True:
+
+            while not targets_exhausted and len(pending) < max_in_flight:
+                try:
+                    target = next(target_iterator)
+                except StopIteration:
+                    targets_exhausted = True
+                    break
+
+                pending[executor.submit(_detect_or_error, context, templates, target, options)] = target
+
+            if len(pending) == 0:
+                break
+
+            done, _ = python_wait(pending.keys(), return_when=FIRST_COMPLETED)
+
+            for completed_future in done:
+                target = pending.pop(completed_future)
+                yield target, completed_future.result()
+    finally:
+        # in case the caller stops consuming the results early, the analyses that have not yet started are abandoned
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 from concurrent.futures import ALL_COMPLETED
 from concurrent.futures import Future as PythonFuture
 from concurrent.futures import wait as python_wait
-from typing import TYPE_CHECKING, Any, Dict, Iterable, Set, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Generator, Iterable, Set, Tuple
 
 # noinspection PyProtectedMember
 from officialeye._internal.api_implementation import IApiInterfaceImplementation
@@ -15,6 +16,17 @@ if TYPE_CHECKING:
     from officialeye._api.context import Context
 
 
+def _wrap_python_future(python_future: PythonFuture, /) -> asyncio.Future:
+
+    wrapped_future = asyncio.wrap_future(python_future)
+
+    # the wrapper merely serves for waiting, while the outcome is always retrieved via the original future,
+    # hence asyncio should not complain about exceptions never being retrieved from the wrapper
+    wrapped_future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    return wrapped_future
+
+
 class Future:
 
     def __init__(self, context: Context, python_future: PythonFuture, /, *, afi_fork: AbstractFeedbackInterface):
@@ -30,7 +42,14 @@ class Future:
         If the call is currently being executed and cannot be canceled, then the method will return False,
         otherwise the call will be canceled, and the method will return True.
         """
-        return self._future.cancel()
+
+        cancelled = self._future.cancel()
+
+        if cancelled:
+            # the call will never run, and hence never report anything
+            self._afi_join()
+
+        return cancelled
 
     def cancelled(self) -> bool:
         """ Return True if the call was successfully canceled. """
@@ -48,7 +67,7 @@ class Future:
         if not self._afi_joined:
             self._afi_joined = True
             # noinspection PyProtectedMember
-            self._context._get_afi().join(self._afi_fork, self._future)
+            self._context._join_afi(self._afi_fork, self._future)
 
     def result(self, timeout: float | None = None) -> Any:
         """
@@ -91,6 +110,26 @@ class Future:
 
         return err
 
+    def __await__(self) -> Generator[Any, None, Any]:
+        """
+        Waits for the call to complete without blocking the event loop, and returns the value returned by the call.
+        Behaves like the `result` method otherwise.
+        If the awaiting task is cancelled, the call is cancelled too, if possible.
+        """
+        return self._result_async().__await__()
+
+    async def _result_async(self) -> Any:
+
+        try:
+            await asyncio.wait((_wrap_python_future(self._future),))
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
+
+        # the call is done at this point, so neither of the following calls blocks
+        self.exception()
+        return self.result()
+
 
 def wait(futures: Iterable[Future], /, *, timeout: float | None = None, return_when=ALL_COMPLETED) -> Tuple[Set[Future], Set[Future]]:
 
@@ -109,3 +148,27 @@ def wait(futures: Iterable[Future], /, *, timeout: float | None = None, return_w
     corresponding_not_done = set((original_futures[d] for d in not_done))
 
     return corresponding_done, corresponding_not_done
+
+
+async def wait_async(futures: Iterable[Future], /, *, timeout: float | None = None,
+                     return_when=ALL_COMPLETED) -> Tuple[Set[Future], Set[Future]]:
+    """
+    Counterpart of `wait` that does not block the event loop.
+    """
+
+    futures = list(futures)
+
+    # noinspection PyProtectedMember
+    original_futures: Dict[asyncio.Future, Future] = {
+        _wrap_python_future(future._future): future for future in futures
+    }
+
+    if len(original_futures) == 0:
+        return set(), set()
+
+    done, not_done = await asyncio.wait(original_futures.keys(), timeout=timeout, return_when=return_when)
+
+    corresponding_done = set((original_futures[d] for d in done))
+    corresponding_not_done = set((original_futures[d] for d in not_done))
+
+    return corresponding_done, corresponding_not_done
@@ -1,18 +1,24 @@
 from __future__ import annotations
 
 import os
+import weakref
 from abc import ABC, abstractmethod
+from threading import Lock
 from typing import TYPE_CHECKING, List
 
 import cv2
 import numpy as np
 
-from officialeye.error.errors.io import ErrIOInvalidPath
+from officialeye.error.errors.general import ErrInvalidArgument, ErrInvalidImage
+from officialeye.error.errors.io import ErrIOInvalidImage, ErrIOInvalidPath
 
 if TYPE_CHECKING:
     from officialeye._api.context import Context
     from officialeye._api.mutator import IMutator
 
+    # noinspection PyProtectedMember
+    from officialeye._internal.image_transport import ImageSource
+
 
 class IImage(ABC):
 
@@ -27,17 +33,87 @@ class IImage(ABC):
     def apply_mutators(self, *mutators: IMutator):
         raise NotImplementedError()
 
+    def _get_source(self) -> ImageSource:
+        """
+        Retrieves the representation of this image that is passed to the workers.
+        By default, the image is loaded, and the loaded pixels are passed to the workers.
+        """
+        return self.load()
+
+    def _release_source(self) -> None:  # noqa: B027
+        """ Releases the resources held by the representation of this image passed to the workers, if any. """
+        pass
+
 
 class Image(IImage):
 
-    def __init__(self, context: Context, /, *, path: str):
+    def __init__(self, context: Context, /, *, path: str | None = None, array: np.ndarray | None = None, data: bytes | None = None):
+        """
+        Exactly one of the arguments specifying the contents of the image has to be given.
+
+        Arguments:
+            context: The context the image is going to be used in.
+            path: Path to the image file.
+            array: The decoded image, in the BGR format with 8 bits per channel, as returned by `cv2.imread`.
+                The array must not be modified as long as the image is in use.
+            data: The encoded contents of an image file, in any format supported by `cv2.imdecode`.
+
+        Raises:
+            ErrInvalidArgument: In case the contents of the image have not been specified exactly once.
+            ErrInvalidImage: In case the given array does not hold an image in the expected format.
+        """
+
         super().__init__()
 
+        if sum(contents is not None for contents in (path, array, data)) != 1:
+            raise ErrInvalidArgument(
+                "while creating an image.",
+                "Exactly one of the path, the array and the encoded data of the image has to be specified."
+            )
+
+        if array is not None and (array.ndim != 3 or array.shape[2] != 3 or array.dtype != np.uint8):
+            raise ErrInvalidImage(
+                "while creating an image from an array.",
+                f"Expected a BGR image with 8 bits per channel, got an array of shape {array.shape} and type {array.dtype}."
+            )
+
         self._context = context
         self._mutators: List[IMutator] = []
+
         self._path = path
+        self._array = array
+        self._data = data
 
-    def load(self) -> np.ndarray:
+        # representation of the decoded image passed to the workers, None if the image has not been decoded for the workers
+        self._source: ImageSource | None = None
+        self._source_finalizer: weakref.finalize | None = None
+        self._source_lock = Lock()
+
+    @classmethod
+    def from_array(cls, context: Context, array: np.ndarray, /) -> Image:
+        """
+        Creates an image from its decoded pixels, in the BGR format with 8 bits per channel, as returned by `cv2.imread`.
+        The array must not be modified as long as the image is in use.
+        """
+        return cls(context, array=array)
+
+    @classmethod
+    def from_bytes(cls, context: Context, data: bytes, /) -> Image:
+        """
+        Creates an image from the encoded contents of an image file, in any format supported by `cv2.imdecode`.
+        """
+        return cls(context, data=data)
+
+    def _describe(self) -> str:
+
+        if self._path is not None:
+            return f"image located at '{self._path}'"
+
+        return "in-memory image"
+
+    def _check_path(self) -> None:
+
+        assert self._path is not None
 
         if not os.path.isfile(self._path):
             raise ErrIOInvalidPath(
@@ -51,7 +127,37 @@ class Image(IImage):
                 "The file at this path is not readable."
             )
 
-        img = cv2.imread(self._path, cv2.IMREAD_COLOR)
+    def _decode(self, flags: int, /) -> np.ndarray:
+
+        if self._path is not None:
+            self._check_path()
+            img = cv2.imread(self._path, flags)
+        else:
+            assert self._data is not None
+            img = cv2.imdecode(np.frombuffer(self._data, dtype=np.uint8), flags)
+
+        if img is None:
+            raise ErrIOInvalidImage(
+                f"while loading {self._describe()}.",
+                "The image could not be decoded."
+            )
+
+        return img
+
+    def _load_unmutated(self) -> np.ndarray:
+
+        if self._array is not None:
+            return self._array
+
+        return self._decode(cv2.IMREAD_COLOR)
+
+    def load(self) -> np.ndarray:
+
+        img = self._load_unmutated()
+
+        if self._array is not None:
+            # the caller may modify the returned image, which must not affect this image
+            img = img.copy()
 
         for mutator in self._mutators:
             img = mutator.mutate(img)
@@ -60,3 +166,63 @@ class Image(IImage):
 
     def apply_mutators(self, *mutators: IMutator):
         self._mutators += mutators
+
+    def _load_preview(self) -> np.ndarray:
+        """
+        Loads a downscaled version of the image, which is considerably cheaper than loading it in full resolution,
+        because the decoder can skip most of the work. Only suitable for computing global properties of the image.
+        """
+
+        if len(self._mutators) > 0:
+            # mutators may depend on the resolution of the image, so they have to be applied to the full image
+            return self.load()
+
+        if self._array is not None:
+            return self._array
+
+        return self._decode(cv2.IMREAD_REDUCED_COLOR_4)
+
+    def _get_source(self) -> ImageSource:
+        """
+        Retrieves the representation of this image that is passed to the workers.
+        If the context shares decoded images, the image is decoded when first needed, and the decoded pixels are reused by all tasks
+        until `_release_source` is called, or until this image is garbage-collected.
+        Otherwise, the workers receive the path, the encoded data or the array this image has been created from.
+
+        Raises:
+            ErrIOInvalidPath: In case the image file cannot be read.
+            ErrIOInvalidImage: In case the image cannot be decoded.
+        """
+
+        # noinspection PyProtectedMember
+        if not self._context._shares_images():
+
+            if self._path is not None:
+                return self._path
+
+            if self._data is not None:
+                return self._data
+
+            # prevent the workers from modifying the array, in case they run in this process
+            array_view = self._array.view()
+            array_view.flags.writeable = False
+            return array_view
+
+        with self._source_lock:
+            if self._source is None:
+                # noinspection PyProtectedMember
+                self._source = self._context._share_image(self._load_unmutated())
+                # noinspection PyProtectedMember
+                self._source_finalizer = weakref.finalize(self, self._context._release_image_source, self._source)
+
+            return self._source
+
+    def _release_source(self) -> None:
+        """ Releases the decoded image shared with the workers, if any. It is decoded again in case it is needed later on. """
+
+        with self._source_lock:
+            if self._source_finalizer is not None:
+                self._source_finalizer()
+
+            self._source = None
+            self._source_finalizer = None
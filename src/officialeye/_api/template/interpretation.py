@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List, Sequence, Tuple
 
 import numpy as np
 
@@ -22,6 +22,33 @@ class IInterpretation(ABC):
     def interpret(self, feature_img: np.ndarray, feature: IFeature, /) -> FeatureInterpretation:
         raise NotImplementedError()
 
+    def supports_batching(self) -> bool:
+        """
+        Returns whether the `interpret_batch` method interprets multiple features more efficiently than interpreting them one by one.
+        If so, all features of a document interpreted by identically configured instances of this interpretation method
+        are passed to a single call of `interpret_batch`.
+        """
+        return False
+
+    def is_cacheable(self) -> bool:
+        """
+        Returns whether the interpretation of a feature depends on nothing but the image of the feature and the configuration
+        of this interpretation method, and has no side effects, so that interpretations of identical images can be reused.
+        """
+        return False
+
+    def interpret_batch(self, items: Sequence[Tuple[np.ndarray, IFeature]], /) -> List[FeatureInterpretation]:
+        """
+        Interprets multiple features at once.
+
+        Arguments:
+            items: Pairs consisting of the image of a feature and the feature.
+
+        Returns:
+            The interpretations of the features, in the order of the given items.
+        """
+        return [self.interpret(feature_img, feature) for feature_img, feature in items]
+
 
 class Interpretation(IInterpretation, ABC):
 
@@ -88,6 +88,22 @@ class Match(IMatch):
 
         self._score = score
 
+        # the hash does not depend on the score, which is the only mutable attribute, hence it is computed only once
+        self._hash: int | None = None
+
+    def __hash__(self):
+
+        if self._hash is None:
+            self._hash = super().__hash__()
+
+        return self._hash
+
+    def __getstate__(self) -> dict:
+        # hashes of strings differ between processes
+        state = self.__dict__.copy()
+        state["_hash"] = None
+        return state
+
     def get_score(self) -> float:
         return self._score
 
@@ -1,13 +1,14 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Iterable
+from typing import TYPE_CHECKING, Any, Iterable, Tuple
 
 import numpy as np
 
 from officialeye._api.config import MatcherConfig
 from officialeye._api.template.keypoint import IKeypoint
 from officialeye._api.template.match import IMatch
+from officialeye.error.errors.general import ErrOperationNotSupported
 
 if TYPE_CHECKING:
     from officialeye._api.template.template import ITemplate
@@ -25,6 +26,56 @@ class IMatcher(ABC):
     def setup(self, target: np.ndarray, template: ITemplate, /) -> None:
         raise NotImplementedError()
 
+    def prepare_target(self, target: np.ndarray, /) -> Any:
+        """
+        Performs the part of the setup that depends only on the target image, and not on the template, e.g., computes the features of the target.
+        When matching the same target against multiple templates using identically configured matchers,
+        the result is computed only once and shared between all templates via the `setup_prepared` method.
+
+        Arguments:
+            target: The target image, with the target mutators already applied to it.
+
+        Returns:
+            A picklable object that can be passed to `setup_prepared`, or None if the matcher does not support sharing the target preparation.
+        """
+        return None
+
+    def setup_prepared(self, prepared_target: Any, template: ITemplate, /) -> None:
+        """
+        Alternative to the `setup` method, that should be implemented if the `prepare_target` method is implemented.
+
+        Arguments:
+            prepared_target: The result of calling `prepare_target` on an identically configured matcher.
+            template: The template the target should be matched against.
+        """
+        raise ErrOperationNotSupported(
+            "while setting up a matcher with a prepared target image.",
+            "The matcher does not support preparing target images."
+        )
+
+    def get_keypoint_descriptors(self, keypoint: IKeypoint, /) -> np.ndarray | None:
+        """
+        Returns the descriptors of the local features found in the given keypoint.
+        They are used to quickly estimate which templates are likely to match a target image, before running the full analysis.
+
+        Returns:
+            A float32 array with one row per descriptor, comparable with the rows returned by `get_target_descriptors`,
+            or None if the matcher does not support descriptor-based routing.
+        """
+        return None
+
+    def get_target_descriptors(self, prepared_target: Any, /) -> np.ndarray | None:
+        """
+        Returns the descriptors of the local features found in a prepared target image.
+
+        Arguments:
+            prepared_target: The result of calling `prepare_target` on an identically configured matcher.
+
+        Returns:
+            A float32 array with one row per descriptor, or None if the matcher does not support descriptor-based routing.
+        """
+        return None
+
     @abstractmethod
     def match(self, keypoint: IKeypoint, /) -> None:
         raise NotImplementedError()
@@ -33,6 +84,16 @@ class IMatcher(ABC):
     def get_matches_for_keypoint(self, keypoint: IKeypoint, /) -> Iterable[IMatch]:
         raise NotImplementedError()
 
+    def get_match_arrays_for_keypoint(self, keypoint: IKeypoint, /) -> Tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+        """
+        Alternative to the `get_matches_for_keypoint` method, which spares creating an `IMatch` instance for every match.
+
+        Returns:
+            The keypoint points and the target points of the matches, as arrays of shape (n, 2), and the scores of the matches,
+            as an array of shape (n,), or None if the matcher does not support providing the matches as arrays.
+        """
+        return None
+
 
 class Matcher(IMatcher, ABC):
 
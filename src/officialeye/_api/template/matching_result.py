@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Iterable
+from typing import TYPE_CHECKING, Iterable, Tuple
+
+import numpy as np
 
 from officialeye._api.template.match import IMatch
 
@@ -27,3 +29,24 @@ class IMatchingResult(ABC):
     @abstractmethod
     def get_matches_for_keypoint(self, keypoint_id: str, /) -> Iterable[IMatch]:
         raise NotImplementedError()
+
+    def get_packed_points(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            The template points and the target points of all matches, in the order given by `get_all_matches`,
+            as two arrays of shape (n, 2).
+        """
+
+        matches = list(self.get_all_matches())
+
+        template_points = np.array([match.template_point for match in matches], dtype=np.float64).reshape(-1, 2)
+        target_points = np.array([match.target_point for match in matches], dtype=np.float64).reshape(-1, 2)
+
+        return template_points, target_points
+
+    def get_match_scores(self) -> np.ndarray:
+        """
+        Returns:
+            The scores of all matches, in the order given by `get_all_matches`, as an array of shape (n,).
+        """
+        return np.fromiter((match.get_score() for match in self.get_all_matches()), dtype=np.float64)
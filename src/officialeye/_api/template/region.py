@@ -82,7 +82,7 @@ class IRegion(ABC):
 
     def __eq__(self, o: Any) -> bool:
 
-        if not isinstance(o, Region):
+        if not isinstance(o, IRegion):
             return False
 
         return self.template.identifier == o.template.identifier and self.identifier == o.identifier
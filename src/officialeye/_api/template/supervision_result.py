@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import sys
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Dict
+from typing import TYPE_CHECKING, Dict, List, Sequence
 
 import cv2
 import numpy as np
@@ -18,6 +18,14 @@ if TYPE_CHECKING:
     from officialeye._api.template.matching_result import IMatchingResult
     from officialeye._api.template.template_interface import ITemplate
 
+# number of pixels by which the region of the target image read when warping a feature is extended,
+# so that the bilinear interpolation at the edges of the region reads the same pixels as it would in the whole target image
+_WARP_ROI_MARGIN = 2
+
+# minimal fraction of the bounding box of all warped features that the features have to cover,
+# for the bounding box to be warped at once by default
+_WARP_UNION_MIN_COVERAGE = 0.5
+
 
 class ISupervisionResult(ABC):
 
@@ -71,59 +79,142 @@ class ISupervisionResult(ABC):
     def interpret(self, /, **kwargs) -> IInterpretationResult:
         raise NotImplementedError()
 
+    def _get_match_weight_array(self) -> np.ndarray:
+        """
+        Returns:
+            The weights of all matches, in the order given by `get_all_matches` of the matching result.
+        """
+
+        matches = self.matching_result.get_all_matches()
+
+        return np.fromiter((self.get_match_weight(match) for match in matches), dtype=np.float64)
+
+    def get_normalized_score(self, /) -> float:
+        """
+        Returns a measure of confidence in the result that, unlike `score`, does not depend on the supervision engine.
+        It is the fraction of matches that the supervision engine considers to be consistent with the result, weighted by their weights,
+        and is hence a value between 0 and 1.
+        """
+
+        match_weights = self._get_match_weight_array()
+
+        if match_weights.shape[0] == 0:
+            return 0.0
+
+        return float(np.minimum(match_weights, 1.0).sum() / match_weights.shape[0])
+
     def get_weighted_mse(self, /) -> float:
+        """
+        Returns the mean of the squared distances between the target points of the matches and the positions predicted for them
+        by this result, weighted by the weights of the matches. Matches with negligible weights are left out.
+        """
 
-        error = 0.0
-        singificant_match_count = 0
+        template_points, target_points = self.matching_result.get_packed_points()
+        match_weights = self._get_match_weight_array()
 
-        for match in self.matching_result.get_all_matches():
+        significant = match_weights >= sys.float_info.epsilon
+        significant_match_count = int(np.count_nonzero(significant))
 
-            match_weight = self.get_match_weight(match)
+        if significant_match_count == 0:
+            return float("inf")
 
-            if match_weight < sys.float_info.epsilon:
-                continue
+        # supervision engines may provide the parameters as arrays of arbitrary numbers, such as python fractions
+        transformation_matrix = np.asarray(self.transformation_matrix, dtype=np.float64)
+        delta = np.asarray(self.delta, dtype=np.float64)
+        delta_prime = np.asarray(self.delta_prime, dtype=np.float64)
 
-            singificant_match_count += 1
+        # the positions of the template points predicted by the affine transformation model, as computed by `translate`
+        predictions = (template_points[significant] - delta) @ transformation_matrix.T + delta_prime
 
-            s = match.template_point
+        errors = np.square(predictions - target_points[significant]).sum(axis=1)
 
-            # calculate prediction
-            p = self.translate(s)
+        return float(errors @ match_weights[significant] / significant_match_count)
 
-            # calculate destination
-            d = match.target_point
+    def _get_feature_warp_matrix(self, x: int, y: int, /) -> np.ndarray:
+        """
+        Computes the affine map taking a point of an image whose top left corner lies at the given point of the template
+        to the corresponding point of the target image. This is the inverse map expected by `cv2.warpAffine` to extract that image.
+        """
 
-            current_error = p - d
-            current_error_value = np.dot(current_error, current_error)
+        transformation_matrix = self.transformation_matrix
 
-            error += current_error_value * match_weight
+        offset = transformation_matrix @ (np.array([x, y], dtype=np.float64) - self.delta) + self.delta_prime
 
-        return error / singificant_match_count
+        # supervision engines may provide the parameters as arrays of arbitrary numbers, such as python fractions
+        return np.hstack((transformation_matrix, offset.reshape(2, 1))).astype(np.float64)
 
-    def warp_feature(self, feature: IFeature, target: np.ndarray, /) -> np.ndarray:
+    @staticmethod
+    def _warp_region(warp_matrix: np.ndarray, w: int, h: int, target: np.ndarray, /) -> np.ndarray:
 
-        target_tl = self.translate(feature.top_left)
-        target_tr = self.translate(feature.top_right)
-        target_bl = self.translate(feature.bottom_left)
-        target_br = self.translate(feature.bottom_right)
+        # the region covered by the extracted image in the target image, extended to include all pixels that the interpolation reads
+        corners = warp_matrix @ np.array([[0, w, w, 0], [0, 0, h, h], [1, 1, 1, 1]], dtype=np.float64)
 
-        dest_tl = np.array([0, 0], dtype=np.float64)
-        dest_tr = np.array([feature.w, 0], dtype=np.float64)
-        dest_br = np.array([feature.w, feature.h], dtype=np.float64)
-        dest_bl = np.array([0, feature.h], dtype=np.float64)
+        roi_x0 = max(int(np.floor(corners[0].min())) - _WARP_ROI_MARGIN, 0)
+        roi_y0 = max(int(np.floor(corners[1].min())) - _WARP_ROI_MARGIN, 0)
+        roi_x1 = min(int(np.ceil(corners[0].max())) + _WARP_ROI_MARGIN, target.shape[1])
+        roi_y1 = min(int(np.ceil(corners[1].max())) + _WARP_ROI_MARGIN, target.shape[0])
 
-        source_points = [target_tl, target_tr, target_br, target_bl]
-        destination_points = [dest_tl, dest_tr, dest_br, dest_bl]
+        if roi_x0 >= roi_x1 or roi_y0 >= roi_y1:
+            # the region lies outside of the target image entirely
+            return np.zeros((h, w, *target.shape[2:]), dtype=target.dtype)
 
-        homography = cv2.getPerspectiveTransform(np.float32(source_points), np.float32(destination_points))
+        # the region is clipped to the target image, so the pixels outside of it are filled with the same constant border as before
+        roi_warp_matrix = warp_matrix.copy()
+        roi_warp_matrix[:, 2] -= (roi_x0, roi_y0)
 
-        return cv2.warpPerspective(
-            target,
-            np.float32(homography),
-            (feature.w, feature.h),
-            flags=cv2.INTER_LINEAR
+        return cv2.warpAffine(
+            target[roi_y0:roi_y1, roi_x0:roi_x1],
+            roi_warp_matrix,
+            (w, h),
+            flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+            borderMode=cv2.BORDER_CONSTANT
         )
 
+    def warp_features(self, features: Sequence[IFeature], target: np.ndarray, /, *, union: bool | None = None) -> List[np.ndarray]:
+        """
+        Extracts the images of the given features from the target image.
+
+        Arguments:
+            features: The features to extract.
+            target: The target image.
+            union: Whether the bounding box of all the features should be extracted at once, with the images of the features
+                being cut out of it. This pays off if the features cover most of their bounding box.
+                By default, this is decided based on the area covered by the features.
+
+        Returns:
+            The images of the features, in the order of the given features.
+        """
+
+        if len(features) == 0:
+            return []
+
+        union_x0 = min(feature.x for feature in features)
+        union_y0 = min(feature.y for feature in features)
+        union_x1 = max(feature.x + feature.w for feature in features)
+        union_y1 = max(feature.y + feature.h for feature in features)
+
+        if union is None:
+            features_area = sum(feature.w * feature.h for feature in features)
+            union_area = (union_x1 - union_x0) * (union_y1 - union_y0)
+            union = len(features) > 1 and features_area >= _WARP_UNION_MIN_COVERAGE * union_area
+
+        if not union:
+            return [
+                self._warp_region(self._get_feature_warp_matrix(feature.x, feature.y), feature.w, feature.h, target)
+                for feature in features
+            ]
+
+        union_img = self._warp_region(self._get_feature_warp_matrix(union_x0, union_y0), union_x1 - union_x0, union_y1 - union_y0, target)
+
+        # the images are copied, since views of overlapping features would share their pixels, and callers may modify the images in place
+        return [
+            union_img[feature.y - union_y0:feature.y - union_y0 + feature.h, feature.x - union_x0:feature.x - union_x0 + feature.w].copy()
+            for feature in features
+        ]
+
+    def warp_feature(self, feature: IFeature, target: np.ndarray, /) -> np.ndarray:
+        return self.warp_features([feature], target, union=False)[0]
+
 
 class SupervisionResult:
 
@@ -141,6 +232,10 @@ class SupervisionResult:
         # by default, the weight is 1.
         self._match_weights: Dict[IMatch, float] = {}
 
+        # weights assigned by the supervision engine to all matches at once, in the order given by `get_all_matches` of the matching result,
+        # or None if they have not been assigned this way. The weights in `_match_weights` take precedence.
+        self._match_weight_array: np.ndarray | None = None
+
         # an optional value the supervision engine can set, representing how confident the engine is in the result
         self._score = 0.0
 
@@ -168,6 +263,21 @@ class SupervisionResult:
         assert weight >= 0
         self._match_weights[match] = weight
 
+    def set_match_weights(self, weights: np.ndarray, /):
+        """
+        Assigns weights to all matches at once, which is much faster than calling `set_match_weight` for every match.
+
+        Arguments:
+            weights: The weights of the matches, in the order given by `get_all_matches` of the matching result, as an array of shape (n,).
+        """
+
+        weights = np.asarray(weights, dtype=np.float64)
+
+        assert weights.ndim == 1
+        assert np.all(weights >= 0)
+
+        self._match_weight_array = weights
+
     def get_score(self) -> float:
         assert self._score >= 0.0
         return self._score
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from concurrent.futures import Future
 from typing import TYPE_CHECKING, Iterable
 
+from officialeye._api.future import Future
 from officialeye._api.image import IImage
 from officialeye._api.template.template_interface import ITemplate
 
@@ -39,17 +39,31 @@ class Template(ITemplate):
         Use this method only if you really want to preload the template.
         """
 
+        future = self._submit_load()
+
+        if future is not None:
+            self._complete_load(future)
+
+    def _submit_load(self) -> Future | None:
+        """ Starts loading the template, unless it has already been loaded, in which case None is returned. """
+
         if self._external_template is not None:
             # the template has already been loaded, nothing to do
-            return
+            return None
 
         # noinspection PyProtectedMember
-        future = self._context._submit_task(template_load, "Loading template...", self._path)
+        return self._context._submit_task(template_load, "Loading template...", self._path, affinity=self._path)
+
+    def _complete_load(self, future: Future, /) -> None:
+        """ Completes loading the template, given the future returned by `_submit_load`. """
 
-        self._external_template = future.result()
+        external_template = future.result()
 
-        assert self._external_template is not None
-        assert isinstance(self._external_template, ExternalTemplate)
+        assert external_template is not None
+        assert isinstance(external_template, ExternalTemplate)
+
+        if self._external_template is None:
+            self._external_template = external_template
 
     def detect_async(self, /, *, target: IImage) -> Future:
         self.load()
@@ -59,6 +73,10 @@ class Template(ITemplate):
         self.load()
         return self._external_template.detect(**kwargs)
 
+    def _get_external_template(self) -> ExternalTemplate:
+        self.load()
+        return self._external_template
+
     def get_image(self) -> IImage:
         self.load()
         return self._external_template.get_image()
@@ -1,18 +1,117 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import bisect
+import importlib.util
+import re
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
 
+import cv2
 import numpy as np
-from pytesseract import pytesseract
+from pytesseract import Output, pytesseract
 
 # noinspection PyProtectedMember
 from officialeye._api.template.interpretation import Interpretation
 
+# noinspection PyProtectedMember
+from officialeye._api_builtins.interpretation.tesseract_engine import _parse_tesseract_config, get_engine_pool
+from officialeye.error.errors.template import ErrTemplateInvalidInterpretation
+
 if TYPE_CHECKING:
     # noinspection PyProtectedMember
     from officialeye._api.template.feature import IFeature
     from officialeye.types import ConfigDict, FeatureInterpretation
 
+# page segmentation modes in which tesseract expects a single line of text, and hence cannot read multiple tiled images at once
+_SINGLE_LINE_PAGE_SEGMENTATION_MODES = frozenset((7, 8, 10, 13))
+
+_PAGE_SEGMENTATION_MODE_PATTERN = re.compile(r"--psm\s+(\d+)")
+
+# minimal height of the blank bands separating the tiled images, in pixels
+_MIN_TILE_SEPARATOR = 16
+
+# ways of running tesseract: invoking the tesseract binary for every request, or keeping a pool of persistent engine processes
+_ENGINE_PYTESSERACT = "pytesseract"
+_ENGINE_PERSISTENT = "persistent"
+_ENGINES = (_ENGINE_PYTESSERACT, _ENGINE_PERSISTENT)
+
+# level of the entries returned by `image_to_data` that correspond to individual words
+_TESSERACT_WORD_LEVEL = 5
+
+
+def _to_bgr(img: np.ndarray, /) -> np.ndarray:
+
+    if img.ndim == 2:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+
+    return img
+
+
+def _tile_images(images: Sequence[np.ndarray], /) -> Tuple[np.ndarray, List[int]]:
+    """
+    Stacks the given images on top of each other onto a white canvas, separated by blank bands at least as high as the highest image,
+    so that tesseract does not merge the text of adjacent images into the same line.
+
+    Returns:
+        The canvas, and the boundaries between the regions of the canvas belonging to the individual images,
+        i.e., the rows in the middle of the blank bands.
+    """
+
+    images = [_to_bgr(img) for img in images]
+
+    separator = max(_MIN_TILE_SEPARATOR, max(img.shape[0] for img in images))
+
+    canvas_height = sum(img.shape[0] for img in images) + separator * (len(images) + 1)
+    canvas_width = max(img.shape[1] for img in images) + 2 * separator
+
+    canvas = np.full((canvas_height, canvas_width, 3), 0xff, dtype=np.uint8)
+    boundaries: List[int] = []
+
+    y = separator
+
+    for img in images:
+        height, width = img.shape[:2]
+        canvas[y:y + height, separator:separator + width] = img
+        y += height + separator
+        boundaries.append(y - separator // 2)
+
+    # the last boundary lies below the last image, so it is not needed to tell the images apart
+    return canvas, boundaries[:-1]
+
+
+def _split_text(data: Dict[str, list], boundaries: List[int], /) -> List[str]:
+    """
+    Distributes the words recognized on a canvas of tiled images among the images, by the vertical position of the words.
+
+    Arguments:
+        data: The output of `image_to_data` for the canvas.
+        boundaries: The boundaries between the regions of the canvas belonging to the individual images.
+
+    Returns:
+        The text recognized in every image, with the words of a line separated by spaces, and the lines separated by line breaks.
+    """
+
+    # keys: lines of text recognized by tesseract, as identified by the block, paragraph and line number
+    # values: the words forming that line
+    lines: List[Dict[Tuple[int, int, int], List[str]]] = [{} for _ in range(len(boundaries) + 1)]
+
+    for i, level in enumerate(data["level"]):
+
+        word = data["text"][i].strip()
+
+        if int(level) != _TESSERACT_WORD_LEVEL or word == "":
+            continue
+
+        center_y = int(data["top"][i]) + int(data["height"][i]) / 2
+        image_index = bisect.bisect_right(boundaries, center_y)
+
+        line_key = int(data["block_num"][i]), int(data["par_num"][i]), int(data["line_num"][i])
+        lines[image_index].setdefault(line_key, []).append(word)
+
+    return ["\n".join(" ".join(words) for words in image_lines.values()) for image_lines in lines]
+
 
 class TesseractInterpretation(Interpretation):
 
@@ -24,5 +123,109 @@ class TesseractInterpretation(Interpretation):
         self._tesseract_lang = self.config.get("lang", default="eng", value_preprocessor=str)
         self._tesseract_config = self.config.get("config", default="", value_preprocessor=str)
 
+        # whether the features of a document sharing this configuration should be recognized by a single invocation of tesseract
+        self._batch = self.config.get("batch", default=False, value_preprocessor=bool)
+
+        def _preprocess_engine(v: str) -> str:
+
+            v = str(v)
+
+            if v not in _ENGINES:
+                raise ErrTemplateInvalidInterpretation(
+                    f"while loading the '{TesseractInterpretation.INTERPRETATION_ID}' interpretation method.",
+                    f"Unknown engine '{v}'. The available engines are: {', '.join(_ENGINES)}."
+                )
+
+            if v == _ENGINE_PERSISTENT and importlib.util.find_spec("tesserocr") is None:
+                raise ErrTemplateInvalidInterpretation(
+                    f"while loading the '{TesseractInterpretation.INTERPRETATION_ID}' interpretation method.",
+                    f"The '{_ENGINE_PERSISTENT}' engine requires the tesserocr package, which is not installed."
+                )
+
+            return v
+
+        def _preprocess_engine_processes(v: str) -> int:
+
+            v = int(v)
+
+            if v < 1:
+                raise ErrTemplateInvalidInterpretation(
+                    f"while loading the '{TesseractInterpretation.INTERPRETATION_ID}' interpretation method.",
+                    f"The `engine_processes` value ({v}) must be at least 1."
+                )
+
+            return v
+
+        def _preprocess_engine_timeout(v: str) -> float:
+
+            v = float(v)
+
+            if v <= 0.0:
+                raise ErrTemplateInvalidInterpretation(
+                    f"while loading the '{TesseractInterpretation.INTERPRETATION_ID}' interpretation method.",
+                    f"The `engine_timeout` value ({v}) must be positive."
+                )
+
+            return v
+
+        self._engine = self.config.get("engine", default=_ENGINE_PYTESSERACT, value_preprocessor=_preprocess_engine)
+
+        # maximal number of persistent engine processes recognizing text at the same time, in every worker
+        self._engine_processes = self.config.get("engine_processes", default=1, value_preprocessor=_preprocess_engine_processes)
+
+        # maximal time a persistent engine may spend on a single request, in seconds
+        self._engine_timeout = self.config.get("engine_timeout", default=30.0, value_preprocessor=_preprocess_engine_timeout)
+
+        if self._engine == _ENGINE_PERSISTENT:
+            try:
+                _parse_tesseract_config(self._tesseract_config)
+            except ValueError as err:
+                raise ErrTemplateInvalidInterpretation(
+                    f"while loading the '{TesseractInterpretation.INTERPRETATION_ID}' interpretation method.",
+                    f"Invalid tesseract configuration for the '{_ENGINE_PERSISTENT}' engine. {err}"
+                ) from err
+
+        page_segmentation_mode = _PAGE_SEGMENTATION_MODE_PATTERN.search(self._tesseract_config)
+
+        # the persistent engines recognize every image of a batch separately, so only the tiling is restricted to multi-line modes
+        tiles_images = self._batch and self._engine == _ENGINE_PYTESSERACT
+
+        if tiles_images and page_segmentation_mode is not None and int(page_segmentation_mode.group(1)) in _SINGLE_LINE_PAGE_SEGMENTATION_MODES:
+            raise ErrTemplateInvalidInterpretation(
+                f"while loading the '{TesseractInterpretation.INTERPRETATION_ID}' interpretation method.",
+                f"Batching is not supported in the single-line page segmentation mode {page_segmentation_mode.group(1)}."
+            )
+
     def interpret(self, feature_img: np.ndarray, feature: IFeature, /) -> FeatureInterpretation:
+
+        if self._engine == _ENGINE_PERSISTENT:
+            return self._recognize_persistently([feature_img])[0]
+
         return pytesseract.image_to_string(feature_img, lang=self._tesseract_lang, config=self._tesseract_config).strip()
+
+    def supports_batching(self) -> bool:
+        return self._batch
+
+    def is_cacheable(self) -> bool:
+        return True
+
+    def interpret_batch(self, items: Sequence[Tuple[np.ndarray, IFeature]], /) -> List[FeatureInterpretation]:
+
+        if not self._batch or len(items) <= 1:
+            return super().interpret_batch(items)
+
+        if self._engine == _ENGINE_PERSISTENT:
+            # a persistent engine has loaded its models already, so it can recognize every image separately without the overhead
+            return self._recognize_persistently([feature_img for feature_img, _ in items])
+
+        # starting tesseract and loading its models takes much longer than recognizing a few short lines of text,
+        # so all images are tiled onto a single canvas, which is recognized at once
+        canvas, boundaries = _tile_images([feature_img for feature_img, _ in items])
+
+        data = pytesseract.image_to_data(canvas, lang=self._tesseract_lang, config=self._tesseract_config, output_type=Output.DICT)
+
+        return _split_text(data, boundaries)
+
+    def _recognize_persistently(self, images: Sequence[np.ndarray], /) -> List[FeatureInterpretation]:
+        engine_pool = get_engine_pool(self._tesseract_lang, self._tesseract_config, self._engine_processes)
+        return [text.strip() for text in engine_pool.recognize(images, timeout=self._engine_timeout)]
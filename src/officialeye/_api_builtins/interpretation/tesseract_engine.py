@@ -0,0 +1,424 @@
+"""
+Module implementing a pool of persistent tesseract engines, each running in its own process.
+
+Invoking the tesseract binary for every image starts a new process, which has to load the language models before recognizing anything,
+and this usually takes much longer than the recognition itself. Instead, every engine process loads the models once through the
+tesserocr bindings, and then keeps recognizing the images it receives over its standard input, until it is closed.
+Running the engines in separate processes makes it possible to enforce a timeout on every request,
+and to replace an engine that has crashed or has been killed.
+
+This module is also the entry point of the engine processes.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import pickle
+import queue
+import shlex
+import struct
+import subprocess
+import sys
+import threading
+from typing import IO, Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from officialeye.error.errors.general import ErrGeneral, ErrOperationTimedOut
+
+# maximal time an engine process may take to start and to load the language models, in seconds
+_ENGINE_STARTUP_TIMEOUT = 60.0
+
+_MESSAGE_HEADER = struct.Struct(">I")
+
+# item put into the response queue of an engine once the engine process has closed its standard output
+_ENGINE_EXITED = object()
+
+
+class _EngineCrashed(Exception):
+    pass
+
+
+def _write_message(fh: IO[bytes], message: Any, /) -> None:
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    fh.write(_MESSAGE_HEADER.pack(len(payload)))
+    fh.write(payload)
+    fh.flush()
+
+
+def _read_message(fh: IO[bytes], /) -> Any:
+    """
+    Returns:
+        The next message read from the given stream, or `_ENGINE_EXITED` if the stream has been closed.
+    """
+
+    header = fh.read(_MESSAGE_HEADER.size)
+
+    if len(header) < _MESSAGE_HEADER.size:
+        return _ENGINE_EXITED
+
+    payload_size, = _MESSAGE_HEADER.unpack(header)
+    payload = fh.read(payload_size)
+
+    if len(payload) < payload_size:
+        return _ENGINE_EXITED
+
+    return pickle.loads(payload)
+
+
+def _parse_tesseract_config(config: str, /) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Translates the command-line options of the tesseract binary, as accepted by pytesseract, to the arguments of the tesserocr API.
+
+    Returns:
+        The keyword arguments of the tesserocr API constructor, and the tesseract variables to set.
+
+    Raises:
+        ValueError: In case an option is not supported.
+    """
+
+    api_kwargs: Dict[str, Any] = {}
+    variables: Dict[str, str] = {}
+
+    tokens = shlex.split(config)
+    token_index = 0
+
+    def _next_value(option: str) -> str:
+        nonlocal token_index
+
+        if token_index >= len(tokens):
+            raise ValueError(f"Missing the value of the '{option}' option.")
+
+        token_index += 1
+        return tokens[token_index - 1]
+
+    while token_index < len(tokens):
+        option = tokens[token_index]
+        token_index += 1
+
+        if option == "--psm":
+            api_kwargs["psm"] = int(_next_value(option))
+        elif option == "--oem":
+            api_kwargs["oem"] = int(_next_value(option))
+        elif option == "--tessdata-dir":
+            api_kwargs["path"] = _next_value(option)
+        elif option == "--dpi":
+            variables["user_defined_dpi"] = _next_value(option)
+        elif option == "-c":
+            name, separator, value = _next_value(option).partition("=")
+
+            if separator == "":
+                raise ValueError(f"Expected a 'name=value' pair after the '-c' option, got '{name}'.")
+
+            variables[name] = value
+        else:
+            raise ValueError(f"The '{option}' option is not supported by the persistent tesseract engine.")
+
+    return api_kwargs, variables
+
+
+def _to_rgb(img: np.ndarray, /) -> np.ndarray:
+    """ Converts an image with the channels in the BGR or BGRA order, as used by OpenCV, to the RGB or RGBA order expected by tesseract. """
+
+    if img.ndim == 2:
+        return img
+
+    return np.ascontiguousarray(img[:, :, [2, 1, 0, *range(3, img.shape[2])]])
+
+
+def _serve() -> None:
+    """
+    Runs an engine process. The process first receives the language and the configuration of the engine,
+    and then answers every received list of images with the list of texts recognized in them, until its standard input is closed.
+    """
+
+    # everything printed by tesseract must not interfere with the messages sent back over the standard output
+    output = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    message_input = sys.stdin.buffer
+
+    lang, config = _read_message(message_input)
+
+    try:
+        import tesserocr
+
+        api_kwargs, variables = _parse_tesseract_config(config)
+
+        api = tesserocr.PyTessBaseAPI(lang=lang, **api_kwargs)
+
+        for name, value in variables.items():
+            if not api.SetVariable(name, value):
+                raise ValueError(f"Unknown tesseract variable '{name}'.")
+    except Exception as err:
+        _write_message(output, ("error", f"{type(err).__name__}: {err}"))
+        return
+
+    _write_message(output, ("ready", None))
+
+    with api:
+        while True:
+            images = _read_message(message_input)
+
+            if images is _ENGINE_EXITED:
+                return
+
+            try:
+                texts = []
+
+                for img in images:
+                    img = _to_rgb(img)
+                    bytes_per_pixel = 1 if img.ndim == 2 else img.shape[2]
+                    api.SetImageBytes(img.tobytes(), img.shape[1], img.shape[0], bytes_per_pixel, bytes_per_pixel * img.shape[1])
+                    texts.append(api.GetUTF8Text())
+
+                response = ("ok", texts)
+            except Exception as err:
+                response = ("error", f"{type(err).__name__}: {err}")
+
+            _write_message(output, response)
+
+
+class _TesseractEngine:
+    """
+    Handle to a single engine process, which can serve one request at a time.
+    """
+
+    def __init__(self, lang: str, config: str, /):
+
+        # the engine process has to be able to import this package, even if it has not been installed
+        package_root = os.path.dirname(os.path.dirname(os.path.abspath(sys.modules["officialeye"].__file__)))
+
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(path for path in (package_root, env.get("PYTHONPATH")) if path)
+
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", __name__],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env
+        )
+
+        self._responses: queue.Queue = queue.Queue()
+
+        # the responses are read by a separate thread, because waiting for data on a pipe with a timeout is not portable
+        self._reader = threading.Thread(target=self._read_responses, name="officialeye_tesseract_engine_reader", daemon=True)
+        self._reader.start()
+
+        try:
+            self._request((lang, config), timeout=_ENGINE_STARTUP_TIMEOUT)
+        except BaseException:
+            self.kill()
+            raise
+
+    def _read_responses(self) -> None:
+
+        while True:
+            response = _read_message(self._process.stdout)
+            self._responses.put(response)
+
+            if response is _ENGINE_EXITED:
+                return
+
+    def _request(self, message: Any, /, *, timeout: float) -> Any:
+
+        try:
+            _write_message(self._process.stdin, message)
+        except (BrokenPipeError, OSError) as err:
+            raise _EngineCrashed() from err
+
+        try:
+            response = self._responses.get(timeout=timeout)
+        except queue.Empty:
+            self.kill()
+            raise ErrOperationTimedOut(
+                "while recognizing text with a persistent tesseract engine.",
+                f"The engine has not responded within {timeout:g} seconds, so it has been terminated."
+            ) from None
+
+        if response is _ENGINE_EXITED:
+            raise _EngineCrashed()
+
+        status, payload = response
+
+        if status != "ok" and status != "ready":
+            raise ErrGeneral(
+                "while recognizing text with a persistent tesseract engine.",
+                f"The engine has failed ({payload})."
+            )
+
+        return payload
+
+    def recognize(self, images: Sequence[np.ndarray], /, *, timeout: float) -> List[str]:
+        return self._request(list(images), timeout=timeout)
+
+    def is_alive(self) -> bool:
+        return self._process.poll() is None
+
+    def kill(self) -> None:
+        self._process.kill()
+        self._process.wait()
+
+    def close(self) -> None:
+        """ Asks the engine process to exit by closing its standard input, and kills it if it does not exit soon. """
+
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+
+class TesseractEnginePool:
+    """
+    Pool of identically configured engine processes. The engines are started lazily, whenever a request arrives while
+    all running engines are busy, and at most `max_engines` engines are running at the same time.
+    """
+
+    def __init__(self, lang: str, config: str, max_engines: int, /):
+
+        assert max_engines >= 1
+
+        self._lang = lang
+        self._config = config
+        self._max_engines = max_engines
+
+        self._idle_engines: List[_TesseractEngine] = []
+        self._engine_count = 0
+        self._closed = False
+
+        self._condition = threading.Condition()
+
+    def _acquire(self) -> _TesseractEngine:
+
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._idle_engines) > 0 or self._engine_count < self._max_engines)
+
+            if len(self._idle_engines) > 0:
+                return self._idle_engines.pop()
+
+            self._engine_count += 1
+
+        # the engine is started without holding the lock, since loading the language models takes a while
+        try:
+            return _TesseractEngine(self._lang, self._config)
+        except BaseException:
+            self._discard()
+            raise
+
+    def _release(self, engine: _TesseractEngine, /) -> None:
+
+        with self._condition:
+            if not self._closed:
+                self._idle_engines.append(engine)
+                self._condition.notify()
+                return
+
+        engine.close()
+
+    def _discard(self) -> None:
+        with self._condition:
+            self._engine_count -= 1
+            self._condition.notify()
+
+    def recognize(self, images: Sequence[np.ndarray], /, *, timeout: float) -> List[str]:
+        """
+        Recognizes the text in the given images using one of the engines of the pool.
+        An engine that crashes while serving the request is replaced by a new one, which retries the request once.
+
+        Arguments:
+            images: The images to recognize, each either grayscale or with three or four channels.
+            timeout: The maximal time the engine may spend on the request, in seconds.
+
+        Returns:
+            The text recognized in every image.
+
+        Raises:
+            ErrOperationTimedOut: In case the engine has not finished within the timeout. The engine is terminated.
+            ErrGeneral: In case the engine has failed to start or to recognize the images.
+        """
+
+        for attempt in range(2):
+            engine = self._acquire()
+
+            try:
+                texts = engine.recognize(images, timeout=timeout)
+            except _EngineCrashed:
+                engine.kill()
+                self._discard()
+
+                if attempt == 0:
+                    continue
+
+                raise ErrGeneral(
+                    "while recognizing text with a persistent tesseract engine.",
+                    "The engine process has exited unexpectedly. Is tesserocr properly installed?"
+                ) from None
+            except BaseException:
+                if engine.is_alive():
+                    self._release(engine)
+                else:
+                    self._discard()
+                raise
+
+            self._release(engine)
+            return texts
+
+        raise AssertionError("unreachable")
+
+    def close(self) -> None:
+        """ Closes all idle engines. Engines that are currently busy are closed as soon as they are released. """
+
+        with self._condition:
+            self._closed = True
+            idle_engines = self._idle_engines
+            self._idle_engines = []
+
+        for engine in idle_engines:
+            engine.close()
+
+
+# keys: language, configuration, and maximal number of engines
+# values: the pool of engines with these settings, shared by all interpretations in this process
+_pools: Dict[Tuple[str, str, int], TesseractEnginePool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_engine_pool(lang: str, config: str, max_engines: int, /) -> TesseractEnginePool:
+    """ Retrieves the pool of engines with the given settings, creating it if it does not exist yet. """
+
+    key = lang, config, max_engines
+
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = TesseractEnginePool(lang, config, max_engines)
+
+        return _pools[key]
+
+
+@atexit.register
+def _close_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+
+    for pool in pools:
+        pool.close()
+
+
+def _forget_pools() -> None:
+    # a forked process does not own the engines of its parent, so it has to start its own ones
+    global _pools_lock
+
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_pools)
+
+
+if __name__ == "__main__":
+    _serve()
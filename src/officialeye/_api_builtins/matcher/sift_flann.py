@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Dict, Iterable, List
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
 
 import cv2
 import numpy as np
@@ -13,13 +14,49 @@ from officialeye._api.template.match import IMatch, Match
 
 # noinspection PyProtectedMember
 from officialeye._api.template.matcher import Matcher
+
+# noinspection PyProtectedMember
+from officialeye._internal.context.singleton import get_internal_afi, get_internal_context
+
+# noinspection PyProtectedMember
+from officialeye._internal.feedback.verbosity import Verbosity
+
+# noinspection PyProtectedMember
+from officialeye._internal.template.descriptor_cache import compute_cache_key
 from officialeye.error.errors.matching import ErrMatchingInvalidEngineConfig
 
 if TYPE_CHECKING:
     # noinspection PyProtectedMember
     from officialeye._api.template.template import ITemplate
+
+    # noinspection PyProtectedMember
+    from officialeye._internal.template.internal_template import InternalTemplate
     from officialeye.types import ConfigDict
 
+_SIFT_DESCRIPTOR_SIZE = 128
+
+_NO_MATCHES = (np.empty((0, 2), dtype=int), np.empty((0, 2), dtype=int), np.empty(0, dtype=np.float64))
+
+_FLANN_INDEX_PARAMS = {
+    "algorithm": 1,
+    "trees": 5
+}
+
+_FLANN_SEARCH_PARAMS = {
+    "checks": 50
+}
+
+# maximal distance, in pixels of the downscaled target, between a target point and the estimated location of the matching template point,
+# for the match to be considered consistent with the coarse alignment of the template
+_PYRAMID_REPROJECTION_THRESHOLD = 3.0
+
+# minimal number of coarse matches consistent with the coarse alignment of the template, for the alignment to be trusted
+_PYRAMID_MIN_INLIERS = 6
+
+# minimal margin around the estimated location of a keypoint, in pixels of the downscaled target,
+# accounting for the imprecision of the coarse alignment and for the border of the image, where SIFT cannot find any keypoints
+_PYRAMID_MIN_MARGIN = 8.0
+
 
 def _preprocess_sensitivity(value: str, /) -> float:
 
@@ -40,6 +77,123 @@ def _preprocess_sensitivity(value: str, /) -> float:
     return value
 
 
+def _preprocess_pyramid_scale(value: str, /) -> float:
+
+    value = float(value)
+
+    if value <= 0.0 or value > 1.0:
+        raise ErrMatchingInvalidEngineConfig(
+            f"while loading the '{SiftFlannMatcher.MATCHER_ID}' keypoint matcher",
+            f"The `pyramid_scale` value ({value}) must be positive and cannot exceed 1.0."
+        )
+
+    return value
+
+
+def _preprocess_pyramid_margin(value: str, /) -> float:
+
+    value = float(value)
+
+    if value < 0.0:
+        raise ErrMatchingInvalidEngineConfig(
+            f"while loading the '{SiftFlannMatcher.MATCHER_ID}' keypoint matcher",
+            f"The `pyramid_margin` value ({value}) cannot be negative."
+        )
+
+    return value
+
+
+def _detect_features(img: np.ndarray, /) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the SIFT keypoints in a grayscale image.
+
+    Returns:
+        The locations of the keypoints, and their descriptors.
+        Unlike cv2.KeyPoint instances, both arrays can be cached and pickled.
+    """
+
+    # noinspection PyUnresolvedReferences
+    sift = cv2.SIFT_create()
+
+    keypoints, descriptors = sift.detectAndCompute(img, None)
+
+    points = np.array([kp.pt for kp in keypoints], dtype=np.float32).reshape(-1, 2)
+
+    if descriptors is None:
+        # no SIFT keypoints have been found
+        descriptors = np.zeros((0, _SIFT_DESCRIPTOR_SIZE), dtype=np.float32)
+
+    return points, descriptors
+
+
+def _detect_downscaled_features(img: np.ndarray, scale: float, /) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the SIFT keypoints in a downscaled version of a grayscale image.
+    The locations of the keypoints are nevertheless expressed in the coordinates of the original image.
+    """
+
+    height, width = img.shape[:2]
+    downscaled_img = cv2.resize(img, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+
+    points, descriptors = _detect_features(downscaled_img)
+
+    return (points + 0.5) / scale - 0.5, descriptors
+
+
+def _create_flann(descriptors: np.ndarray, /):
+    """ Creates a FLANN matcher with an index over the given descriptors. """
+
+    flann = cv2.FlannBasedMatcher(_FLANN_INDEX_PARAMS, _FLANN_SEARCH_PARAMS)
+
+    if descriptors.shape[0] > 0:
+        flann.add([descriptors])
+        flann.train()
+
+    return flann
+
+
+class _SiftFlannPreparedTarget:
+    """
+    Target image prepared by the matcher, shared between all templates matched against it.
+    It is very important that this class is picklable!
+    """
+
+    def __init__(self, points: np.ndarray, descriptors: np.ndarray, img: np.ndarray | None, /):
+        # the locations and the descriptors of the SIFT keypoints, found in the downscaled target in the coarse-to-fine mode
+        self.points = points
+        self.descriptors = descriptors
+
+        # the full-resolution grayscale target, only retained in the coarse-to-fine mode
+        self.img = img
+
+        # the locations and the descriptors of the SIFT keypoints in the full-resolution target, computed only once needed
+        self._full_resolution_features: Tuple[np.ndarray, np.ndarray] | None = None
+        self._full_resolution_features_lock = threading.Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_full_resolution_features_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._full_resolution_features_lock = threading.Lock()
+
+    def get_full_resolution_features(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the SIFT keypoints in the full-resolution target, which is only needed for templates that could not be located
+        in the downscaled target. The keypoints are found only once, and then shared between all such templates.
+        """
+
+        assert self.img is not None, "The full-resolution target is only retained in the coarse-to-fine mode"
+
+        with self._full_resolution_features_lock:
+            if self._full_resolution_features is None:
+                self._full_resolution_features = _detect_features(self.img)
+
+            return self._full_resolution_features
+
+
 class SiftFlannMatcher(Matcher):
 
     MATCHER_ID = "sift_flann"
@@ -49,78 +203,284 @@ class SiftFlannMatcher(Matcher):
 
         self._sensitivity = self.config.get("sensitivity", default=0.7, value_preprocessor=_preprocess_sensitivity)
 
+        # In the coarse-to-fine mode, i.e., if the scale is below 1, the template is first located roughly using the target downscaled by this factor.
+        # The features of the full-resolution target are then only computed inside the estimated locations of the keypoints,
+        # enlarged along each axis by the margin, which is relative to the extent of the estimated location along that axis.
+        self._pyramid_scale = self.config.get("pyramid_scale", default=1.0, value_preprocessor=_preprocess_pyramid_scale)
+        self._pyramid_margin = self.config.get("pyramid_margin", default=0.25, value_preprocessor=_preprocess_pyramid_margin)
+
+        # the full-resolution grayscale target, only retained in the coarse-to-fine mode
         self._img: np.ndarray | None = None
-        self._sift = None
 
-        self._keypoints_target = None
-        self._destination_target = None
+        # homography mapping the template to the target, estimated in the coarse-to-fine mode, or None if matching the whole target
+        self._alignment: np.ndarray | None = None
+
+        self._keypoints_target: np.ndarray | None = None
+        self._destination_target: np.ndarray | None = None
+        self._flann = None
         self._template: ITemplate | None = None
-        self._matches: Dict[IKeypoint, List[Match]] | None = {}
+        # keys: keypoints
+        # values: the keypoint points, the target points and the scores of the matches of the keypoint
+        self._matches: Dict[IKeypoint, Tuple[np.ndarray, np.ndarray, np.ndarray]] | None = {}
 
     def setup(self, target: np.ndarray, template: ITemplate, /) -> None:
+        self.setup_prepared(self.prepare_target(target), template)
+
+    def _is_coarse_to_fine(self) -> bool:
+        return self._pyramid_scale < 1.0
+
+    def prepare_target(self, target: np.ndarray, /) -> _SiftFlannPreparedTarget:
+        """
+        Returns:
+            The locations and the descriptors of the SIFT keypoints in the target image, together with the grayscale target image
+            in the coarse-to-fine mode. In the coarse-to-fine mode, the keypoints are found in the downscaled target.
+        """
+
+        img = cv2.cvtColor(target, cv2.COLOR_BGR2GRAY)
 
-        self._img = cv2.cvtColor(target, cv2.COLOR_BGR2GRAY)
+        if not self._is_coarse_to_fine():
+            # pre-compute the sift keypoints in the target image
+            points_target, destination_target = _detect_features(img)
+            return _SiftFlannPreparedTarget(points_target, destination_target, None)
 
-        # initialize the SIFT engine in CV2
-        # noinspection PyUnresolvedReferences
-        self._sift = cv2.SIFT_create()
+        # most of the target is typically background, so the full-resolution target is only analyzed once the keypoints have been located
+        points_target, destination_target = _detect_downscaled_features(img, self._pyramid_scale)
 
-        # pre-compute the sift keypoints in the target image
-        self._keypoints_target, self._destination_target = self._sift.detectAndCompute(self._img, None)
+        return _SiftFlannPreparedTarget(points_target, destination_target, img)
+
+    def setup_prepared(self, prepared_target: _SiftFlannPreparedTarget, template: ITemplate, /) -> None:
+
+        self._keypoints_target = prepared_target.points
+        self._destination_target = prepared_target.descriptors
+        self._img = prepared_target.img
+
+        # the index over the target descriptors is the same for all keypoints, hence it is built only once
+        self._flann = _create_flann(self._destination_target)
 
         self._template = template
 
         self._matches = {}
 
-    def match(self, keypoint: IKeypoint, /) -> None:
+        self._alignment = None
+
+        if self._img is None:
+            return
+
+        self._alignment = self._estimate_alignment(template)
+
+        if self._alignment is None:
+            get_internal_afi().info(
+                Verbosity.DEBUG,
+                f"Could not locate template '{template.identifier}' in the downscaled target, matching the full-resolution target instead."
+            )
+
+            self._keypoints_target, self._destination_target = prepared_target.get_full_resolution_features()
+            self._flann = _create_flann(self._destination_target)
+
+    def _estimate_alignment(self, template: ITemplate, /) -> np.ndarray | None:
+        """
+        Roughly locates the template in the target by matching the keypoints of the template against the downscaled target.
+
+        Returns:
+            The homography mapping the template to the full-resolution target, or None if the template could not be located.
+        """
+
+        template_points = []
+        target_points = []
+
+        for keypoint in template.keypoints:
+            points_pattern, destination_pattern = self._get_keypoint_features(keypoint, coarse=True)
+
+            for query_index, train_index, _ in self._match_descriptors(self._flann, destination_pattern, self._destination_target):
+                template_points.append(points_pattern[query_index] + keypoint.top_left)
+                target_points.append(self._keypoints_target[train_index])
+
+        if len(template_points) < _PYRAMID_MIN_INLIERS:
+            return None
+
+        homography, inlier_mask = cv2.findHomography(
+            np.array(template_points, dtype=np.float32),
+            np.array(target_points, dtype=np.float32),
+            cv2.RANSAC,
+            _PYRAMID_REPROJECTION_THRESHOLD / self._pyramid_scale
+        )
+
+        if homography is None or np.count_nonzero(inlier_mask) < _PYRAMID_MIN_INLIERS:
+            return None
+
+        return homography
+
+    def _predict_window(self, keypoint: IKeypoint, /) -> Tuple[int, int, int, int] | None:
+        """
+        Estimates the location of a keypoint in the full-resolution target, using the coarse alignment of the template.
+
+        Returns:
+            The left, top, right and bottom boundaries of the region of the target that should contain the keypoint,
+            or None if the keypoint cannot be visible in the target.
+        """
+
+        assert self._alignment is not None
+
+        corners = np.array([
+            [keypoint.x, keypoint.y, 1.0],
+            [keypoint.x + keypoint.w, keypoint.y, 1.0],
+            [keypoint.x + keypoint.w, keypoint.y + keypoint.h, 1.0],
+            [keypoint.x, keypoint.y + keypoint.h, 1.0]
+        ]) @ self._alignment.T
+
+        if np.any(corners[:, 2] <= 0.0):
+            # the keypoint would be projected through the horizon, so the alignment is implausible in its region
+            return None
+
+        corners = corners[:, :2] / corners[:, 2:]
+
+        (left, top), (right, bottom) = corners.min(axis=0), corners.max(axis=0)
+
+        min_margin = _PYRAMID_MIN_MARGIN / self._pyramid_scale
+        margin_x = max(self._pyramid_margin * (right - left), min_margin)
+        margin_y = max(self._pyramid_margin * (bottom - top), min_margin)
+
+        height, width = self._img.shape[:2]
+
+        left, top = max(0, int(np.floor(left - margin_x))), max(0, int(np.floor(top - margin_y)))
+        right, bottom = min(width, int(np.ceil(right + margin_x))), min(height, int(np.ceil(bottom + margin_y)))
+
+        if left >= right or top >= bottom:
+            return None
+
+        return left, top, right, bottom
+
+    def _compute_keypoint_features(self, keypoint: IKeypoint, /, *, coarse: bool) -> Tuple[np.ndarray, np.ndarray]:
 
         _original_pattern_image = keypoint.get_image().load()
 
         pattern = cv2.cvtColor(_original_pattern_image, cv2.COLOR_BGR2GRAY)
 
-        keypoints_pattern, destination_pattern = self._sift.detectAndCompute(pattern, None)
+        if coarse:
+            return _detect_downscaled_features(pattern, self._pyramid_scale)
 
-        index_params = {
-            "algorithm": 1,
-            "trees": 5
-        }
+        return _detect_features(pattern)
 
-        search_params = {
-            "checks": 50
-        }
+    def _load_keypoint_features(self, template: InternalTemplate, keypoint: IKeypoint, /, *, coarse: bool) -> Tuple[np.ndarray, np.ndarray]:
 
-        flann = cv2.FlannBasedMatcher(index_params, search_params)
-        matches = flann.knnMatch(destination_pattern, self._destination_target, k=2)
+        descriptor_cache = get_internal_context().get_descriptor_cache()
 
-        # we need to draw only good matches, so create a mask
-        matches_mask = [[0, 0] for _ in range(len(matches))]
+        if descriptor_cache is None:
+            return self._compute_keypoint_features(keypoint, coarse=coarse)
 
-        result: List[Match] = []
+        cache_key = compute_cache_key(
+            template.get_source_fingerprint(),
+            SiftFlannMatcher.MATCHER_ID,
+            self.config.get_dict(),
+            [keypoint.x, keypoint.y, keypoint.w, keypoint.h, coarse]
+        )
 
-        # filter matches
-        for i, (m, n) in enumerate(matches):
+        cached_arrays = descriptor_cache.load(cache_key, ("points", "descriptors"))
+
+        if cached_arrays is not None:
+            get_internal_afi().info(Verbosity.DEBUG_VERBOSE, f"Loaded descriptors of keypoint '{keypoint.identifier}' from the descriptor cache.")
+            return cached_arrays["points"], cached_arrays["descriptors"]
+
+        points_pattern, destination_pattern = self._compute_keypoint_features(keypoint, coarse=coarse)
+
+        try:
+            descriptor_cache.store(cache_key, {
+                "points": points_pattern,
+                "descriptors": destination_pattern
+            })
+        except OSError as err:
+            get_internal_afi().warn(
+                Verbosity.DEBUG,
+                f"Could not store descriptors of keypoint '{keypoint.identifier}' in the descriptor cache: {err}"
+            )
+
+        return points_pattern, destination_pattern
+
+    def _get_keypoint_features(self, keypoint: IKeypoint, /, *, coarse: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the locations and the descriptors of the SIFT keypoints found in the given template keypoint.
+        They do not depend on the target image, and are therefore computed only once per loaded template.
+        If the descriptor cache is enabled, they are also persisted on disk, so that other processes do not need to recompute them.
+
+        Arguments:
+            keypoint: The template keypoint.
+            coarse: Whether the SIFT keypoints should be found in the keypoint downscaled like the target in the coarse-to-fine mode.
+        """
+
+        template = get_internal_context().get_template(keypoint.template.identifier)
+
+        return template.get_matcher_cache_entry(
+            (SiftFlannMatcher.MATCHER_ID, keypoint.identifier, coarse),
+            lambda: self._load_keypoint_features(template, keypoint, coarse=coarse)
+        )
+
+    def get_keypoint_descriptors(self, keypoint: IKeypoint, /) -> np.ndarray:
+        # in the coarse-to-fine mode, the target descriptors are found in the downscaled target,
+        # so they are only comparable with the descriptors of the keypoint downscaled in the same way
+        _, destination_pattern = self._get_keypoint_features(keypoint, coarse=self._is_coarse_to_fine())
+        return destination_pattern
+
+    def get_target_descriptors(self, prepared_target: _SiftFlannPreparedTarget, /) -> np.ndarray:
+        # in the coarse-to-fine mode, these are the descriptors of the downscaled target
+        return prepared_target.descriptors
+
+    def _match_descriptors(self, flann, destination_pattern: np.ndarray, destination_target: np.ndarray, /) -> List[Tuple[int, int, float]]:
+        """
+        Matches the descriptors of a template keypoint against the target descriptors indexed by the given FLANN matcher.
+
+        Returns:
+            The index of the template descriptor, the index of the target descriptor, and the score, for every match passing the ratio test.
+        """
+
+        if destination_pattern.shape[0] == 0 or destination_target.shape[0] < 2:
+            # there is nothing to match
+            return []
+
+        result = []
+
+        for m, n in flann.knnMatch(destination_pattern, k=2):
 
             if m.distance >= self._sensitivity * n.distance:
                 continue
 
-            matches_mask[i] = [1, 0]
+            result.append((m.queryIdx, m.trainIdx, self._sensitivity * n.distance - m.distance))
 
-            pattern_point = keypoints_pattern[m.queryIdx].pt
-            target_point = self._keypoints_target[m.trainIdx].pt
+        return result
 
-            pattern_point_vec = np.array(pattern_point, dtype=int)
-            target_point_vec = np.array(target_point, dtype=int)
+    def match(self, keypoint: IKeypoint, /) -> None:
 
-            match = Match(
-                self._template,
-                keypoint,
-                keypoint_point=pattern_point_vec,
-                target_point=target_point_vec
-            )
+        points_pattern, destination_pattern = self._get_keypoint_features(keypoint)
+
+        assert keypoint not in self._matches
+
+        if self._alignment is None:
+            points_target = self._keypoints_target
+            good_matches = self._match_descriptors(self._flann, destination_pattern, self._destination_target)
+        else:
+            window = self._predict_window(keypoint)
+
+            if window is None:
+                self._matches[keypoint] = _NO_MATCHES
+                return
 
-            match.set_score(self._sensitivity * n.distance - m.distance)
+            # only the estimated location of the keypoint is analyzed in full resolution
+            left, top, right, bottom = window
+            points_window, destination_window = _detect_features(self._img[top:bottom, left:right])
 
-            result.append(match)
+            points_target = points_window + np.array([left, top], dtype=np.float32)
+            good_matches = self._match_descriptors(_create_flann(destination_window), destination_pattern, destination_window)
+
+        if len(good_matches) == 0:
+            self._matches[keypoint] = _NO_MATCHES
+            return
+
+        query_indices, train_indices, scores = zip(*good_matches, strict=True)
+
+        self._matches[keypoint] = (
+            points_pattern[list(query_indices)].astype(int),
+            points_target[list(train_indices)].astype(int),
+            np.array(scores, dtype=np.float64)
+        )
 
         # TODO: visualization generation
         """
@@ -141,9 +501,15 @@ class SiftFlannMatcher(Matcher):
         cv2.imwrite(f"test_{keypoint.identifier}.png", debug_image)
         """
 
-        assert keypoint not in self._matches
-        self._matches[keypoint] = result
-
     def get_matches_for_keypoint(self, keypoint: IKeypoint, /) -> Iterable[IMatch]:
+
+        keypoint_points, target_points, scores = self.get_match_arrays_for_keypoint(keypoint)
+
+        return [
+            Match(self._template, keypoint, keypoint_point=keypoint_point, target_point=target_point, score=float(score))
+            for keypoint_point, target_point, score in zip(keypoint_points, target_points, scores, strict=True)
+        ]
+
+    def get_match_arrays_for_keypoint(self, keypoint: IKeypoint, /) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         assert keypoint in self._matches
         return self._matches[keypoint]
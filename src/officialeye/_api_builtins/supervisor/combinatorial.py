@@ -22,7 +22,7 @@ from officialeye._api.template.supervisor import Supervisor
 from officialeye._api.template.template_interface import ITemplate
 
 # noinspection PyProtectedMember
-from officialeye._internal.context.singleton import get_internal_afi
+from officialeye._internal.context.singleton import get_internal_afi, get_internal_context
 
 # noinspection PyProtectedMember
 from officialeye._internal.feedback.verbosity import Verbosity
@@ -165,6 +165,9 @@ class CombinatorialSupervisor(Supervisor):
         solver.maximize(total_weight)
 
         for keypoint in template.keypoints:
+            # every iteration runs the solver, which may take a while, hence the task should be cancellable in between
+            get_internal_context().check_cancelled()
+
             keypoint_matches: List[IMatch] = list(matching_result.get_matches_for_keypoint(keypoint.identifier))
 
             if len(keypoint_matches) == 0:
@@ -222,9 +225,11 @@ class CombinatorialSupervisor(Supervisor):
                 score=model_total_weight
             )
 
-            for match in matching_result.get_all_matches():
-                match_weight = model_evaluator(self._match_weight[match])
-                _result.set_match_weight(match, match_weight)
+            # the weights are assigned to all matches at once, in the order given by `get_all_matches`
+            _result.set_match_weights(np.fromiter(
+                (float(model.eval(self._match_weight[match], model_completion=True).as_fraction()) for match in matching_result.get_all_matches()),
+                dtype=np.float64
+            ))
 
             yield _result
 
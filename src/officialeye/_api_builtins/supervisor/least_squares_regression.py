@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Iterable
+from typing import TYPE_CHECKING, Iterable, Tuple
 
 import numpy as np
 
@@ -16,13 +16,101 @@ from officialeye._api.template.supervisor import Supervisor
 # noinspection PyProtectedMember
 from officialeye._api.template.template_interface import ITemplate
 
+# noinspection PyProtectedMember
+from officialeye._internal.context.singleton import get_internal_context
+from officialeye.error.errors.supervision import ErrSupervisionInvalidEngineConfig
+
 if TYPE_CHECKING:
     from officialeye.types import ConfigDict
 
-_IND_A = 0
-_IND_B = 1
-_IND_C = 2
-_IND_D = 3
+# loss functions minimized by the regression: the sum of squared errors, or the huber loss, which is less sensitive to outliers
+_LOSS_SQUARED = "squared"
+_LOSS_HUBER = "huber"
+_LOSSES = (_LOSS_SQUARED, _LOSS_HUBER)
+
+# maximal number of entries of the (anchor, match) arrays processed at once by the huber loss, which bounds the memory usage
+_MAX_CHUNK_ENTRIES = 1 << 20
+
+# the iteratively reweighted regression stops once no match weight has changed by more than this value
+_WEIGHT_TOLERANCE = 1e-3
+
+
+def _get_statistics(template_points: np.ndarray, target_points: np.ndarray, weights: np.ndarray, /) -> np.ndarray:
+    """
+    Computes the weighted sums of the template points, the target points, and of their pairwise products,
+    from which the regression for any anchor can be derived in constant time.
+
+    Arguments:
+        template_points: Array of shape (n, 2).
+        target_points: Array of shape (n, 2).
+        weights: The weights of the matches, either shared by all anchors as an array of shape (n,),
+            or given for every anchor separately as an array of shape (a, n).
+
+    Returns:
+        An array of shape (12,) or (a, 12), holding the total weight, the weighted sums of the template and of the target points,
+        and the weighted sums of the products of template coordinates, and of target with template coordinates.
+    """
+
+    tx, ty = template_points[:, 0], template_points[:, 1]
+    dx, dy = target_points[:, 0], target_points[:, 1]
+
+    features = np.stack((np.ones_like(tx), tx, ty, dx, dy, tx * tx, tx * ty, ty * ty, dx * tx, dx * ty, dy * tx, dy * ty), axis=1)
+
+    return weights @ features
+
+
+def _solve(statistics: np.ndarray, anchor_template_points: np.ndarray, anchor_target_points: np.ndarray, /) -> np.ndarray:
+    """
+    Finds, for every anchor, the matrix A minimizing the weighted sum of the squared errors |A (s - delta) + delta' - d|^2
+    over all matches, where s and d are the template and the target points of a match, and delta and delta' are those of the anchor.
+
+    Arguments:
+        statistics: The result of `_get_statistics`, either shared by all anchors, or given for every anchor separately.
+        anchor_template_points: Array of shape (a, 2).
+        anchor_target_points: Array of shape (a, 2).
+
+    Returns:
+        Array of shape (a, 2, 2).
+    """
+
+    statistics = np.broadcast_to(statistics, (anchor_template_points.shape[0], 12))
+
+    total_weight = statistics[:, 0, np.newaxis, np.newaxis]
+    template_sum = statistics[:, 1:3]
+    target_sum = statistics[:, 3:5]
+    template_products = statistics[:, (5, 6, 6, 7)].reshape(-1, 2, 2)
+    cross_products = statistics[:, 8:12].reshape(-1, 2, 2)
+
+    s = anchor_template_points
+    d = anchor_target_points
+
+    # the sums over all matches of (s_i - delta)(s_i - delta)^T and of (d_i - delta')(s_i - delta)^T, expanded
+    template_moments = (template_products
+                        - s[:, :, np.newaxis] * template_sum[:, np.newaxis, :]
+                        - template_sum[:, :, np.newaxis] * s[:, np.newaxis, :]
+                        + total_weight * s[:, :, np.newaxis] * s[:, np.newaxis, :])
+
+    cross_moments = (cross_products
+                     - d[:, :, np.newaxis] * template_sum[:, np.newaxis, :]
+                     - target_sum[:, :, np.newaxis] * s[:, np.newaxis, :]
+                     + total_weight * d[:, :, np.newaxis] * s[:, np.newaxis, :])
+
+    # the pseudo-inverse also copes with degenerate configurations, e.g., all matches lying on a line through the anchor
+    return cross_moments @ np.linalg.pinv(template_moments, hermitian=True)
+
+
+def _get_errors(transformation_matrices: np.ndarray, template_points: np.ndarray, target_points: np.ndarray,
+                anchors: np.ndarray, /) -> np.ndarray:
+    """
+    Returns:
+        The distances between the target points and the predicted positions of the template points, for every anchor,
+        as an array of shape (a, n).
+    """
+
+    offsets = template_points[np.newaxis, :, :] - template_points[anchors, np.newaxis, :]
+    predictions = np.einsum("ajk,aik->aij", transformation_matrices, offsets) + target_points[anchors, np.newaxis, :]
+
+    return np.linalg.norm(predictions - target_points[np.newaxis, :, :], axis=2)
 
 
 class LeastSquaresRegressionSupervisor(Supervisor):
@@ -32,50 +120,128 @@ class LeastSquaresRegressionSupervisor(Supervisor):
     def __init__(self, config_dict: ConfigDict, /):
         super().__init__(LeastSquaresRegressionSupervisor.SUPERVISOR_ID, config_dict)
 
+        def _loss_preprocessor(v: str) -> str:
+
+            v = str(v)
+
+            if v not in _LOSSES:
+                raise ErrSupervisionInvalidEngineConfig(
+                    f"while loading the '{LeastSquaresRegressionSupervisor.SUPERVISOR_ID}' supervisor.",
+                    f"Unknown loss '{v}'. The available losses are: {', '.join(_LOSSES)}."
+                )
+
+            return v
+
+        self._loss = self.config.get("loss", default=_LOSS_SQUARED, value_preprocessor=_loss_preprocessor)
+
+        def _huber_threshold_preprocessor(v: str) -> float:
+
+            v = float(v)
+
+            if v <= 0.0:
+                raise ErrSupervisionInvalidEngineConfig(
+                    f"while loading the '{LeastSquaresRegressionSupervisor.SUPERVISOR_ID}' supervisor.",
+                    f"The `huber_threshold` value ({v}) must be positive."
+                )
+
+            return v
+
+        # distance between a target point and its predicted position, in pixels, beyond which the error of a match is penalized linearly
+        self._huber_threshold = self.config.get("huber_threshold", default=5.0, value_preprocessor=_huber_threshold_preprocessor)
+
+        def _max_iterations_preprocessor(v: str) -> int:
+
+            v = int(v)
+
+            if v < 1:
+                raise ErrSupervisionInvalidEngineConfig(
+                    f"while loading the '{LeastSquaresRegressionSupervisor.SUPERVISOR_ID}' supervisor.",
+                    f"The `max_iterations` value ({v}) must be at least 1."
+                )
+
+            return v
+
+        # maximal number of reweighting iterations performed with the huber loss
+        self._max_iterations = self.config.get("max_iterations", default=10, value_preprocessor=_max_iterations_preprocessor)
+
     def setup(self, template: ITemplate, matching_result: IMatchingResult, /) -> None:
         pass
 
+    def _solve_huber(self, template_points: np.ndarray, target_points: np.ndarray, anchors: np.ndarray, /) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Minimizes the huber loss for the given anchors by iteratively reweighted least squares.
+
+        Returns:
+            The transformation matrices, as an array of shape (a, 2, 2), and the final weights of the matches, as an array of shape (a, n).
+        """
+
+        weights = np.ones((anchors.shape[0], template_points.shape[0]), dtype=np.float64)
+        transformation_matrices = None
+
+        for _ in range(self._max_iterations):
+
+            transformation_matrices = _solve(
+                _get_statistics(template_points, target_points, weights),
+                template_points[anchors],
+                target_points[anchors]
+            )
+
+            errors = _get_errors(transformation_matrices, template_points, target_points, anchors)
+
+            new_weights = self._huber_threshold / np.maximum(errors, self._huber_threshold)
+            weights_converged = np.abs(new_weights - weights).max() <= _WEIGHT_TOLERANCE
+            weights = new_weights
+
+            if weights_converged:
+                break
+
+        return transformation_matrices, weights
+
     def supervise(self, template: ITemplate, matching_result: IMatchingResult, /) -> Iterable[SupervisionResult]:
 
-        match_count = matching_result.get_total_match_count()
+        anchor_template_points, anchor_target_points = matching_result.get_packed_points()
+        match_count = anchor_template_points.shape[0]
 
-        for anchor_match in matching_result.get_all_matches():
+        if match_count == 0:
+            return
 
-            delta = anchor_match.template_point
-            delta_prime = anchor_match.target_point
+        # the coordinates are centered, since the expanded sums suffer from cancellation if the coordinates are large
+        template_points = anchor_template_points - anchor_template_points.mean(axis=0)
+        target_points = anchor_target_points - anchor_target_points.mean(axis=0)
 
-            matrix = np.zeros((match_count << 1, 4), dtype=np.float64)
-            rhs = np.zeros(match_count << 1, dtype=np.float64)
+        # every match serves as the anchor of a separate regression
+        if self._loss == _LOSS_SQUARED:
+            statistics = _get_statistics(template_points, target_points, np.ones(match_count, dtype=np.float64))
+            anchor_chunk_size = match_count
+        else:
+            statistics = None
+            anchor_chunk_size = max(1, _MAX_CHUNK_ENTRIES // match_count)
 
-            for i, match in enumerate(matching_result.get_all_matches()):
-                first_constraint_id = i << 1
-                second_constraint_id = first_constraint_id + 1
+        for chunk_start in range(0, match_count, anchor_chunk_size):
+            # the reweighted regressions may take a while, hence the task should be cancellable in between
+            get_internal_context().check_cancelled()
 
-                s = match.template_point
-                d = match.target_point
+            anchors = np.arange(chunk_start, min(chunk_start + anchor_chunk_size, match_count))
 
-                matrix[first_constraint_id][_IND_A] = s[0] - delta[0]
-                matrix[first_constraint_id][_IND_B] = s[1] - delta[1]
-                rhs[first_constraint_id] = d[0] - delta_prime[0]
+            if self._loss == _LOSS_SQUARED:
+                transformation_matrices = _solve(statistics, template_points[anchors], target_points[anchors])
+                match_weights = None
+            else:
+                transformation_matrices, match_weights = self._solve_huber(template_points, target_points, anchors)
 
-                matrix[second_constraint_id][_IND_C] = s[0] - delta[0]
-                matrix[second_constraint_id][_IND_D] = s[1] - delta[1]
-                rhs[second_constraint_id] = d[1] - delta_prime[1]
+            for i, anchor in enumerate(anchors):
 
-            regression_matrix = matrix.T @ matrix
-            regression_matrix = np.linalg.inv(regression_matrix)
-            rhs_applied = matrix.T @ rhs
-            x = regression_matrix @ rhs_applied
+                _result = SupervisionResult(
+                    delta=anchor_template_points[anchor],
+                    delta_prime=anchor_target_points[anchor],
+                    transformation_matrix=transformation_matrices[i]
+                )
 
-            transformation_matrix = np.array([
-                [x[_IND_A], x[_IND_B]],
-                [x[_IND_C], x[_IND_D]]
-            ])
+                if match_weights is not None:
+                    # the matches consistent with the transformation have a weight of one, whereas the weights of the outliers decay
+                    _result.set(score=float(match_weights[i].sum()))
 
-            _result = SupervisionResult(
-                delta=delta,
-                delta_prime=delta_prime,
-                transformation_matrix=transformation_matrix
-            )
+                    # the row is copied, so that the result does not keep the weights of the whole chunk of anchors alive
+                    _result.set_match_weights(match_weights[i].copy())
 
-            yield _result
+                yield _result
@@ -9,7 +9,7 @@ import cv2
 import numpy as np
 from rich.prompt import Confirm
 
-from officialeye import Context
+from officialeye import Backend, Context
 from officialeye.__version__ import __ascii_logo__
 from officialeye._cli.ui import TerminalUI, Verbosity
 
@@ -27,13 +27,28 @@ class CLIContext:
         self.verbosity = Verbosity.QUIET
         self.disable_logo = False
 
+        # None indicates that the descriptor cache is disabled
+        self.descriptor_cache_path = None
+
+        self.backend = Backend.PROCESS
+
+        # None indicates that the default number of workers of the backend is used
+        self.max_workers = None
+
+        self.interpretation_threads = 1
+
+        # None indicates that the interpretation cache is disabled
+        self.interpretation_cache_path = None
+
         self._export_counter = 1
         self._not_deleted_temporary_files: List[str] = []
 
         self.set_params(**kwargs)
 
     def set_params(self, /, *, handle_exceptions: bool | None = None, visualization_generation: bool | None = None,
-                   export_directory: str | None = None, verbosity: Verbosity | None = None, disable_logo: bool | None = None):
+                   export_directory: str | None = None, verbosity: Verbosity | None = None, disable_logo: bool | None = None,
+                   descriptor_cache_path: str | None = None, backend: Backend | None = None, max_workers: int | None = None,
+                   interpretation_threads: int | None = None, interpretation_cache_path: str | None = None):
         if handle_exceptions is not None:
             self.handle_exceptions = handle_exceptions
 
@@ -47,6 +62,18 @@ class CLIContext:
         if disable_logo is not None:
             self.disable_logo = disable_logo
 
+        if descriptor_cache_path is not None:
+            self.descriptor_cache_path = descriptor_cache_path
+
+        if backend is not None:
+            self.backend = backend
+        if max_workers is not None:
+            self.max_workers = max_workers
+        if interpretation_threads is not None:
+            self.interpretation_threads = interpretation_threads
+        if interpretation_cache_path is not None:
+            self.interpretation_cache_path = interpretation_cache_path
+
     def __enter__(self):
         assert self._api is None
         assert self._ui is None
@@ -55,7 +82,8 @@ class CLIContext:
         assert len(self._not_deleted_temporary_files) == 0
 
         self._ui = TerminalUI(self.verbosity)
-        self._api = Context(afi=self._ui)
+        self._api = Context(afi=self._ui, descriptor_cache_path=self.descriptor_cache_path, backend=self.backend, max_workers=self.max_workers,
+                            interpretation_threads=self.interpretation_threads, interpretation_cache_path=self.interpretation_cache_path)
 
         return self
 
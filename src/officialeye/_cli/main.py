@@ -6,6 +6,7 @@ from typing import List
 
 import click
 
+from officialeye import Backend
 from officialeye.__version__ import __github_full_url__, __github_url__, __version__
 from officialeye._cli.context import CLIContext
 from officialeye._cli.create import do_create
@@ -24,7 +25,17 @@ _context = CLIContext()
 @click.option("-v", "--verbose", is_flag=True, show_default=True, default=False, help="Enable verbose logging.")
 @click.option("-dl", "--disable-logo", is_flag=True, show_default=True, default=False, help="Disable the officialeye logo.")
 @click.option("-re", "--raw-errors", is_flag=True, show_default=False, default=False, help="Do not handle errors.")
-def main(debug: bool, edir: str, quiet: bool, verbose: bool, disable_logo: bool, raw_errors: bool):
+@click.option("--cache-dir", type=click.Path(file_okay=False, writable=True), default=None,
+              help="Specify the directory in which template descriptors are cached. By default, they are not cached on disk.")
+@click.option("--backend", type=click.Choice([backend.value for backend in Backend]), show_default=True, default=Backend.PROCESS.value,
+              help="Specify where the analysis tasks are executed.")
+@click.option("-j", "--workers", type=click.IntRange(min=1), default=None, help="Specify the maximal number of tasks executed at the same time.")
+@click.option("--interpretation-threads", type=click.IntRange(min=1), show_default=True, default=1,
+              help="Specify the maximal number of features of a document interpreted at the same time.")
+@click.option("--interpretation-cache", type=click.Path(dir_okay=False, writable=True), default=None,
+              help="Specify the SQLite database in which interpretations of features are cached.")
+def main(debug: bool, edir: str, quiet: bool, verbose: bool, disable_logo: bool, raw_errors: bool, cache_dir: str | None,
+         backend: str, workers: int | None, interpretation_threads: int, interpretation_cache: str | None):
     global _context
 
     # configure context
@@ -46,7 +57,12 @@ def main(debug: bool, edir: str, quiet: bool, verbose: bool, disable_logo: bool,
         export_directory=edir,
         handle_exceptions=not raw_errors,
         verbosity=verbosity,
-        disable_logo=disable_logo
+        disable_logo=disable_logo,
+        descriptor_cache_path=cache_dir,
+        backend=Backend(backend),
+        max_workers=workers,
+        interpretation_threads=interpretation_threads,
+        interpretation_cache_path=interpretation_cache
     )
 
 
@@ -8,7 +8,7 @@ from rich.panel import Panel
 from rich.table import Table
 
 # noinspection PyProtectedMember
-from officialeye._api.detection import detect
+from officialeye._api.detection import detect_and_interpret
 
 # noinspection PyProtectedMember
 from officialeye._api.image import Image
@@ -39,9 +39,9 @@ def do_run(context: CLIContext, /, *, target_path: str, template_paths: List[str
 
     templates = [Template(api_context, path=template_path) for template_path in template_paths]
 
-    result = detect(api_context, *templates, target=target_image)
-
-    interpretation_result = result.interpret(target=interpretation_target_image)
+    result, interpretation_result = detect_and_interpret(
+        api_context, *templates, target=target_image, interpretation_target=interpretation_target_image
+    )
 
     table = Table(title="Feature interpretations")
 
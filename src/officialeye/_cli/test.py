@@ -65,8 +65,9 @@ def do_test(context: CLIContext, /, *,
     visualization = _get_background(context, result.template)
     target_image_mat = target_image.load()
 
-    for feature in result.template.features:
-        feature_image_mat = result.warp_feature(feature, target_image_mat)
+    features = list(result.template.features)
+
+    for feature, feature_image_mat in zip(features, result.warp_features(features, target_image_mat), strict=True):
 
         assert feature_image_mat.shape == (feature.h, feature.w, 3)
 
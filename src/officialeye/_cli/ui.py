@@ -224,10 +224,11 @@ class _ChildrenListener:
             self._children_listener = Thread(target=_child_listener, name="Child Process Listener", args=(self,))
             self._children_listener.start()
 
-    def stop_listening_to(self, child_id: int, /):
+    def stop_listening_to(self, child_id: int, /, *, graceful: bool = True):
 
         # we first attempt to wait until the child listener thread has done processing all messages sent by the child
         # in other words we want to try and gracefully stop listening to the child
+        # this is pointless if the child has never started its work, which is the case for cancelled tasks
 
         with self.children_lock:
 
@@ -240,25 +241,26 @@ class _ChildrenListener:
 
             _child = self.children[child_id]
 
+            child_lock = _child.is_being_listened_to
+
+        if graceful:
             self._terminal_ui.info(
                 Verbosity.DEBUG,
                 f"Waiting for all messages from child {child_id} to be processed by the child listener thread."
             )
 
-            child_lock = _child.is_being_listened_to
-
-        if child_lock.acquire(blocking=True, timeout=4):
-            child_lock.release()
+            if child_lock.acquire(blocking=True, timeout=4):
+                child_lock.release()
 
-            self._terminal_ui.info(
-                Verbosity.DEBUG,
-                f"The child listener thread indicated that it has processed all messages from child {child_id}."
-            )
-        else:
-            self._terminal_ui.warn(
-                Verbosity.DEBUG,
-                f"The child listener thread did not indicate that it has processed all messages from child {child_id}!"
-            )
+                self._terminal_ui.info(
+                    Verbosity.DEBUG,
+                    f"The child listener thread indicated that it has processed all messages from child {child_id}."
+                )
+            else:
+                self._terminal_ui.warn(
+                    Verbosity.DEBUG,
+                    f"The child listener thread did not indicate that it has processed all messages from child {child_id}!"
+                )
 
         # we now proceed with removing the child completely
 
@@ -461,4 +463,4 @@ class TerminalUI(AbstractFeedbackInterface):
 
         self.info(Verbosity.DEBUG_VERBOSE, f"AbstractFeedbackInterface: join() of child #{child_id}")
 
-        self._children_listener.stop_listening_to(child_id)
+        self._children_listener.stop_listening_to(child_id, graceful=not future.cancelled())
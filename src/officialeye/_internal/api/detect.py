@@ -1,27 +1,112 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
-
-import cv2
-import numpy as np
+from typing import TYPE_CHECKING, List
 
 from officialeye._internal.context.singleton import get_internal_context
+from officialeye._internal.image_transport import ImageSource, open_image
+from officialeye._internal.template.prepared_target import PreparedTarget
 from officialeye._internal.template.schema.loader import load_template
+from officialeye._internal.template.template_index import TemplateVotes
+from officialeye._internal.template.template_signature import TemplateSignature
 
 if TYPE_CHECKING:
     from officialeye._internal.template.external_supervision_result import ExternalSupervisionResult
     from officialeye._internal.template.internal_supervision_result import InternalSupervisionResult
+    from officialeye._internal.template.internal_template import InternalTemplate
+
+
+def target_prepare(template_path: str, /, *, target: ImageSource, **kwargs) -> PreparedTarget:
+
+    with get_internal_context().setup(**kwargs):
+        template = load_template(template_path)
+
+        with open_image(target) as target_img:
+            return PreparedTarget(template.get_target_preparation_key(), template.prepare_target(target_img))
+
+
+def template_get_signature(template_path: str, /, **kwargs) -> TemplateSignature:
+
+    with get_internal_context().setup(**kwargs):
+        template = load_template(template_path)
+        return TemplateSignature(template.get_signature())
+
+
+def templates_route(template_paths: List[str], /, *, prepared_target: PreparedTarget, **kwargs) -> TemplateVotes:
+
+    with get_internal_context().setup(**kwargs):
+        templates = [load_template(template_path) for template_path in template_paths]
+
+        for template in templates:
+            assert template.get_target_preparation_key() == prepared_target.preparation_key
+
+        if prepared_target.data is None:
+            # the matcher does not support preparing target images, and hence neither descriptor-based routing
+            return TemplateVotes(None)
+
+        template_index = get_internal_context().get_template_index(templates)
+        target_descriptors = templates[0].get_matcher().get_target_descriptors(prepared_target.data)
+
+        return template_index.vote(target_descriptors)
+
+
+def _do_detect(template: InternalTemplate, target: ImageSource, prepared_target: PreparedTarget | None, /) -> InternalSupervisionResult:
+
+    if prepared_target is not None and prepared_target.data is not None:
+        assert prepared_target.preparation_key == template.get_target_preparation_key()
+        # the target image has already been prepared, so there is no need to load it
+        return template.do_detect(None, prepared_target=prepared_target.data)
+
+    with open_image(target) as target_img:
+        return template.do_detect(target_img)
+
+
+def template_detect(template_path: str, /, *, target: ImageSource, prepared_target: PreparedTarget | None = None,
+                    **kwargs) -> ExternalSupervisionResult:
+
+    from officialeye._internal.template.external_supervision_result import ExternalSupervisionResult
+
+    with get_internal_context().setup(**kwargs):
+        template = load_template(template_path)
+        return ExternalSupervisionResult(_do_detect(template, target, prepared_target))
+
+
+def template_detect_and_interpret(template_path: str, /, *, target: ImageSource, interpretation_target: ImageSource | None = None,
+                                  prepared_target: PreparedTarget | None = None, interpretation_threads: int = 1,
+                                  **kwargs) -> ExternalSupervisionResult:
+    """
+    Finds the template in the target image and interprets its features right away, sparing the round trip of the supervision result
+    between the workers and the main process, as well as loading the template and the target image once more.
 
+    Arguments:
+        template_path: Path to the template.
+        target: The target image.
+        interpretation_target: The image the features should be interpreted in, or None if they should be interpreted in the target image.
+        prepared_target: The target image prepared by a template with the same target preparation key, if any.
+        interpretation_threads: The maximal number of features interpreted at the same time.
+        kwargs: Arguments of `InternalContext.setup`.
 
-def template_detect(template_path: str, /, *, target_path: str, **kwargs) -> ExternalSupervisionResult:
+    Returns:
+        The supervision result, carrying the interpretation result.
+    """
 
+    from officialeye._internal.api.interpret import interpret_features
     from officialeye._internal.template.external_supervision_result import ExternalSupervisionResult
 
     with get_internal_context().setup(**kwargs):
         template = load_template(template_path)
 
-        target: np.ndarray = cv2.imread(target_path, cv2.IMREAD_COLOR)
+        if interpretation_target is None:
+            with open_image(target) as target_img:
+                internal_supervision_result = _do_detect(template, target_img, prepared_target)
+                interpretation_result = interpret_features(
+                    template, internal_supervision_result, target_img, max_threads=interpretation_threads
+                )
+        else:
+            internal_supervision_result = _do_detect(template, target, prepared_target)
 
-        internal_supervision_result: InternalSupervisionResult = template.do_detect(target)
+            with open_image(interpretation_target) as interpretation_target_img:
+                interpretation_result = interpret_features(
+                    template, internal_supervision_result, interpretation_target_img, max_threads=interpretation_threads
+                )
 
-        return ExternalSupervisionResult(internal_supervision_result)
+        return ExternalSupervisionResult(internal_supervision_result, interpretation_result=interpretation_result)
@@ -1,29 +1,120 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
-
-import cv2
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Tuple
 
 from officialeye._internal.context.singleton import get_internal_context
+from officialeye._internal.image_transport import ImageSource, open_image
 
 # noinspection PyProtectedMember
 from officialeye._internal.template.external_interpretation_result import ExternalInterpretationResult
+from officialeye._internal.template.internal_feature import interpret_feature_images
 from officialeye._internal.template.schema.loader import load_template
 
 if TYPE_CHECKING:
+    import numpy as np
+
+    # noinspection PyProtectedMember
+    from officialeye._api.template.interpretation import IInterpretation
+
     # noinspection PyProtectedMember
     from officialeye._api.template.supervision_result import ISupervisionResult
+    from officialeye._internal.template.internal_feature import InternalFeature
+    from officialeye._internal.template.internal_template import InternalTemplate
+    from officialeye.types import FeatureInterpretation
+
+
+def _interpret_features_at_once(feature_images: Dict[str, np.ndarray], unit: Tuple[IInterpretation, str, List[InternalFeature]],
+                                /) -> List[FeatureInterpretation]:
+
+    get_internal_context().check_cancelled()
+
+    interpretation, interpretation_key, features = unit
+
+    items = [(feature.apply_mutators_to_image(feature_images[feature.identifier]), feature) for feature in features]
+
+    return interpret_feature_images(interpretation, interpretation_key, items)
+
+
+def interpret_features(template: InternalTemplate, supervision_result: ISupervisionResult, interpretation_target: np.ndarray, /, *,
+                       max_threads: int = 1) -> ExternalInterpretationResult:
+    """
+    Warps every feature of the template that has a feature class out of the interpretation target image, and interprets it.
+    Features interpreted by identically configured interpretation methods that support batching are interpreted all at once.
+
+    Arguments:
+        template: The template the supervision result has been obtained for.
+        supervision_result: The supervision result describing where the template is located in the target image.
+        interpretation_target: The image the features should be warped from, having the same shape as the target image.
+        max_threads: The maximal number of features, or batches of features, interpreted at the same time.
+            The features are independent of each other, and interpretation methods such as OCR spend most of their time
+            waiting for external programs, so threads suffice.
+    """
+
+    # every unit of work consists of an interpretation method, its interpretation key, and the features it interprets at once
+    units: List[Tuple[IInterpretation, str, List[InternalFeature]]] = []
+
+    # keys: interpretation keys of features whose interpretation method supports batching
+    # values: the unit of work interpreting these features
+    batches: Dict[str, Tuple[IInterpretation, str, List[InternalFeature]]] = {}
+
+    for feature in template.features:
+
+        if feature.get_feature_class() is None:
+            continue
+
+        interpretation = feature.get_interpretation()
+        interpretation_key = feature.get_interpretation_key()
+
+        if not interpretation.supports_batching():
+            units.append((interpretation, interpretation_key, [feature]))
+            continue
+
+        if interpretation_key not in batches:
+            batches[interpretation_key] = (interpretation, interpretation_key, [])
+            units.append(batches[interpretation_key])
+
+        batches[interpretation_key][2].append(feature)
+
+    # all features are warped at once, so that the warping can be shared by features lying close to each other
+    interpreted_features = [feature for _, _, features in units for feature in features]
+
+    feature_images = {
+        feature.identifier: feature_img
+        for feature, feature_img in zip(interpreted_features, supervision_result.warp_features(interpreted_features, interpretation_target),
+                                        strict=True)
+    }
+
+    interpret = functools.partial(_interpret_features_at_once, feature_images)
+
+    if max_threads == 1 or len(units) <= 1:
+        unit_interpretations = [interpret(unit) for unit in units]
+    else:
+        executor = ThreadPoolExecutor(max_workers=min(max_threads, len(units)), thread_name_prefix="officialeye_interpretation")
+
+        try:
+            unit_interpretations = list(executor.map(get_internal_context().bind_task(interpret), units))
+        finally:
+            # in case the interpretation of a feature has failed, the features whose interpretation has not yet started are abandoned
+            executor.shutdown(cancel_futures=True)
+
+    feature_interpretation_dict = {}
+
+    for (_, _, features), interpretations in zip(units, unit_interpretations, strict=True):
+        for feature, interpretation in zip(features, interpretations, strict=True):
+            feature_interpretation_dict[feature.identifier] = interpretation
+
+    return ExternalInterpretationResult(template, feature_interpretation_dict)
 
 
 def template_interpret(template_path: str, supervision_result: ISupervisionResult, /, *,
-                       interpretation_target_path: str, **kwargs) -> ExternalInterpretationResult:
+                       interpretation_target: ImageSource, interpretation_threads: int = 1, **kwargs) -> ExternalInterpretationResult:
 
-    with get_internal_context().setup(**kwargs):
+    with get_internal_context().setup(**kwargs), open_image(interpretation_target) as interpretation_target:
 
         template = load_template(template_path)
 
-        interpretation_target = cv2.imread(interpretation_target_path, cv2.IMREAD_COLOR)
-
         # TODO: make sure that the target image and the interpretation target images have the same shape, similar to the following snippet
         """
             if target.shape != interpretation_target.shape:
@@ -34,19 +125,4 @@ def template_interpret(template_path: str, supervision_result: ISupervisionResul
                 )
         """
 
-        feature_interpretation_dict = {}
-
-        for feature in template.features:
-
-            feature_class = feature.get_feature_class()
-
-            if feature_class is None:
-                continue
-
-            feature_img = supervision_result.warp_feature(feature, interpretation_target)
-            feature_img_mutated = feature.apply_mutators_to_image(feature_img)
-            interpretation = feature.interpret_image(feature_img_mutated)
-
-            feature_interpretation_dict[feature.identifier] = interpretation
-
-        return ExternalInterpretationResult(template, feature_interpretation_dict)
+        return interpret_features(template, supervision_result, interpretation_target, max_threads=interpretation_threads)
@@ -0,0 +1,39 @@
+from typing import List
+
+from officialeye._internal.context.singleton import get_internal_context
+from officialeye._internal.feedback.dummy import DummyFeedbackInterface
+from officialeye._internal.feedback.verbosity import Verbosity
+from officialeye._internal.template.schema.loader import load_template
+from officialeye.error.error import OEError
+
+
+def worker_initialize(template_paths: List[str], /, *, install_registries: bool, context_key: str, **kwargs) -> None:
+    """
+    Initializes a worker, before it runs any tasks.
+
+    Arguments:
+        template_paths: Paths to templates that should be loaded in advance, together with the descriptors of their keypoints.
+        install_registries: Whether the given registries should be installed for all tasks subsequently run by the worker process.
+            This must only be done if the worker process is not shared with other contexts.
+        context_key: Key of the api context the worker runs tasks for.
+        kwargs: The registries of factories and the descriptor cache path, as passed to `InternalContext.setup`.
+    """
+
+    if install_registries:
+        get_internal_context().install(**kwargs)
+
+    for template_path in template_paths:
+        try:
+            with get_internal_context().setup(afi=DummyFeedbackInterface(), context_key=context_key, **kwargs):
+                template = load_template(template_path)
+                matcher = template.get_matcher()
+
+                for keypoint in template.keypoints:
+                    matcher.get_keypoint_descriptors(keypoint)
+        except (OEError, OSError) as err:
+            # An exception escaping the initializer would break the whole pool of workers.
+            # The initializer has no feedback interface of its own, so the first task run by the worker reports the problem,
+            # while the error itself is raised again as soon as a task attempts to load the same template.
+            problem_text = err.problem_text if isinstance(err, OEError) else str(err)
+
+            get_internal_context().defer_warning(Verbosity.INFO_VERBOSE, f"Could not preload the template at '{template_path}': {problem_text}")
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from contextlib import suppress
+from multiprocessing.shared_memory import SharedMemory
+
+
+class CancellationToken:
+    """
+    Token used by the main process to ask tasks that are already running in worker processes to stop as soon as possible.
+    The tasks are expected to check the token at the boundaries of their phases.
+    It is very important that this class is picklable!
+
+    The token is a flag stored in a shared memory segment, which the worker processes attach to by its name.
+    Unlike the file descriptors of a pipe, the segment is not tied to the worker processes that happen to be forked while the token exists.
+    """
+
+    def __init__(self):
+        # the segment created by the main process, None in copies of the token received by worker processes
+        self._shm: SharedMemory | None = SharedMemory(create=True, size=1)
+        self._shm.buf[0] = 0
+
+        self._name: str = self._shm.name
+
+        # the segment attached to by a worker process, None until the worker checks the token for the first time
+        self._attached_shm: SharedMemory | None = None
+
+        self._cancelled = False
+
+    def __getstate__(self):
+        # the receiving process attaches to the segment by its name
+        return {"_shm": None, "_name": self._name, "_attached_shm": None, "_cancelled": False}
+
+    def cancel(self) -> None:
+        """ Requests the cancellation of all tasks having access to this token. Can only be called in the process that created the token. """
+
+        assert self._shm is not None, "Only the process that has created the cancellation token may cancel it"
+
+        if self._cancelled:
+            return
+
+        self._cancelled = True
+        self._shm.buf[0] = 1
+
+    def is_cancelled(self) -> bool:
+
+        if self._cancelled:
+            return True
+
+        if self._shm is not None:
+            self._cancelled = self._shm.buf[0] != 0
+            return self._cancelled
+
+        if self._attached_shm is None:
+            try:
+                self._attached_shm = SharedMemory(name=self._name)
+            except FileNotFoundError:
+                # the main process has already closed the token, so the result of the task is no longer needed
+                self._cancelled = True
+                return True
+
+        self._cancelled = self._attached_shm.buf[0] != 0
+
+        return self._cancelled
+
+    def close(self) -> None:
+        """
+        Releases the resources held by the token, which implicitly cancels all tasks that are still running.
+        Can only be called in the process that created the token.
+        """
+
+        assert self._shm is not None, "Only the process that has created the cancellation token may close it"
+
+        # the tasks that have already attached to the segment keep seeing it, while the other ones find it missing
+        self.cancel()
+
+        self._shm.close()
+
+        with suppress(FileNotFoundError):
+            self._shm.unlink()
+
+    def release(self) -> None:
+        """
+        Releases the resources held by a copy of the token received by a worker process.
+        Does nothing if called on the original token, which happens when the task runs in the process that created the token.
+        """
+
+        if self._attached_shm is not None:
+            self._attached_shm.close()
+            self._attached_shm = None
@@ -1,18 +1,22 @@
 # needed to not break type annotations if we are not in type checking mode
 from __future__ import annotations
 
+import threading
 from types import TracebackType
-from typing import TYPE_CHECKING, Dict
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple, TypeVar
 
+from officialeye._internal.context.cancellation import CancellationToken
 from officialeye._internal.feedback.abstract import AbstractFeedbackInterface
 from officialeye._internal.feedback.dummy import DummyFeedbackInterface
 from officialeye._internal.feedback.verbosity import Verbosity
+from officialeye._internal.template.descriptor_cache import DescriptorCache
+from officialeye._internal.template.interpretation_cache import InterpretationCache
+from officialeye._internal.template.template_index import TemplateIndex
 from officialeye.error.error import OEError
-from officialeye.error.errors.general import ErrInvalidKey
+from officialeye.error.errors.general import ErrInvalidKey, ErrOperationCancelled
 from officialeye.error.errors.template import ErrTemplateIdNotUnique
 
 if TYPE_CHECKING:
-    # noinspection PyProtectedMember
     # noinspection PyProtectedMember
     from officialeye._api.mutator import IMutator
     from officialeye._api.template.interpretation import IInterpretation
@@ -26,38 +30,145 @@ if TYPE_CHECKING:
     from officialeye.types import ConfigDict, InterpretationFactory, MatcherFactory, MutatorFactory, SupervisorFactory
 
 
-class InternalContext:
+_T = TypeVar("_T")
+
+
+class _TaskState(threading.local):
+    """
+    State of the task that is currently being run by a thread of a worker.
+    With the thread backend, multiple tasks run concurrently in the same process, so this state must not be shared between threads.
+    """
 
     def __init__(self):
-        self._afi = DummyFeedbackInterface()
+        self.afi: AbstractFeedbackInterface = DummyFeedbackInterface()
+
+        self.mutator_factories: Dict[str, MutatorFactory] = {}
+        self.matcher_factories: Dict[str, MatcherFactory] = {}
+        self.supervisor_factories: Dict[str, SupervisorFactory] = {}
+        self.interpretation_factories: Dict[str, InterpretationFactory] = {}
+
+        # None indicates that the persistent descriptor cache is disabled
+        self.descriptor_cache: DescriptorCache | None = None
+
+        # None indicates that the interpretation cache is disabled
+        self.interpretation_cache: InterpretationCache | None = None
+
+        # None indicates that the current task cannot be cancelled once it is running
+        self.cancellation_token: CancellationToken | None = None
 
-        self._mutator_factories: Dict[str, MutatorFactory] = {}
-        self._matcher_factories: Dict[str, MatcherFactory] = {}
-        self._supervisor_factories: Dict[str, SupervisorFactory] = {}
-        self._interpretation_factories: Dict[str, InterpretationFactory] = {}
+        # identifies the api context that has submitted the current task, None if no task is running
+        self.context_key: str | None = None
 
+
+class _ContextTemplates:
+    """
+    Templates loaded on behalf of a single api context. Every api context has its own templates,
+    because api contexts running their tasks in the same process may have different registries installed.
+    """
+
+    def __init__(self):
         # keys: template ids
         # values: template
-        self._loaded_templates: Dict[str, InternalTemplate] = {}
+        self.loaded_templates: Dict[str, InternalTemplate] = {}
 
         # keys: paths to templates
         # values: corresponding template ids
-        self._template_ids: Dict[str, str] = {}
+        self.template_ids: Dict[str, str] = {}
+
+        # keys: sorted tuples of ids of the indexed templates
+        # values: combined descriptor index over the keypoints of those templates
+        self.template_indices: Dict[Tuple[str, ...], TemplateIndex] = {}
+
+
+class InternalContext:
+
+    def __init__(self):
+        self._task = _TaskState()
+
+        # guards the caches of loaded templates and template indices, which are shared by all threads of the process
+        self._templates_lock = threading.RLock()
+
+        # keys: keys of the api contexts that have run tasks in this process
+        # values: templates loaded on behalf of that api context
+        self._context_templates: Dict[str | None, _ContextTemplates] = {}
+
+        # registries installed once for the whole lifetime of a worker process,
+        # used by the tasks that do not carry their own registries
+        # None indicates that no registries have been installed
+        self._installed_registries: Dict[str, any] | None = None
+
+        # keys: maximal number of entries held in memory, and path to the on-disk tier
+        # values: interpretation cache with these settings, shared by all tasks of the process, so that the in-memory tier outlives the tasks
+        self._interpretation_caches: Dict[Tuple[int, str | None], InterpretationCache] = {}
+        self._interpretation_caches_lock = threading.Lock()
+
+        # warnings that have arisen while no task was running, such as while initializing the worker,
+        # to be reported by the next task that has a feedback interface to report them to
+        self._deferred_warnings: List[Tuple[Verbosity, str]] = []
+        self._deferred_warnings_lock = threading.Lock()
+
+    def install(self, /, *, mutator_factories: Dict[str, MutatorFactory], matcher_factories: Dict[str, MatcherFactory],
+                supervisor_factories: Dict[str, SupervisorFactory], interpretation_factories: Dict[str, InterpretationFactory],
+                descriptor_cache_path: str | None = None, interpretation_cache_size: int = 0,
+                interpretation_cache_path: str | None = None) -> None:
+        """
+        Installs the registries of factories, as well as the settings of the caches, for all tasks subsequently run by this process.
+        This spares the main process from sending the registries along with every single task.
+        """
+
+        self._installed_registries = {
+            "mutator_factories": mutator_factories,
+            "matcher_factories": matcher_factories,
+            "supervisor_factories": supervisor_factories,
+            "interpretation_factories": interpretation_factories,
+            "descriptor_cache_path": descriptor_cache_path,
+            "interpretation_cache_size": interpretation_cache_size,
+            "interpretation_cache_path": interpretation_cache_path
+        }
+
+    def setup(self, /, *, afi: AbstractFeedbackInterface, mutator_factories: Dict[str, MutatorFactory] | None = None,
+              matcher_factories: Dict[str, MatcherFactory] | None = None, supervisor_factories: Dict[str, SupervisorFactory] | None = None,
+              interpretation_factories: Dict[str, InterpretationFactory] | None = None, descriptor_cache_path: str | None = None,
+              interpretation_cache_size: int = 0, interpretation_cache_path: str | None = None,
+              cancellation_token: CancellationToken | None = None, context_key: str | None = None) -> InternalContext:
+        """
+        Prepares the context for running a task in the current thread.
+        The registries of factories and the settings of the caches should either all be given, or all be omitted,
+        in which case the ones previously installed with the `install` method are used.
+        The templates loaded by the task are only visible to the tasks carrying the same context key.
+        """
 
-    def setup(self, /, *, afi: AbstractFeedbackInterface, mutator_factories: Dict[str, MutatorFactory],
-              matcher_factories: Dict[str, MatcherFactory], supervisor_factories: Dict[str, SupervisorFactory],
-              interpretation_factories: Dict[str, InterpretationFactory]) -> InternalContext:
         assert afi is not None
 
-        assert mutator_factories is not None
+        if mutator_factories is None:
+            assert matcher_factories is None and supervisor_factories is None and interpretation_factories is None
+            assert descriptor_cache_path is None
+            assert interpretation_cache_size == 0 and interpretation_cache_path is None
+            assert self._installed_registries is not None, "The task does not carry any registries, and none have been installed"
+
+            return self.setup(afi=afi, cancellation_token=cancellation_token, context_key=context_key, **self._installed_registries)
+
         assert matcher_factories is not None
         assert supervisor_factories is not None
+        assert interpretation_factories is not None
+
+        self._task.afi = afi
+        self._report_deferred_warnings()
 
-        self._afi = afi
-        self._mutator_factories = mutator_factories
-        self._matcher_factories = matcher_factories
-        self._supervisor_factories = supervisor_factories
-        self._interpretation_factories = interpretation_factories
+        self._task.mutator_factories = mutator_factories
+        self._task.matcher_factories = matcher_factories
+        self._task.supervisor_factories = supervisor_factories
+        self._task.interpretation_factories = interpretation_factories
+
+        if descriptor_cache_path is None:
+            self._task.descriptor_cache = None
+        else:
+            self._task.descriptor_cache = DescriptorCache(descriptor_cache_path)
+
+        self._task.interpretation_cache = self._get_interpretation_cache(interpretation_cache_size, interpretation_cache_path)
+
+        self._task.cancellation_token = cancellation_token
+        self._task.context_key = context_key
 
         return self
 
@@ -66,98 +177,231 @@ class InternalContext:
 
     def __exit__(self, exception_type: any, exception_value: BaseException | None, traceback: TracebackType | None):
         # inform the parent process that the current task is done
-        self._afi.dispose(exception_type, exception_value, traceback)
-        self._afi = DummyFeedbackInterface()
+        self._task.afi.dispose(exception_type, exception_value, traceback)
+        self._task.afi = DummyFeedbackInterface()
+
+        if self._task.cancellation_token is not None:
+            self._task.cancellation_token.release()
+            self._task.cancellation_token = None
+
+        self._task.context_key = None
 
     def get_afi(self) -> AbstractFeedbackInterface:
-        return self._afi
+        return self._task.afi
+
+    def defer_warning(self, verbosity: Verbosity, message: str, /) -> None:
+        """
+        Stores a warning that cannot be reported right away, because no task is running, or because the running task has no feedback interface.
+        The warning is reported to the feedback interface of the next task set up by this process.
+        """
+
+        with self._deferred_warnings_lock:
+            self._deferred_warnings.append((verbosity, message))
+
+    def _report_deferred_warnings(self) -> None:
+
+        # the warnings would be lost on a dummy feedback interface, so they are kept for a task that can report them
+        if isinstance(self._task.afi, DummyFeedbackInterface):
+            return
+
+        with self._deferred_warnings_lock:
+            deferred_warnings = self._deferred_warnings
+            self._deferred_warnings = []
+
+        for verbosity, message in deferred_warnings:
+            self._task.afi.warn(verbosity, message)
+
+    def bind_task(self, fn: Callable[..., _T], /) -> Callable[..., _T]:
+        """
+        Wraps the given function, such that it runs as part of the task that is currently being run by this thread,
+        even if it is called by another thread. This allows a task to spread its work over multiple threads.
+        The wrapped function must only be called while the current task is running.
+        """
+
+        task_state = dict(vars(self._task))
+
+        def _run_bound(*args, **kwargs) -> _T:
+
+            previous_task_state = dict(vars(self._task))
+            vars(self._task).update(task_state)
+
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                vars(self._task).update(previous_task_state)
+
+        return _run_bound
+
+    def get_descriptor_cache(self) -> DescriptorCache | None:
+        return self._task.descriptor_cache
+
+    def _get_interpretation_cache(self, max_entries: int, path: str | None, /) -> InterpretationCache | None:
+
+        if max_entries == 0 and path is None:
+            return None
+
+        with self._interpretation_caches_lock:
+            if (max_entries, path) not in self._interpretation_caches:
+                self._interpretation_caches[max_entries, path] = InterpretationCache(max_entries, path)
+
+            return self._interpretation_caches[max_entries, path]
+
+    def get_interpretation_cache(self) -> InterpretationCache | None:
+        return self._task.interpretation_cache
+
+    def check_cancelled(self) -> None:
+        """
+        Checks whether the main process has requested the cancellation of the current task.
+        Long-running tasks should call this method at the boundaries of their phases.
+
+        Raises:
+            ErrOperationCancelled: In case the current task has been cancelled.
+        """
+
+        if self._task.cancellation_token is not None and self._task.cancellation_token.is_cancelled():
+            raise ErrOperationCancelled(
+                "while running a task in a worker process.",
+                "The task has been cancelled by the main process, because its result is no longer needed."
+            )
 
     def get_mutator(self, mutator_id: str, mutator_config: ConfigDict, /) -> IMutator:
 
         # TODO: (low priority) consider caching mutators that have the same id and configuration
-        self._afi.info(Verbosity.DEBUG_VERBOSE, f"Loading mutator '{mutator_id}' with configuration {mutator_config}.")
+        self._task.afi.info(Verbosity.DEBUG_VERBOSE, f"Loading mutator '{mutator_id}' with configuration {mutator_config}.")
 
-        if mutator_id not in self._mutator_factories:
+        if mutator_id not in self._task.mutator_factories:
             raise ErrInvalidKey(
                 f"while loading mutator '{mutator_id}'.",
                 "Unknown mutator. Has this mutator been properly loaded?"
             )
 
-        return self._mutator_factories[mutator_id](mutator_config)
+        return self._task.mutator_factories[mutator_id](mutator_config)
 
     def get_matcher(self, matcher_id: str, matcher_config: ConfigDict, /) -> IMatcher:
 
         # TODO: (low priority) consider caching matchers that have the same id and configuration
-        self._afi.info(Verbosity.DEBUG_VERBOSE, f"Loading matcher '{matcher_id}' with configuration {matcher_config}.")
+        self._task.afi.info(Verbosity.DEBUG_VERBOSE, f"Loading matcher '{matcher_id}' with configuration {matcher_config}.")
 
-        if matcher_id not in self._matcher_factories:
+        if matcher_id not in self._task.matcher_factories:
             raise ErrInvalidKey(
                 f"while loading matcher '{matcher_id}'.",
                 "Unknown matcher. Has this matcher been properly loaded?"
             )
 
-        return self._matcher_factories[matcher_id](matcher_config)
+        return self._task.matcher_factories[matcher_id](matcher_config)
 
     def get_supervisor(self, supervisor_id: str, supervisor_config: ConfigDict, /) -> ISupervisor:
 
         # TODO: (low priority) consider caching supervisors that have the same id and configuration
-        self._afi.info(Verbosity.DEBUG_VERBOSE, f"Loading supervisor '{supervisor_id}' with configuration {supervisor_config}.")
+        self._task.afi.info(Verbosity.DEBUG_VERBOSE, f"Loading supervisor '{supervisor_id}' with configuration {supervisor_config}.")
 
-        if supervisor_id not in self._supervisor_factories:
+        if supervisor_id not in self._task.supervisor_factories:
             raise ErrInvalidKey(
                 f"while loading supervisor '{supervisor_id}'.",
                 "Unknown supervisor. Has this supervisor been properly loaded?"
             )
 
-        return self._supervisor_factories[supervisor_id](supervisor_config)
+        return self._task.supervisor_factories[supervisor_id](supervisor_config)
 
     def get_interpretation(self, interpretation_id: str, interpretation_config: ConfigDict, /) -> IInterpretation:
 
         # TODO: (low priority) consider caching interpretations that have the same id and configuration
-        self._afi.info(Verbosity.DEBUG_VERBOSE, f"Loading interpretation '{interpretation_id}' with configuration {interpretation_config}.")
+        self._task.afi.info(Verbosity.DEBUG_VERBOSE, f"Loading interpretation '{interpretation_id}' with configuration {interpretation_config}.")
 
-        if interpretation_id not in self._interpretation_factories:
+        if interpretation_id not in self._task.interpretation_factories:
             raise ErrInvalidKey(
                 f"while loading interpretation '{interpretation_id}'.",
                 "Unknown interpretation. Has this interpretation method been properly loaded?"
             )
 
-        return self._interpretation_factories[interpretation_id](interpretation_config)
+        return self._task.interpretation_factories[interpretation_id](interpretation_config)
+
+    def get_templates_lock(self) -> threading.RLock:
+        """
+        Retrieves the lock guarding the loaded templates.
+        Holding it makes checking whether a template has been loaded and loading it a single atomic operation.
+        """
+        return self._templates_lock
+
+    def _get_context_templates(self) -> _ContextTemplates:
+
+        with self._templates_lock:
+            if self._task.context_key not in self._context_templates:
+                self._context_templates[self._task.context_key] = _ContextTemplates()
+
+            return self._context_templates[self._task.context_key]
+
+    def forget_context(self, context_key: str, /) -> None:
+        """ Releases the templates loaded on behalf of the api context with the given key, once the api context has been disposed. """
+
+        with self._templates_lock:
+            self._context_templates.pop(context_key, None)
 
     def add_template(self, template: InternalTemplate, /):
+        with self._templates_lock:
+            self._add_template(template)
 
+    def _add_template(self, template: InternalTemplate, /):
+
+        context_templates = self._get_context_templates()
         template_path = template.get_path()
 
-        assert template_path not in self._template_ids, "A template from the same path has already been loaded"
+        assert template_path not in context_templates.template_ids, "A template from the same path has already been loaded"
 
-        if template.identifier in self._loaded_templates:
+        if template.identifier in context_templates.loaded_templates:
             raise ErrTemplateIdNotUnique(
                 f"while loading template '{template.identifier}'",
                 "A template with the same id has already been loaded."
             )
 
-        self._loaded_templates[template.identifier] = template
-        self._template_ids[template_path] = template.identifier
+        context_templates.loaded_templates[template.identifier] = template
+        context_templates.template_ids[template_path] = template.identifier
 
         try:
             template.validate()
         except OEError as err:
             # rollback the loaded template
-            del self._loaded_templates[template.identifier]
-            del self._template_ids[template_path]
+            del context_templates.loaded_templates[template.identifier]
+            del context_templates.template_ids[template_path]
 
             # reraise the cause
             raise err
 
     def get_template(self, template_id: str, /) -> InternalTemplate:
-        assert template_id in self._loaded_templates, "Unknown template id"
-        return self._loaded_templates[template_id]
+        with self._templates_lock:
+            context_templates = self._get_context_templates()
+            assert template_id in context_templates.loaded_templates, "Unknown template id"
+            return context_templates.loaded_templates[template_id]
+
+    def get_template_index(self, templates: List[InternalTemplate], /) -> TemplateIndex:
+        """
+        Retrieves the combined descriptor index over the keypoints of the given loaded templates, building it if necessary.
+        """
+
+        index_key = tuple(sorted(template.identifier for template in templates))
+
+        with self._templates_lock:
+            context_templates = self._get_context_templates()
+
+            if index_key in context_templates.template_indices:
+                return context_templates.template_indices[index_key]
+
+        # building the index may take a while, so it is done without holding the lock, which would otherwise block other threads;
+        # if several threads build the same index concurrently, the index built first is kept
+        self._task.afi.info(Verbosity.DEBUG, f"Building a combined descriptor index over {len(index_key)} templates.")
+        template_index = TemplateIndex(templates)
+
+        with self._templates_lock:
+            return context_templates.template_indices.setdefault(index_key, template_index)
 
     def get_template_by_path(self, template_path: str, /) -> InternalTemplate | None:
 
-        if template_path not in self._template_ids:
-            return None
+        with self._templates_lock:
+            context_templates = self._get_context_templates()
+
+            if template_path not in context_templates.template_ids:
+                return None
 
-        template_id = self._template_ids[template_path]
+            template_id = context_templates.template_ids[template_path]
 
-        return self.get_template(template_id)
+            return context_templates.loaded_templates[template_id]
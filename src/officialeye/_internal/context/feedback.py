@@ -3,6 +3,7 @@ from concurrent.futures import Future
 
 # noinspection PyProtectedMember
 from multiprocessing.connection import Connection
+from threading import Lock
 from types import TracebackType
 from typing import Any
 
@@ -34,12 +35,26 @@ class InternalFeedbackInterface(AbstractFeedbackInterface):
         self._child_id = child_id
         self._tx = tx
 
+        # a task may report feedback from multiple threads, whose messages must not interleave in the connection
+        self._tx_lock = Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_tx_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._tx_lock = Lock()
+
     def get_child_id(self) -> int:
         return self._child_id
 
     def _send_ipc_message(self, message_type: IPCMessageType, *args, **kwargs):
         ipc_message = (message_type, args, kwargs)
-        self._tx.send(ipc_message)
+
+        with self._tx_lock:
+            self._tx.send(ipc_message)
 
     def echo(self, *args: Any, **kwargs: Any) -> None:
         self._send_ipc_message(IPCMessageType.ECHO, *args, **kwargs)
@@ -62,7 +77,8 @@ class InternalFeedbackInterface(AbstractFeedbackInterface):
 
         self._send_ipc_message(IPCMessageType.TASK_DONE, task_done_successfully)
 
-        self._tx.close()
+        with self._tx_lock:
+            self._tx.close()
 
     def fork(self, description: str, /) -> AbstractFeedbackInterface:
         # the internal feedback interface isn't meant to be forked
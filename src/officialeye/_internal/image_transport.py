@@ -0,0 +1,115 @@
+"""
+Module implementing the transport of decoded images from the main process to the workers.
+Instead of letting every task decode the same image file again, the main process can decode it once and share the pixels with the workers.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager, suppress
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterator, Tuple, Union
+
+import cv2
+import numpy as np
+
+from officialeye.error.errors.io import ErrIOInvalidImage
+
+
+class SharedImage:
+    """
+    Handle to a decoded image stored in a shared memory segment, designed to be passed between processes.
+    Only the handle is pickled, while the pixels stay in the segment, which the workers map into their memory without copying it.
+    It is very important that this class is picklable!
+    """
+
+    def __init__(self, img: np.ndarray, /):
+        """
+        Creates a new shared memory segment and copies the given image into it.
+        The process creating the segment owns it, and is responsible for calling the `unlink` method once the image is no longer needed.
+        """
+
+        self._shape: Tuple[int, ...] = img.shape
+        self._dtype: str = img.dtype.str
+
+        self._shm: SharedMemory | None = SharedMemory(create=True, size=max(img.nbytes, 1))
+        self._name: str = self._shm.name
+
+        np.ndarray(img.shape, dtype=img.dtype, buffer=self._shm.buf)[...] = img
+
+    def __getstate__(self):
+        # the receiving process attaches to the segment by its name
+        return {"_shape": self._shape, "_dtype": self._dtype, "_shm": None, "_name": self._name}
+
+    @contextmanager
+    def attach(self) -> Iterator[np.ndarray]:
+        """
+        Maps the shared image into the memory of the current process.
+
+        Returns:
+            A read-only view of the shared image, which must not be used after the context manager exits.
+        """
+
+        shm = self._shm if self._shm is not None else SharedMemory(name=self._name)
+
+        view = np.ndarray(self._shape, dtype=np.dtype(self._dtype), buffer=shm.buf)
+        view.flags.writeable = False
+
+        try:
+            yield view
+        finally:
+            del view
+
+            if shm is not self._shm:
+                # some arrays derived from the view might still be alive, in which case the mapping is released once they are garbage-collected
+                with suppress(BufferError):
+                    shm.close()
+
+    def unlink(self) -> None:
+        """ Releases the shared memory segment. Can only be called in the process that created the segment. """
+
+        assert self._shm is not None, "Only the process that has created the shared image may unlink it"
+
+        with suppress(BufferError):
+            self._shm.close()
+
+        self._shm.unlink()
+
+
+# Representation of an image passed to the workers.
+# Either the path to the image file or the encoded contents of an image file, which each worker decodes on its own,
+# a decoded image, which is copied when passed to a worker process,
+# or a decoded image stored in shared memory.
+ImageSource = Union[str, bytes, np.ndarray, SharedImage]
+
+
+@contextmanager
+def open_image(source: ImageSource, /) -> Iterator[np.ndarray]:
+    """
+    Retrieves the pixels of an image passed to a worker, in the BGR format.
+    The pixels must not be modified, nor used after the context manager exits.
+
+    Raises:
+        ErrIOInvalidImage: In case the image cannot be read or decoded.
+    """
+
+    if isinstance(source, SharedImage):
+        with source.attach() as img:
+            yield img
+        return
+
+    if isinstance(source, np.ndarray):
+        yield source
+        return
+
+    if isinstance(source, bytes):
+        img = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_COLOR)
+    else:
+        img = cv2.imread(source, cv2.IMREAD_COLOR)
+
+    if img is None:
+        raise ErrIOInvalidImage(
+            "while loading an image in a worker.",
+            "The image could not be read or decoded."
+        )
+
+    yield img
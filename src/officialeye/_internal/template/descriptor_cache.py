@@ -0,0 +1,98 @@
+"""
+Module implementing a persistent on-disk cache for data computed by the matching engines, such as keypoint descriptors.
+The cache is shared between processes and between separate runs of the program.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterable
+
+import cv2
+import numpy as np
+
+# increment whenever the layout of the cache entries changes, so that entries written by older versions are ignored
+_CACHE_FORMAT_VERSION = 1
+
+
+def compute_cache_key(*components: any) -> str:
+    """
+    Computes a key for a cache entry that depends on the given components, as well as on the environment the data has been computed in.
+
+    Arguments:
+        components: JSON-serializable values that the cached data depends on.
+
+    Returns:
+        A hexadecimal string suitable for use as a file name.
+    """
+
+    key_data = json.dumps([_CACHE_FORMAT_VERSION, cv2.__version__, *components], sort_keys=True, default=str)
+    return hashlib.sha256(key_data.encode("utf-8")).hexdigest()
+
+
+class DescriptorCache:
+    """
+    Every entry of the cache is a directory named after the key of the entry, containing one raw `.npy` file per stored array.
+    Raw `.npy` files are used, because, unlike `.npz` archives, they can be memory-mapped when loading.
+    """
+
+    def __init__(self, directory: str, /):
+        self._directory = directory
+
+    def _get_entry_path(self, key: str, /) -> str:
+        return os.path.join(self._directory, key[:2], key)
+
+    def load(self, key: str, array_names: Iterable[str], /) -> Dict[str, np.ndarray] | None:
+        """
+        Loads a previously stored cache entry.
+
+        Returns:
+            The arrays of the entry, memory-mapped in read-only mode, or None if the entry does not exist or is corrupted.
+        """
+
+        entry_path = self._get_entry_path(key)
+
+        if not os.path.isdir(entry_path):
+            return None
+
+        try:
+            return {
+                name: np.load(os.path.join(entry_path, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+                for name in array_names
+            }
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key: str, arrays: Dict[str, np.ndarray], /) -> None:
+        """
+        Stores a cache entry. The entry is written into a temporary directory first, and then renamed, so that concurrent readers
+        never observe a partially written entry. If an entry with the same key has been stored in the meantime, it is left as it is.
+
+        Raises:
+            OSError: In case the entry could not be written.
+        """
+
+        entry_path = self._get_entry_path(key)
+        entry_parent_path = os.path.dirname(entry_path)
+
+        os.makedirs(entry_parent_path, exist_ok=True)
+
+        temp_entry_path = tempfile.mkdtemp(prefix=f".{key}_", dir=entry_parent_path)
+
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(temp_entry_path, f"{name}.npy"), array, allow_pickle=False)
+
+            os.rename(temp_entry_path, entry_path)
+        except OSError:
+            shutil.rmtree(temp_entry_path, ignore_errors=True)
+
+            if os.path.isdir(entry_path):
+                # another process has stored the same entry concurrently
+                return
+
+            raise
@@ -23,6 +23,10 @@ class ExternalMatchingResult(SharedMatchingResult, IApiInterfaceImplementation):
 
         self._template = external_template
 
+        # the matches given by the internal matching result refer to the internal template, which must not leave the worker process,
+        # therefore, only the columns of the matches are taken over, from which matches referring to the external template are created
+        self._copy_matches(internal_matching_result)
+
     @property
     def template(self) -> ExternalTemplate:
         return self._template
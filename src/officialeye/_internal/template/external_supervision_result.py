@@ -10,9 +10,6 @@ from officialeye._api.context import Context
 # noinspection PyProtectedMember
 from officialeye._api.future import Future
 
-# noinspection PyProtectedMember
-from officialeye._api.image import Image
-
 # noinspection PyProtectedMember
 from officialeye._api.template.match import IMatch
 
@@ -34,23 +31,48 @@ if TYPE_CHECKING:
 
 class ExternalSupervisionResult(ISupervisionResult, IApiInterfaceImplementation):
 
-    def __init__(self, internal_supervision_result: InternalSupervisionResult, /):
+    def __init__(self, internal_supervision_result: InternalSupervisionResult, /, *,
+                 interpretation_result: ExternalInterpretationResult | None = None):
+        """
+        Arguments:
+            internal_supervision_result: The supervision result computed by the worker.
+            interpretation_result: The interpretation result, in case the worker has interpreted the features right after the supervision.
+        """
+
         super().__init__()
 
         self._context: Context | None = None
 
+        # carried back to the main process together with the supervision result, and handed over to the caller only once
+        self._interpretation_result = interpretation_result
+
         self._template_path = internal_supervision_result.template.get_path()
 
         self._template = ExternalTemplate(internal_supervision_result.template)
         self._matching_result = ExternalMatchingResult(internal_supervision_result.matching_result, self._template)
 
         self._score = internal_supervision_result.score
+        # computed by the worker process, which has all the matches at hand
+        self._normalized_score = internal_supervision_result.get_normalized_score()
+        self._weighted_mse = internal_supervision_result.get_weighted_mse()
         self._delta = internal_supervision_result.delta
         self._delta_prime = internal_supervision_result.delta_prime
         self._transformation_matrix = internal_supervision_result.transformation_matrix
 
+        # computed by the worker process, in the order given by `get_all_matches` of the matching result, which is the same for both results
         # noinspection PyProtectedMember
-        self._match_weights: Dict[IMatch, float] = internal_supervision_result.get_match_weights()
+        self._match_weight_array: np.ndarray = internal_supervision_result._get_match_weight_array()
+
+        # keys: matches
+        # values: indices of the matches in the order given by `get_all_matches` of the matching result
+        # None if the indices have not yet been needed, which is only the case once the weight of a single match is asked for
+        self._match_indices: Dict[IMatch, int] | None = None
+
+    def __getstate__(self) -> dict:
+        # the indices can be recomputed on demand, and would only inflate the pickled result
+        state = self.__dict__.copy()
+        state["_match_indices"] = None
+        return state
 
     def set_api_context(self, context: Context, /) -> None:
         self._context = context
@@ -59,12 +81,18 @@ class ExternalSupervisionResult(ISupervisionResult, IApiInterfaceImplementation)
         self._template.set_api_context(context)
         self._matching_result.set_api_context(context)
 
+        if self._interpretation_result is not None:
+            self._interpretation_result.set_api_context(context)
+
     def clear_api_context(self) -> None:
         self._context = None
 
         self._template.clear_api_context()
         self._matching_result.clear_api_context()
 
+        if self._interpretation_result is not None:
+            self._interpretation_result.clear_api_context()
+
     @property
     def template(self) -> ExternalTemplate:
         return self._template
@@ -77,6 +105,12 @@ class ExternalSupervisionResult(ISupervisionResult, IApiInterfaceImplementation)
     def score(self) -> float:
         return self._score
 
+    def get_normalized_score(self, /) -> float:
+        return self._normalized_score
+
+    def get_weighted_mse(self, /) -> float:
+        return self._weighted_mse
+
     @property
     def delta(self) -> np.ndarray:
         return self._delta
@@ -91,9 +125,6 @@ class ExternalSupervisionResult(ISupervisionResult, IApiInterfaceImplementation)
 
     def interpret_async(self, /, *, target: IImage) -> Future:
 
-        # TODO: this is hacky, maybe use a more clean approach here?
-        assert isinstance(target, Image)
-
         assert self._context is not None, \
             ("The external superivision result has no context information, probably because it has been given to the API user "
              "before the context has been initialized in this object via the 'set_api_context' method, which is incorrect behavior.")
@@ -108,16 +139,35 @@ class ExternalSupervisionResult(ISupervisionResult, IApiInterfaceImplementation)
             f"Interpreting [b]{self.template.name}[/]...",
             self._template_path,
             self,
-            interpretation_target_path=target._path
+            interpretation_target=target._get_source(),
+            interpretation_threads=_api_context._get_interpretation_threads(),
+            affinity=self._template_path
         )
 
     def interpret(self, /, **kwargs) -> ExternalInterpretationResult:
         future = self.interpret_async(**kwargs)
         return future.result()
 
+    def _take_interpretation_result(self) -> ExternalInterpretationResult | None:
+        """
+        Returns the interpretation result computed by the worker together with this supervision result, if any,
+        and forgets it, so that it is not passed to the workers along with this supervision result later on.
+        """
+
+        interpretation_result = self._interpretation_result
+        self._interpretation_result = None
+
+        return interpretation_result
+
     def get_match_weight(self, match: IMatch, /) -> float:
 
-        if match in self._match_weights:
-            return self._match_weights[match]
+        if self._match_indices is None:
+            self._match_indices = {m: i for i, m in enumerate(self._matching_result.get_all_matches())}
+
+        if match not in self._match_indices:
+            return 1.0
+
+        return float(self._match_weight_array[self._match_indices[match]])
 
-        return 1.0
+    def _get_match_weight_array(self) -> np.ndarray:
+        return self._match_weight_array
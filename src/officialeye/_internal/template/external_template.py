@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, Dict, Iterable, List
 
+import numpy as np
+
 # noinspection PyProtectedMember
 from officialeye._api.future import Future
 
@@ -13,12 +15,13 @@ from officialeye._api.mutator import IMutator
 
 # noinspection PyProtectedMember
 from officialeye._api.template.template_interface import ITemplate
-from officialeye._internal.api.detect import template_detect
+from officialeye._internal.api.detect import target_prepare, template_detect, template_detect_and_interpret, template_get_signature
 from officialeye._internal.api_implementation import IApiInterfaceImplementation
 
 # noinspection PyProtectedMember
 from officialeye._internal.template.external_feature import ExternalFeature
 from officialeye._internal.template.keypoint import ExternalKeypoint
+from officialeye._internal.template.template_signature import TemplateSignature
 from officialeye.error.errors.general import ErrOperationNotSupported
 
 if TYPE_CHECKING:
@@ -27,7 +30,9 @@ if TYPE_CHECKING:
 
     # noinspection PyProtectedMember
     from officialeye._api.template.supervision_result import ISupervisionResult
+    from officialeye._internal.context.cancellation import CancellationToken
     from officialeye._internal.template.internal_template import InternalTemplate
+    from officialeye._internal.template.prepared_target import PreparedTarget
 
 
 class ExternalTemplate(ITemplate, IApiInterfaceImplementation):
@@ -49,6 +54,12 @@ class ExternalTemplate(ITemplate, IApiInterfaceImplementation):
         self._width = template.width
         self._height = template.height
 
+        self._target_preparation_key = template.get_target_preparation_key()
+
+        # None indicates that the signature has not yet been computed,
+        # which is only done on demand, since it requires decoding the source image of the template
+        self._signature: np.ndarray | None = None
+
         self._keypoints: Dict[str, ExternalKeypoint] = {}
         self._features: Dict[str, ExternalFeature] = {}
 
@@ -90,23 +101,99 @@ class ExternalTemplate(ITemplate, IApiInterfaceImplementation):
             "The way in which it was accessed is not supported."
         )
 
-    def detect_async(self, /, *, target: IImage) -> Future:
+    def get_path(self) -> str:
+        return self._path
+
+    def get_target_preparation_key(self) -> str:
+        return self._target_preparation_key
+
+    def _submit_get_signature(self) -> Future | None:
+        """ Starts computing the signature of the template, unless it is already known, in which case None is returned. """
+
+        if self._signature is not None:
+            return None
+
+        # noinspection PyProtectedMember
+        return self._context._submit_task(template_get_signature, "Computing template signature...", self._path, affinity=self._path)
+
+    def _complete_get_signature(self, future: Future, /) -> None:
+        """ Stores the signature of the template, given the future returned by `_submit_get_signature`. """
+
+        template_signature = future.result()
+
+        assert isinstance(template_signature, TemplateSignature)
+
+        if self._signature is None:
+            self._signature = template_signature.signature
+
+    def get_signature(self) -> np.ndarray:
+
+        future = self._submit_get_signature()
 
-        # TODO: this is hacky, maybe use a more clean approach here?
-        assert isinstance(target, Image)
+        if future is not None:
+            self._complete_get_signature(future)
+
+        return self._signature
+
+    def prepare_target_async(self, /, *, target: IImage) -> Future:
+        """
+        Prepares the target image for matching, such that the result can be passed to the `detect_async` method of all templates
+        having the same target preparation key as this template.
+        """
+
+        # noinspection PyProtectedMember
+        return self._context._submit_task(
+            target_prepare,
+            "Preparing target image...",
+            self._path,
+            target=target._get_source(),
+            affinity=self._path
+        )
+
+    def detect_async(self, /, *, target: IImage, prepared_target: PreparedTarget | None = None,
+                     cancellation_token: CancellationToken | None = None) -> Future:
 
         # noinspection PyProtectedMember
         return self._context._submit_task(
             template_detect,
             f"Detecting [b]{self._name}[/]...",
             self._path,
-            target_path=target._path,
+            target=target._get_source(),
+            prepared_target=prepared_target,
+            cancellation_token=cancellation_token,
+            affinity=self._path
         )
 
     def detect(self, /, **kwargs) -> ISupervisionResult:
         future = self.detect_async(**kwargs)
         return future.result()
 
+    def detect_and_interpret_async(self, /, *, target: IImage, interpretation_target: IImage | None = None,
+                                   prepared_target: PreparedTarget | None = None, cancellation_token: CancellationToken | None = None) -> Future:
+        """
+        Finds the template in the target image, and interprets the features in the same task.
+        The interpretation result can be taken from the resulting supervision result via its `_take_interpretation_result` method.
+
+        Arguments:
+            target: The target image.
+            interpretation_target: The image the features should be interpreted in. By default, the target image.
+            prepared_target: The target image prepared by a template with the same target preparation key, if any.
+            cancellation_token: Token allowing to abort the task while it is running.
+        """
+
+        # noinspection PyProtectedMember
+        return self._context._submit_task(
+            template_detect_and_interpret,
+            f"Detecting and interpreting [b]{self._name}[/]...",
+            self._path,
+            target=target._get_source(),
+            interpretation_target=None if interpretation_target is None or interpretation_target is target else interpretation_target._get_source(),
+            prepared_target=prepared_target,
+            interpretation_threads=self._context._get_interpretation_threads(),
+            cancellation_token=cancellation_token,
+            affinity=self._path
+        )
+
     def get_image(self) -> IImage:
         return Image(self._context, path=self._source_image_path)
 
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import os
 from typing import List
 
@@ -16,14 +18,34 @@ from officialeye.error.errors.io import ErrIOInvalidPath
 
 class InternalImage(IImage):
 
-    def __init__(self, /, *, path: str):
+    def __init__(self, /, *, path: str | None = None, array: np.ndarray | None = None):
+        """
+        Exactly one of the arguments has to be given.
+
+        Arguments:
+            path: Path to the image file.
+            array: The decoded image. Loading such an image does not copy the array, so mutators that only select a part of the image,
+                such as cropping, yield views into the array.
+        """
+
         super().__init__()
 
+        assert (path is None) != (array is None)
+
         self._mutators: List[IMutator] = []
         self._path = path
+        self._array = array
 
     def load(self) -> np.ndarray:
 
+        if self._array is not None:
+            img = self._array
+
+            for mutator in self._mutators:
+                img = mutator.mutate(img)
+
+            return img
+
         if not os.path.isfile(self._path):
             raise ErrIOInvalidPath(
                 f"while loading image located at '{self._path}'.",
@@ -0,0 +1,199 @@
+"""
+Module implementing the retrieval of the dimensions of images by parsing the headers of the image files, without decoding any pixels.
+Supports the JPEG, PNG and TIFF formats. The dimensions are reported as `cv2.imread` would load the image,
+i.e., after the rotation prescribed by the EXIF orientation tag has been applied.
+"""
+
+from __future__ import annotations
+
+import struct
+from typing import BinaryIO, Tuple
+
+_JPEG_SOI = b"\xff\xd8"
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_TIFF_SIGNATURES = (b"II*\x00", b"MM\x00*")
+
+# start-of-frame markers of all JPEG coding processes, i.e., 0xC0 to 0xCF, except for DHT (0xC4), JPG (0xC8) and DAC (0xCC)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# markers that are not followed by a segment length
+_JPEG_STANDALONE_MARKERS = frozenset(range(0xD0, 0xD8)) | {0x01}
+
+_JPEG_SOS = 0xDA
+_JPEG_APP1 = 0xE1
+
+_TIFF_TAG_IMAGE_WIDTH = 0x0100
+_TIFF_TAG_IMAGE_LENGTH = 0x0101
+_TIFF_TAG_ORIENTATION = 0x0112
+
+# formats of the values of the TIFF field types that can hold the tags read here, i.e., BYTE, SHORT and LONG
+_TIFF_TYPE_FORMATS = {1: "B", 3: "H", 4: "I"}
+
+# orientations that swap the width and the height of the image
+_TRANSPOSING_ORIENTATIONS = frozenset((5, 6, 7, 8))
+
+
+class _UnsupportedHeader(Exception):
+    pass
+
+
+def _read_exactly(fh: BinaryIO, size: int, /) -> bytes:
+
+    data = fh.read(size)
+
+    if len(data) != size:
+        raise _UnsupportedHeader()
+
+    return data
+
+
+def _parse_tiff_ifd0(data: bytes, /) -> Tuple[int | None, int | None, int]:
+    """
+    Parses the first image file directory of a TIFF structure, which is also the layout of EXIF data.
+
+    Returns:
+        The width and the height of the image, each None if absent, and the orientation of the image, 1 if absent.
+    """
+
+    if data[:4] == b"II*\x00":
+        endianness = "<"
+    elif data[:4] == b"MM\x00*":
+        endianness = ">"
+    else:
+        raise _UnsupportedHeader()
+
+    ifd_offset, = struct.unpack_from(f"{endianness}I", data, 4)
+    entry_count, = struct.unpack_from(f"{endianness}H", data, ifd_offset)
+
+    tags = {}
+
+    for entry_index in range(entry_count):
+        tag, field_type, value_count = struct.unpack_from(f"{endianness}HHI", data, ifd_offset + 2 + 12 * entry_index)
+
+        if tag not in (_TIFF_TAG_IMAGE_WIDTH, _TIFF_TAG_IMAGE_LENGTH, _TIFF_TAG_ORIENTATION):
+            continue
+
+        if field_type not in _TIFF_TYPE_FORMATS or value_count != 1:
+            raise _UnsupportedHeader()
+
+        # values that fit into four bytes are stored directly in the entry, left-justified
+        tags[tag], = struct.unpack_from(f"{endianness}{_TIFF_TYPE_FORMATS[field_type]}", data, ifd_offset + 2 + 12 * entry_index + 8)
+
+    return tags.get(_TIFF_TAG_IMAGE_WIDTH), tags.get(_TIFF_TAG_IMAGE_LENGTH), tags.get(_TIFF_TAG_ORIENTATION, 1)
+
+
+def _read_jpeg_size(fh: BinaryIO, /) -> Tuple[int, int, int]:
+
+    orientation = 1
+
+    while True:
+        if _read_exactly(fh, 1) != b"\xff":
+            raise _UnsupportedHeader()
+
+        marker = _read_exactly(fh, 1)[0]
+
+        # any number of fill bytes may precede a marker
+        while marker == 0xFF:
+            marker = _read_exactly(fh, 1)[0]
+
+        if marker in _JPEG_STANDALONE_MARKERS:
+            continue
+
+        if marker == _JPEG_SOS:
+            # the frame header must precede the scan
+            raise _UnsupportedHeader()
+
+        segment_length, = struct.unpack(">H", _read_exactly(fh, 2))
+
+        if segment_length < 2:
+            raise _UnsupportedHeader()
+
+        segment = _read_exactly(fh, segment_length - 2)
+
+        if marker == _JPEG_APP1 and segment[:6] == b"Exif\x00\x00" and orientation == 1:
+            _, _, orientation = _parse_tiff_ifd0(segment[6:])
+        elif marker in _JPEG_SOF_MARKERS:
+            _, height, width = struct.unpack_from(">BHH", segment)
+            return width, height, orientation
+
+
+def _read_png_size(fh: BinaryIO, /) -> Tuple[int, int, int]:
+
+    width, height = None, None
+    orientation = 1
+
+    while True:
+        chunk_header = fh.read(8)
+
+        if len(chunk_header) < 8:
+            break
+
+        chunk_length, chunk_type = struct.unpack(">I4s", chunk_header)
+
+        if chunk_type == b"IHDR":
+            width, height = struct.unpack(">II", _read_exactly(fh, 8))
+            fh.seek(chunk_length - 8 + 4, 1)
+        elif chunk_type == b"eXIf":
+            _, _, orientation = _parse_tiff_ifd0(_read_exactly(fh, chunk_length))
+            fh.seek(4, 1)
+        elif chunk_type == b"IEND":
+            break
+        else:
+            # skip the data and the checksum of the chunk, an eXIf chunk may also follow the image data
+            fh.seek(chunk_length + 4, 1)
+
+    if width is None:
+        raise _UnsupportedHeader()
+
+    return width, height, orientation
+
+
+def _read_tiff_size(fh: BinaryIO, /) -> Tuple[int, int, int]:
+
+    # the first directory may be located anywhere in the file, but it is typically found near the beginning or near the end
+    data = fh.read()
+
+    try:
+        width, height, orientation = _parse_tiff_ifd0(data)
+    except struct.error as err:
+        raise _UnsupportedHeader() from err
+
+    if width is None or height is None:
+        raise _UnsupportedHeader()
+
+    return width, height, orientation
+
+
+def read_image_size(path: str, /) -> Tuple[int, int] | None:
+    """
+    Determines the dimensions of an image file by parsing its header.
+
+    Returns:
+        The height and the width of the image, as loaded by `cv2.imread`, or None if the dimensions could not be determined this way,
+        e.g., because the format of the file is not supported or because the file cannot be read.
+    """
+
+    try:
+        with open(path, "rb") as fh:
+            signature = fh.read(8)
+
+            if signature[:2] == _JPEG_SOI:
+                fh.seek(2)
+                width, height, orientation = _read_jpeg_size(fh)
+            elif signature == _PNG_SIGNATURE:
+                width, height, orientation = _read_png_size(fh)
+            elif signature[:4] in _TIFF_SIGNATURES:
+                fh.seek(0)
+                width, height, orientation = _read_tiff_size(fh)
+            else:
+                return None
+    except (OSError, struct.error, _UnsupportedHeader):
+        return None
+
+    if width <= 0 or height <= 0:
+        return None
+
+    if orientation in _TRANSPOSING_ORIENTATIONS:
+        width, height = height, width
+
+    return height, width
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Dict, Iterable, Union
+import json
+import pickle
+import sqlite3
+from typing import TYPE_CHECKING, Dict, Iterable, List, Sequence, Tuple, Union
 
 import numpy as np
 
@@ -8,13 +11,17 @@ from officialeye import IMutator
 
 # noinspection PyProtectedMember
 from officialeye._api.template.feature import IFeature
-from officialeye._internal.context.singleton import get_internal_context
+from officialeye._internal.context.singleton import get_internal_afi, get_internal_context
+from officialeye._internal.feedback.verbosity import Verbosity
 from officialeye._internal.template.feature_class.feature_class import FeatureClass
+from officialeye._internal.template.interpretation_cache import compute_interpretation_cache_key
 from officialeye._internal.template.region import InternalRegion
 from officialeye._internal.template.utils import load_mutator_from_dict
 from officialeye.error.errors.template import ErrTemplateInvalidFeature
 
 if TYPE_CHECKING:
+    # noinspection PyProtectedMember
+    from officialeye._api.template.interpretation import IInterpretation
     from officialeye._internal.template.feature_class.manager import FeatureClassManager
     from officialeye.types import FeatureInterpretation
 
@@ -82,6 +89,37 @@ class InternalFeature(InternalRegion, IFeature):
             load_mutator_from_dict(mutator_dict) for mutator_dict in mutators
         ]
 
+    def _get_interpretation_spec(self) -> Tuple[str, Dict[str, any]]:
+
+        feature_class = self.get_feature_class()
+
+        assert feature_class is not None
+
+        interpretation_method_id = feature_class.get_data()["interpretation"]["method"]
+        interpretation_method_config = feature_class.get_data()["interpretation"]["config"]
+
+        assert isinstance(interpretation_method_id, str)
+        assert isinstance(interpretation_method_config, dict)
+
+        return interpretation_method_id, interpretation_method_config
+
+    def get_interpretation(self) -> IInterpretation:
+        """
+        Loads the interpretation method defined in the corresponding feature class.
+        Assumes that the feature class is present.
+        """
+
+        interpretation_method_id, interpretation_method_config = self._get_interpretation_spec()
+
+        return get_internal_context().get_interpretation(interpretation_method_id, interpretation_method_config)
+
+    def get_interpretation_key(self) -> str:
+        """
+        Returns a key such that features with equal keys are interpreted by identically configured interpretation methods.
+        Assumes that the feature class is present.
+        """
+        return json.dumps(self._get_interpretation_spec(), sort_keys=True, default=str)
+
     def interpret_image(self, img: np.ndarray, /) -> FeatureInterpretation:
         """
         Takes an image and runs the interpretation method defined in the corresponding feature class.
@@ -94,16 +132,63 @@ class InternalFeature(InternalRegion, IFeature):
             The result of running the interpretation method on the image.
         """
 
-        feature_class = self.get_feature_class()
+        return interpret_feature_images(self.get_interpretation(), self.get_interpretation_key(), [(img, self)])[0]
 
-        assert feature_class is not None
 
-        interpretation_method_id = feature_class.get_data()["interpretation"]["method"]
-        interpretation_method_config = feature_class.get_data()["interpretation"]["config"]
+def interpret_feature_images(interpretation: IInterpretation, interpretation_key: str, items: Sequence[Tuple[np.ndarray, InternalFeature]],
+                             /) -> List[FeatureInterpretation]:
+    """
+    Interprets the given images of features at once, reusing the cached interpretations of identical images, if possible.
 
-        assert isinstance(interpretation_method_id, str)
-        assert isinstance(interpretation_method_config, dict)
+    Arguments:
+        interpretation: The interpretation method shared by all the features.
+        interpretation_key: The interpretation key shared by all the features.
+        items: Pairs consisting of the warped and mutated image of a feature and the feature.
+
+    Returns:
+        The interpretations of the features, in the order of the given items.
+    """
+
+    interpretation_cache = get_internal_context().get_interpretation_cache()
+
+    if interpretation_cache is None or not interpretation.is_cacheable():
+        interpretations = interpretation.interpret_batch(items)
+        assert len(interpretations) == len(items), "The interpretation method has returned a wrong number of interpretations"
+        return interpretations
+
+    cache_keys = [compute_interpretation_cache_key(interpretation_key, feature_img) for feature_img, _ in items]
+
+    interpretations = [None for _ in items]
+    missing_indices = []
+
+    for item_index, cache_key in enumerate(cache_keys):
+        try:
+            found, interpretations[item_index] = interpretation_cache.load(cache_key)
+        except sqlite3.Error as err:
+            get_internal_afi().warn(Verbosity.DEBUG, f"Could not read from the interpretation cache: {err}")
+            found = False
+
+        if not found:
+            missing_indices.append(item_index)
+
+    get_internal_afi().info(
+        Verbosity.DEBUG_VERBOSE,
+        f"Found {len(items) - len(missing_indices)} out of {len(items)} interpretations in the interpretation cache."
+    )
+
+    if len(missing_indices) == 0:
+        return interpretations
+
+    missing_interpretations = interpretation.interpret_batch([items[item_index] for item_index in missing_indices])
+
+    assert len(missing_interpretations) == len(missing_indices), "The interpretation method has returned a wrong number of interpretations"
+
+    for item_index, feature_interpretation in zip(missing_indices, missing_interpretations, strict=True):
+        interpretations[item_index] = feature_interpretation
 
-        interpretation_method = get_internal_context().get_interpretation(interpretation_method_id, interpretation_method_config)
+        try:
+            interpretation_cache.store(cache_keys[item_index], feature_interpretation)
+        except (sqlite3.Error, pickle.PicklingError, TypeError, AttributeError) as err:
+            get_internal_afi().warn(Verbosity.DEBUG, f"Could not store an interpretation in the interpretation cache: {err}")
 
-        return interpretation_method.interpret(img, self)
+    return interpretations
@@ -35,6 +35,16 @@ class InternalSupervisionResult(ISupervisionResult):
         self._internal_template = internal_template
         self._internal_matching_result = internal_matching_result
 
+        # the supervision result does not change once the supervision engine has yielded it,
+        # but the template usually picks the best of many results by these values, so they are only computed once
+        self._normalized_score: float | None = None
+        self._weighted_mse: float | None = None
+
+        # keys: matches
+        # values: indices of the matches in the order given by `get_all_matches` of the matching result
+        # None if the indices have not yet been needed, which is only the case once the weight of a single match is asked for
+        self._match_indices: Dict[IMatch, int] | None = None
+
     @property
     def template(self) -> InternalTemplate:
         return self._internal_template
@@ -82,4 +92,45 @@ class InternalSupervisionResult(ISupervisionResult):
         if match in match_weights:
             return match_weights[match]
 
-        return 1.0
+        # noinspection PyProtectedMember
+        match_weight_array = self._supervision_result._match_weight_array
+
+        if match_weight_array is None:
+            return 1.0
+
+        if self._match_indices is None:
+            self._match_indices = {m: i for i, m in enumerate(self._internal_matching_result.get_all_matches())}
+
+        if match not in self._match_indices:
+            return 1.0
+
+        return float(match_weight_array[self._match_indices[match]])
+
+    def _get_match_weight_array(self) -> np.ndarray:
+
+        if len(self.get_match_weights()) == 0:
+            # noinspection PyProtectedMember
+            match_weight_array = self._supervision_result._match_weight_array
+
+            if match_weight_array is not None:
+                # the supervision engine has weighted all matches at once
+                return match_weight_array
+
+            # the supervision engine has not weighted any matches, which spares looking up every single match
+            return np.ones(self._internal_matching_result.get_total_match_count(), dtype=np.float64)
+
+        return super()._get_match_weight_array()
+
+    def get_normalized_score(self, /) -> float:
+
+        if self._normalized_score is None:
+            self._normalized_score = super().get_normalized_score()
+
+        return self._normalized_score
+
+    def get_weighted_mse(self, /) -> float:
+
+        if self._weighted_mse is None:
+            self._weighted_mse = super().get_weighted_mse()
+
+        return self._weighted_mse
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import os
 import random
-from typing import TYPE_CHECKING, Dict, Iterable, List
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Iterable, List, TypeVar
 
 import numpy as np
 
@@ -27,10 +30,12 @@ from officialeye._internal.feedback.verbosity import Verbosity
 from officialeye._internal.template.feature_class.loader import load_template_feature_classes
 from officialeye._internal.template.feature_class.manager import FeatureClassManager
 from officialeye._internal.template.image import InternalImage
+from officialeye._internal.template.image_header import read_image_size
 from officialeye._internal.template.internal_feature import InternalFeature
 from officialeye._internal.template.internal_matching_result import InternalMatchingResult
 from officialeye._internal.template.internal_supervision_result import InternalSupervisionResult
 from officialeye._internal.template.keypoint import InternalKeypoint
+from officialeye._internal.template.template_signature import compute_signature
 from officialeye._internal.template.utils import load_mutator_from_dict
 from officialeye._internal.timer import Timer
 from officialeye.error.errors.general import ErrInvalidIdentifier, ErrOperationNotSupported
@@ -55,6 +60,8 @@ _SUPERVISION_RESULT_RANDOM = "random"
 _SUPERVISION_RESULT_BEST_MSE = "best_mse"
 _SUPERVISION_RESULT_BEST_SCORE = "best_score"
 
+_T = TypeVar("_T")
+
 
 class InternalTemplate(ITemplate):
 
@@ -67,14 +74,26 @@ class InternalTemplate(ITemplate):
         self._name = yaml_dict["name"]
         self._source = yaml_dict["source"]
 
-        self._height, self._width, _ = self.get_image().load().shape
+        # the dimensions are read from the header of the image file, since decoding the whole image just to measure it is wasteful
+        image_size = read_image_size(self.get_source_image_path())
+
+        if image_size is None:
+            # the format of the image is not supported by the header parser, or the file is unreadable, in which case decoding reports the error
+            image_size = self.get_image().load().shape[:2]
+
+        self._height, self._width = image_size
+
+        # the specification of the source mutators is retained, because it is needed to identify the mutated source image
+        self._source_mutator_dicts: List[Dict[str, any]] = yaml_dict["mutators"]["source"]
 
         self._source_mutators: List[IMutator] = [
-            load_mutator_from_dict(mutator_dict) for mutator_dict in yaml_dict["mutators"]["source"]
+            load_mutator_from_dict(mutator_dict) for mutator_dict in self._source_mutator_dicts
         ]
 
+        self._target_mutator_dicts: List[Dict[str, any]] = yaml_dict["mutators"]["target"]
+
         self._target_mutators: List[IMutator] = [
-            load_mutator_from_dict(mutator_dict) for mutator_dict in yaml_dict["mutators"]["target"]
+            load_mutator_from_dict(mutator_dict) for mutator_dict in self._target_mutator_dicts
         ]
 
         self._keypoints: Dict[str, InternalKeypoint] = {}
@@ -125,6 +144,24 @@ class InternalTemplate(ITemplate):
 
             self._features[feature.identifier] = feature
 
+        # keys: keys chosen by the matching engines, e.g., the matcher id and the keypoint id
+        # values: data computed by the matching engines that depends only on the template, and not on the target image
+        # matchers are instantiated anew for every target image, therefore such data is stored here instead,
+        # so that it is computed only once per loaded template
+        self._matcher_cache: Dict[Hashable, Any] = {}
+        self._matcher_cache_lock = Lock()
+
+        # None indicates that the fingerprint has not yet been computed
+        self._source_fingerprint: str | None = None
+
+        # None indicates that the signature has not yet been computed
+        self._signature: np.ndarray | None = None
+
+        # the source image with all source mutators applied, which is read whenever the image of a keypoint or a feature is needed
+        # None indicates that the mutated source image has not yet been loaded
+        self._mutated_image: np.ndarray | None = None
+        self._mutated_image_lock = Lock()
+
         get_internal_context().add_template(self)
 
     def get_source_mutators(self) -> Iterable[IMutator]:
@@ -162,9 +199,52 @@ class InternalTemplate(ITemplate):
         return InternalImage(path=self.get_source_image_path())
 
     def get_mutated_image(self) -> IImage:
-        img = self.get_image()
-        img.apply_mutators(*self._source_mutators)
-        return img
+        """
+        Returns the source image with all source mutators applied.
+        The image is only decoded and mutated once per loaded template, and it is backed by a read-only array,
+        so that the images of regions of the template are views into it.
+        """
+
+        with self._mutated_image_lock:
+            if self._mutated_image is None:
+                img = self.get_image()
+                img.apply_mutators(*self._source_mutators)
+
+                mutated_image = img.load()
+                mutated_image.flags.writeable = False
+
+                self._mutated_image = mutated_image
+
+        return InternalImage(array=self._mutated_image)
+
+    def get_source_fingerprint(self) -> str:
+        """
+        Returns a hash identifying the mutated source image of the template, i.e., the contents of the source image file
+        together with the source mutators applied to it. This is useful for keying persistent caches of data derived from the template.
+        """
+
+        if self._source_fingerprint is None:
+            source_hash = hashlib.sha256()
+
+            with open(self.get_source_image_path(), "rb") as fh:
+                for chunk in iter(lambda: fh.read(1 << 20), b""):
+                    source_hash.update(chunk)
+
+            source_hash.update(json.dumps(self._source_mutator_dicts, sort_keys=True, default=str).encode("utf-8"))
+
+            self._source_fingerprint = source_hash.hexdigest()
+
+        return self._source_fingerprint
+
+    def get_signature(self) -> np.ndarray:
+        """
+        Returns the compact global signature of the mutated source image of the template.
+        """
+
+        if self._signature is None:
+            self._signature = compute_signature(self.get_mutated_image().load())
+
+        return self._signature
 
     @property
     def identifier(self) -> str:
@@ -204,6 +284,56 @@ class InternalTemplate(ITemplate):
 
         return get_internal_context().get_matcher(matcher_id, matcher_config)
 
+    def get_matcher_cache_entry(self, key: Hashable, compute: Callable[[], _T], /) -> _T:
+        """
+        Retrieves target-independent data that a matching engine has computed for this template.
+        If there is no such data yet, it is computed and retained for as long as the template stays loaded.
+
+        Arguments:
+            key: Key identifying the data. It should include everything the data depends on, apart from the template itself.
+            compute: Function computing the data in case it has not been cached yet.
+
+        Returns:
+            The cached data.
+        """
+
+        with self._matcher_cache_lock:
+            if key in self._matcher_cache:
+                return self._matcher_cache[key]
+
+        # the computation happens without holding the lock, so that unrelated entries can be retrieved in the meantime
+        value = compute()
+
+        with self._matcher_cache_lock:
+            return self._matcher_cache.setdefault(key, value)
+
+    def get_target_preparation_key(self) -> str:
+        """
+        Returns a key such that templates with equal keys prepare target images in the same way, i.e.,
+        they apply the same target mutators and use identically configured matchers.
+        Therefore, the preparation of a target image can be shared between such templates.
+        """
+
+        matcher_id = self._matching["engine"]
+        matcher_config = self._matching["config"].get(matcher_id, {})
+
+        return json.dumps([self._target_mutator_dicts, matcher_id, matcher_config], sort_keys=True, default=str)
+
+    def prepare_target(self, target: np.ndarray, /) -> Any:
+        """
+        Applies the target mutators to the target image and runs the template-independent part of the matcher setup.
+
+        Returns:
+            The prepared target, or None if the matcher does not support preparing target images.
+        """
+
+        get_internal_afi().update_status("Preparing target image...")
+
+        for mutator in self._target_mutators:
+            target = mutator.mutate(target)
+
+        return self.get_matcher().prepare_target(target)
+
     def get_supervisor(self, /) -> ISupervisor:
         supervisor_id = self._supervision["engine"]
         supervisor_config_generic = self._supervision["config"]
@@ -245,10 +375,11 @@ class InternalTemplate(ITemplate):
         supervisor.setup(self, keypoint_matching_result)
 
         supervision_result_choice_engine = self._supervision["result"]
-        results: List[InternalSupervisionResult] = [
-            InternalSupervisionResult(supervision_result, self, keypoint_matching_result)
-            for supervision_result in supervisor.supervise(self, keypoint_matching_result)
-        ]
+        results: List[InternalSupervisionResult] = []
+
+        for supervision_result in supervisor.supervise(self, keypoint_matching_result):
+            get_internal_context().check_cancelled()
+            results.append(InternalSupervisionResult(supervision_result, self, keypoint_matching_result))
 
         if len(results) == 0:
             return None
@@ -309,15 +440,32 @@ class InternalTemplate(ITemplate):
             f"Invalid supervision result choice engine '{supervision_result_choice_engine}'."
         )
 
-    def do_detect(self, target: np.ndarray, /) -> InternalSupervisionResult:
-        # find all patterns in the target image
+    def do_detect(self, target: np.ndarray | None, /, *, prepared_target: Any = None) -> InternalSupervisionResult:
+        """
+        Finds the template in the target image.
 
-        # prepare target image
-        get_internal_afi().update_status("Preparing target image...")
+        Arguments:
+            target: The target image. May be None if a prepared target is given.
+            prepared_target: The result of running `prepare_target` on the target image, possibly using another template
+                with the same target preparation key. If None, the target image is prepared by this method.
 
-        # apply mutators to the target image
-        for mutator in self._target_mutators:
-            target = mutator.mutate(target)
+        Returns:
+            The supervision result.
+        """
+
+        get_internal_context().check_cancelled()
+
+        matcher: IMatcher = self.get_matcher()
+
+        if prepared_target is None:
+            assert target is not None
+
+            # prepare target image
+            get_internal_afi().update_status("Preparing target image...")
+
+            # apply mutators to the target image
+            for mutator in self._target_mutators:
+                target = mutator.mutate(target)
 
         get_internal_afi().update_status("Running matching phase...")
 
@@ -325,17 +473,26 @@ class InternalTemplate(ITemplate):
 
         with _timer:
             # start matching
-            matcher: IMatcher = self.get_matcher()
-            matcher.setup(target, self)
+            if prepared_target is None:
+                matcher.setup(target, self)
+            else:
+                matcher.setup_prepared(prepared_target, self)
 
             for keypoint in self.keypoints:
                 get_internal_afi().info(Verbosity.DEBUG, f"Running matcher '{matcher}' for keypoint '{keypoint.identifier}'.")
                 assert isinstance(keypoint, InternalKeypoint)
                 matcher.match(keypoint)
+                get_internal_context().check_cancelled()
 
             keypoint_matching_result = InternalMatchingResult(self)
 
             for keypoint in self.keypoints:
+                match_arrays = matcher.get_match_arrays_for_keypoint(keypoint)
+
+                if match_arrays is not None:
+                    keypoint_matching_result.add_matches(keypoint.identifier, *match_arrays)
+                    continue
+
                 for match in matcher.get_matches_for_keypoint(keypoint):
                     assert isinstance(match, IMatch)
                     keypoint_matching_result.add_match(match)
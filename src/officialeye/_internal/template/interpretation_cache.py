@@ -0,0 +1,153 @@
+"""
+Module implementing a cache of the results of interpretation methods, addressed by the contents of the interpreted feature images.
+Documents often contain identical pre-printed or blank fields, and the same documents are often analyzed repeatedly,
+so an interpretation method would otherwise keep interpreting byte-identical images.
+
+The cache consists of an in-memory tier, holding the most recently used entries of a worker process,
+and an optional on-disk tier, which is an SQLite database shared between processes and between separate runs of the program.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Tuple
+
+import numpy as np
+
+# noinspection PyProtectedMember
+from officialeye._internal.template.descriptor_cache import compute_cache_key
+
+# time an SQLite connection waits for other processes to finish writing to the database, in seconds
+_SQLITE_BUSY_TIMEOUT = 10.0
+
+
+def compute_interpretation_cache_key(interpretation_key: str, feature_img: np.ndarray, /) -> str:
+    """
+    Computes the key of the cache entry holding the interpretation of the given feature image.
+
+    Arguments:
+        interpretation_key: Key identifying the interpretation method together with its configuration.
+        feature_img: The warped and mutated image of the feature.
+    """
+
+    img_digest = hashlib.sha256(np.ascontiguousarray(feature_img).data).hexdigest()
+
+    return compute_cache_key("interpretation", interpretation_key, feature_img.shape, feature_img.dtype.str, img_digest)
+
+
+class InterpretationCache:
+    """
+    The in-memory tier is a least-recently-used cache. Entries found in the on-disk tier are promoted to the in-memory tier.
+    The cache can be used by multiple threads at the same time.
+    """
+
+    def __init__(self, max_entries: int, path: str | None, /):
+        """
+        Arguments:
+            max_entries: The maximal number of entries held by the in-memory tier, zero to disable this tier.
+            path: Path to the SQLite database of the on-disk tier, or None to disable this tier.
+        """
+
+        assert max_entries >= 0
+
+        self._max_entries = max_entries
+        self._path = path
+
+        # keys: cache keys
+        # values: interpretations, ordered from the least recently used to the most recently used
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self._entries_lock = threading.Lock()
+
+        # SQLite connections cannot be shared between threads, nor inherited by forked processes
+        self._connections = threading.local()
+
+    def _get_connection(self) -> sqlite3.Connection:
+
+        connection_pid = getattr(self._connections, "pid", None)
+
+        if connection_pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+
+            connection = sqlite3.connect(self._path, timeout=_SQLITE_BUSY_TIMEOUT)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS interpretations (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+            connection.commit()
+
+            self._connections.connection = connection
+            self._connections.pid = os.getpid()
+
+        return self._connections.connection
+
+    def _remember(self, key: str, value: Any, /) -> None:
+
+        if self._max_entries == 0:
+            return
+
+        with self._entries_lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def load(self, key: str, /) -> Tuple[bool, Any]:
+        """
+        Looks up a cache entry, first in memory, and then on disk.
+
+        Returns:
+            Whether the entry has been found, and the cached interpretation, which is None if the entry has not been found.
+
+        Raises:
+            sqlite3.Error: In case the on-disk tier could not be read.
+        """
+
+        with self._entries_lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return True, self._entries[key]
+
+        if self._path is None:
+            return False, None
+
+        row = self._get_connection().execute("SELECT value FROM interpretations WHERE key = ?", (key,)).fetchone()
+
+        if row is None:
+            return False, None
+
+        try:
+            value = pickle.loads(row[0])
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # the entry has been written by an incompatible version of the program
+            return False, None
+
+        self._remember(key, value)
+
+        return True, value
+
+    def store(self, key: str, value: Any, /) -> None:
+        """
+        Stores a cache entry in both tiers.
+
+        Raises:
+            sqlite3.Error: In case the entry could not be written to the on-disk tier.
+            pickle.PicklingError, TypeError, AttributeError: In case the interpretation cannot be pickled for the on-disk tier.
+                The entry is still stored in the in-memory tier.
+        """
+
+        self._remember(key, value)
+
+        if self._path is None:
+            return
+
+        connection = self._get_connection()
+
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO interpretations (key, value) VALUES (?, ?)",
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+            )
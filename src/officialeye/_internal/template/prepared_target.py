@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from officialeye._internal.api_implementation import IApiInterfaceImplementation
+
+if TYPE_CHECKING:
+    # noinspection PyProtectedMember
+    from officialeye._api.context import Context
+
+
+class PreparedTarget(IApiInterfaceImplementation):
+    """
+    Representation of a target image that has been prepared for matching, designed to be passed between processes.
+    It can be shared between all templates with the same target preparation key.
+    It is very important that this class is picklable!
+    """
+
+    def __init__(self, preparation_key: str, data: Any, /):
+        self._preparation_key = preparation_key
+        self._data = data
+
+    @property
+    def preparation_key(self) -> str:
+        return self._preparation_key
+
+    @property
+    def data(self) -> Any:
+        """ The object returned by the matcher, or None if the matcher does not support preparing target images. """
+        return self._data
+
+    def set_api_context(self, context: Context, /) -> None:
+        # no methods of this class require any contextual information to work, nothing to do
+        pass
+
+    def clear_api_context(self) -> None:
+        # no methods of this class require any contextual information to work, nothing to do
+        pass
@@ -54,12 +54,14 @@ def load_template(path: str, /) -> InternalTemplate:
         OEError: In case there has been an error validating the correctness of the template.
     """
 
-    template = get_internal_context().get_template_by_path(path)
+    # prevent other threads of the same worker from loading the same template concurrently
+    with get_internal_context().get_templates_lock():
+        template = get_internal_context().get_template_by_path(path)
 
-    if template is not None:
-        get_internal_afi().info(Verbosity.DEBUG, f"Template at path '{path}' has already been loaded and cached, reusing it!")
-        return template
+        if template is not None:
+            get_internal_afi().info(Verbosity.DEBUG, f"Template at path '{path}' has already been loaded and cached, reusing it!")
+            return template
 
-    get_internal_afi().info(Verbosity.DEBUG, f"Template at path '{path}' has not yet been loaded, loading it.")
+        get_internal_afi().info(Verbosity.DEBUG, f"Template at path '{path}' has not yet been loaded, loading it.")
 
-    return _do_load_template(path)
+        return _do_load_template(path)
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 from abc import ABC
-from typing import TYPE_CHECKING, Dict, Iterable, List
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+
+import numpy as np
 
 # noinspection PyProtectedMember
-from officialeye._api.template.match import IMatch
+from officialeye._api.template.match import IMatch, Match
 
 # noinspection PyProtectedMember
 from officialeye._api.template.matching_result import IMatchingResult
@@ -23,58 +25,234 @@ class SharedMatchingResult(IMatchingResult, ABC):
     The parent process uses the internal representation, whereas the external representation is only for the child process.
     This class represents the aspects that both representations have in common.
     Therefore, it is important that this class operates only on the interface level and is picklable.
+
+    The matches are stored column-wise, i.e., as parallel arrays holding the keypoint, the keypoint point, the target point,
+    and the score of every match, ordered by the keypoint. Instances of `IMatch` are only created once they are asked for.
     """
 
     def __init__(self, template: ITemplate, /):
+
+        # the keypoints of the template, in the order in which their matches are given
+        self._keypoint_ids: List[str] = [keypoint.identifier for keypoint in template.keypoints]
+
         # keys: keypoint ids
-        # values: matches with this keypoint
-        self._matches_dict: Dict[str, List[IMatch]] = {}
+        # values: indices of the keypoints in `_keypoint_ids`
+        self._keypoint_indices: Dict[str, int] = {keypoint_id: i for i, keypoint_id in enumerate(self._keypoint_ids)}
+
+        # the columns of all matches, sorted by the index of the keypoint in a stable manner, i.e., keeping the order in which
+        # the matches of every keypoint have been added
+        self._match_keypoints = np.empty(0, dtype=np.intp)
+        self._keypoint_points = np.empty((0, 2), dtype=int)
+        self._target_points = np.empty((0, 2), dtype=int)
+        self._scores = np.empty(0, dtype=np.float64)
+
+        # columns of the matches that have been added, but not yet merged into the columns above,
+        # which spares reallocating the columns whenever matches are added
+        self._pending_columns: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+
+        # the matches created from the columns, None if they have not been created since the matches have last been modified
+        self._matches: List[IMatch] | None = None
+
+        # the result of `get_packed_points`, None if it has not been computed since the matches have last been modified
+        self._packed_points: Tuple[np.ndarray, np.ndarray] | None = None
+
+    def __getstate__(self) -> dict:
+        self._merge_pending_columns()
+
+        # the derived representations can be recomputed on demand, and would only inflate the pickled result
+        state = self.__dict__.copy()
+        state["_matches"] = None
+        state["_packed_points"] = None
+        return state
+
+    def _invalidate(self) -> None:
+        self._matches = None
+        self._packed_points = None
+
+    def _merge_pending_columns(self) -> None:
+
+        if len(self._pending_columns) == 0:
+            return
+
+        columns = [(self._match_keypoints, self._keypoint_points, self._target_points, self._scores)] + self._pending_columns
+        self._pending_columns = []
+
+        match_keypoints, keypoint_points, target_points, scores = (np.concatenate(column) for column in zip(*columns, strict=True))
 
-        for keypoint in template.keypoints:
-            self._matches_dict[keypoint.identifier] = []
+        order = np.argsort(match_keypoints, kind="stable")
+
+        self._match_keypoints = match_keypoints[order]
+        self._keypoint_points = keypoint_points[order]
+        self._target_points = target_points[order]
+        self._scores = scores[order]
+
+    def _copy_matches(self, matching_result: SharedMatchingResult, /) -> None:
+        """ Replaces the matches of this matching result with the matches of the given one, which must belong to an equivalent template. """
+
+        assert self._keypoint_ids == matching_result._keypoint_ids
+
+        matching_result._merge_pending_columns()
+
+        # the columns are never modified in place, hence they can be shared
+        self._match_keypoints = matching_result._match_keypoints
+        self._keypoint_points = matching_result._keypoint_points
+        self._target_points = matching_result._target_points
+        self._scores = matching_result._scores
+        self._pending_columns = []
+
+        self._invalidate()
+
+    def _keep_matches(self, keep: np.ndarray, /) -> None:
+        """ Removes all matches except for the ones selected by the given index array or boolean mask, keeping their order. """
+
+        self._merge_pending_columns()
+
+        self._match_keypoints = self._match_keypoints[keep]
+        self._keypoint_points = self._keypoint_points[keep]
+        self._target_points = self._target_points[keep]
+        self._scores = self._scores[keep]
+
+        self._invalidate()
 
     def remove_all_matches(self):
-        self._matches_dict = {}
+        self._keep_matches(np.empty(0, dtype=np.intp))
 
     def add_match(self, match: IMatch, /):
-        assert match.keypoint.identifier in self._matches_dict
-        self._matches_dict[match.keypoint.identifier].append(match)
+        self.add_matches(
+            match.keypoint.identifier,
+            match.keypoint_point.reshape(1, 2),
+            match.target_point.reshape(1, 2),
+            np.array([match.get_score()], dtype=np.float64)
+        )
+
+    def add_matches(self, keypoint_id: str, keypoint_points: np.ndarray, target_points: np.ndarray, scores: np.ndarray, /):
+        """
+        Adds multiple matches of a single keypoint at once.
+
+        Arguments:
+            keypoint_id: Identifier of the keypoint that has been matched.
+            keypoint_points: The points lying in the keypoint, relative to its top-left corner, as an array of shape (n, 2).
+            target_points: The corresponding points of the target image, as an array of shape (n, 2).
+            scores: The scores of the matches, as an array of shape (n,).
+        """
+
+        assert keypoint_id in self._keypoint_indices
+
+        keypoint_points = np.asarray(keypoint_points).reshape(-1, 2)
+        target_points = np.asarray(target_points).reshape(-1, 2)
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+
+        assert keypoint_points.shape[0] == target_points.shape[0] == scores.shape[0]
+
+        if scores.shape[0] == 0:
+            return
+
+        match_keypoints = np.full(scores.shape[0], self._keypoint_indices[keypoint_id], dtype=np.intp)
+
+        self._pending_columns.append((match_keypoints, keypoint_points, target_points, scores))
+        self._invalidate()
+
+    def _get_keypoint_offsets(self) -> np.ndarray:
+        """
+        Returns:
+            An array of length k + 1, where k is the number of keypoints, such that the matches of the i-th keypoint
+            are found between the offsets i and i + 1 of the columns.
+        """
+
+        self._merge_pending_columns()
+
+        return np.searchsorted(self._match_keypoints, np.arange(len(self._keypoint_ids) + 1))
+
+    def _create_matches(self, start: int, stop: int, /) -> List[IMatch]:
+
+        template = self.template
+        keypoints = [template.get_keypoint(keypoint_id) for keypoint_id in self._keypoint_ids]
+
+        return [
+            Match(
+                template,
+                keypoints[self._match_keypoints[i]],
+                keypoint_point=self._keypoint_points[i],
+                target_point=self._target_points[i],
+                score=float(self._scores[i])
+            )
+            for i in range(start, stop)
+        ]
+
+    def _get_matches(self) -> List[IMatch]:
+
+        self._merge_pending_columns()
+
+        if self._matches is None:
+            self._matches = self._create_matches(0, self._scores.shape[0])
+
+        return self._matches
+
+    def get_packed_points(self) -> Tuple[np.ndarray, np.ndarray]:
+
+        # every supervision result obtained for this matching result evaluates the same points, so they are packed only once
+        if self._packed_points is None:
+            self._merge_pending_columns()
+
+            template = self.template
+            keypoint_top_lefts = np.array(
+                [template.get_keypoint(keypoint_id).top_left for keypoint_id in self._keypoint_ids],
+                dtype=np.float64
+            ).reshape(-1, 2)
+
+            template_points = self._keypoint_points + keypoint_top_lefts[self._match_keypoints]
+
+            self._packed_points = template_points.astype(np.float64), self._target_points.astype(np.float64)
+
+        return self._packed_points
+
+    def get_match_scores(self) -> np.ndarray:
+        self._merge_pending_columns()
+        return self._scores.copy()
 
     def get_all_matches(self) -> Iterable[IMatch]:
-        for keypoint_id in self._matches_dict:
-            for match in self._matches_dict[keypoint_id]:
-                yield match
+        yield from self._get_matches()
 
     def get_total_match_count(self) -> int:
-        match_count = 0
-        for keypoint_id in self._matches_dict:
-            match_count += len(self._matches_dict[keypoint_id])
-        return match_count
+        return self._scores.shape[0] + sum(scores.shape[0] for _, _, _, scores in self._pending_columns)
 
     def get_keypoint_ids(self) -> Iterable[str]:
-        for keypoint_id in self._matches_dict:
-            yield keypoint_id
+        yield from self._keypoint_ids
 
     def get_matches_for_keypoint(self, keypoint_id: str, /) -> Iterable[IMatch]:
-        for match in self._matches_dict[keypoint_id]:
-            yield match
+
+        keypoint_index = self._keypoint_indices[keypoint_id]
+        keypoint_offsets = self._get_keypoint_offsets()
+
+        start, stop = keypoint_offsets[keypoint_index], keypoint_offsets[keypoint_index + 1]
+
+        if self._matches is not None:
+            yield from self._matches[start:stop]
+        else:
+            # spare creating the matches of all the other keypoints
+            yield from self._create_matches(start, stop)
 
     def validate(self):
 
         get_internal_afi().info(Verbosity.DEBUG, "Validating the keypoint matching result.")
 
-        assert len(self._matches_dict) > 0
+        assert len(self._keypoint_ids) > 0
+
+        keypoint_offsets = self._get_keypoint_offsets()
 
+        # indices of the matches that are kept, per keypoint
+        kept_matches: List[np.ndarray] = []
         total_match_count = 0
 
         # verify that for every keypoint, it has been matched a number of times that is in the desired bounds
-        for keypoint_id in self._matches_dict:
+        for keypoint_index, keypoint_id in enumerate(self._keypoint_ids):
             keypoint = self.template.get_keypoint(keypoint_id)
 
             keypoint_matches_min = keypoint.matches_min
             keypoint_matches_max = keypoint.matches_max
 
-            keypoint_matches_count = len(self._matches_dict[keypoint_id])
+            start, stop = int(keypoint_offsets[keypoint_index]), int(keypoint_offsets[keypoint_index + 1])
+            keypoint_matches_count = stop - start
 
             if keypoint_matches_count < keypoint_matches_min:
                 raise ErrMatchingMatchCountOutOfBounds(
@@ -89,8 +267,13 @@ class SharedMatchingResult(IMatchingResult, ABC):
                     Verbosity.INFO_VERBOSE,
                     f"Keypoint '{keypoint_id}' of template '{self.template.identifier}' has too many matches "
                     f"(matches: {keypoint_matches_count} max: {keypoint_matches_max}). Cherry-picking the best matches.")
-                # cherry-pick the best matches
-                self._matches_dict[keypoint_id] = sorted(self._matches_dict[keypoint_id])[-keypoint_matches_max:]
+
+                # cherry-pick the best matches, which are then ordered by their score, from the worst one to the best one
+                scores = self._scores[start:stop]
+                best = np.argpartition(scores, keypoint_matches_count - keypoint_matches_max)[keypoint_matches_count - keypoint_matches_max:]
+                best = best[np.lexsort((best, scores[best]))]
+
+                kept_matches.append(start + best)
                 keypoint_matches_count = keypoint_matches_max
             else:
                 get_internal_afi().info(
@@ -98,9 +281,13 @@ class SharedMatchingResult(IMatchingResult, ABC):
                     f"Keypoint '{keypoint_id}' of template '{self.template.identifier}' has been matched {keypoint_matches_count} times "
                     f"(min: {keypoint_matches_min} max: {keypoint_matches_max})."
                 )
+                kept_matches.append(np.arange(start, stop))
 
             total_match_count += keypoint_matches_count
 
+        if total_match_count < self._scores.shape[0]:
+            self._keep_matches(np.concatenate(kept_matches))
+
         assert total_match_count >= 0
         if total_match_count == 0:
             raise ErrMatchingMatchCountOutOfBounds(
@@ -0,0 +1,136 @@
+"""
+Module implementing a combined nearest-neighbour index over the keypoint descriptors of multiple templates.
+The index is used to quickly estimate which templates are likely to match a target image, before running the full analysis.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, List
+
+import cv2
+import numpy as np
+
+from officialeye._internal.api_implementation import IApiInterfaceImplementation
+
+if TYPE_CHECKING:
+    # noinspection PyProtectedMember
+    from officialeye._api.context import Context
+    from officialeye._internal.template.internal_template import InternalTemplate
+
+# ratio between the distance to the nearest indexed descriptor and the distance to another indexed descriptor,
+# below which the other descriptor is considered to be a clearly worse match
+_ROUTING_RATIO = 0.6
+
+# number of nearest indexed descriptors to consider for every target descriptor
+_ROUTING_NEIGHBOURS = 4
+
+_FLANN_INDEX_PARAMS = {"algorithm": 1, "trees": 5}
+_FLANN_SEARCH_PARAMS = {"checks": 50}
+
+
+class TemplateVotes(IApiInterfaceImplementation):
+    """
+    Representation of the votes cast by the descriptors of a target image for the templates, designed to be passed between processes.
+    It is very important that this class is picklable!
+    """
+
+    def __init__(self, votes: Dict[str, int] | None, /):
+        self._votes = votes
+
+    @property
+    def votes(self) -> Dict[str, int] | None:
+        """ Mapping of template ids to the number of votes, or None if the matcher of the templates does not support routing. """
+        return self._votes
+
+    def set_api_context(self, context: Context, /) -> None:
+        # no methods of this class require any contextual information to work, nothing to do
+        pass
+
+    def clear_api_context(self) -> None:
+        # no methods of this class require any contextual information to work, nothing to do
+        pass
+
+
+class TemplateIndex:
+    """
+    Index over the keypoint descriptors of a set of templates, which all share the same target preparation key.
+    Every indexed descriptor is tagged with the template it has been computed for.
+    """
+
+    def __init__(self, templates: List[InternalTemplate], /):
+        assert len(templates) > 0
+        assert len(set(template.get_target_preparation_key() for template in templates)) == 1, \
+            "Descriptors of templates with different target preparation keys are not comparable"
+
+        self._template_ids: List[str] = [template.identifier for template in templates]
+
+        descriptor_blocks: List[np.ndarray] = []
+        template_labels: List[np.ndarray] = []
+
+        # None indicates that the matcher does not support descriptor-based routing
+        self._descriptors: np.ndarray | None = None
+        self._template_labels: np.ndarray | None = None
+        self._flann: cv2.flann.Index | None = None
+
+        for template_index, template in enumerate(templates):
+            matcher = template.get_matcher()
+
+            for keypoint in template.keypoints:
+                descriptors = matcher.get_keypoint_descriptors(keypoint)
+
+                if descriptors is None:
+                    return
+
+                descriptor_blocks.append(np.asarray(descriptors, dtype=np.float32))
+                template_labels.append(np.full(descriptors.shape[0], template_index, dtype=np.int64))
+
+        self._template_labels = np.concatenate(template_labels) if len(template_labels) > 0 else np.empty(0, dtype=np.int64)
+
+        if self._template_labels.shape[0] >= 2:
+            # the index does not necessarily copy the data, so a reference to it has to be kept for as long as the index lives
+            self._descriptors = np.ascontiguousarray(np.concatenate(descriptor_blocks))
+            self._flann = cv2.flann.Index(self._descriptors, _FLANN_INDEX_PARAMS)
+
+    def is_supported(self) -> bool:
+        return self._template_labels is not None
+
+    def vote(self, target_descriptors: np.ndarray | None, /) -> TemplateVotes:
+        """
+        Lets every target descriptor vote for the templates its nearest indexed descriptors belong to.
+
+        A target descriptor votes for each template that has an indexed descriptor approximately as close as the nearest one,
+        provided that at least one of the other nearest indexed descriptors is a clearly worse match.
+        Descriptors without such a distinctive match are most likely background and do not vote at all.
+        Unlike the classic ratio test, this does not reject matches merely because several templates share similar content,
+        which would otherwise make templates with common elements lose votes to unrelated ones.
+        """
+
+        if not self.is_supported() or target_descriptors is None:
+            return TemplateVotes(None)
+
+        votes = np.zeros(len(self._template_ids), dtype=np.int64)
+
+        if self._flann is not None and target_descriptors.shape[0] > 0:
+            neighbour_count = min(_ROUTING_NEIGHBOURS, self._descriptors.shape[0])
+
+            neighbour_indices, neighbour_distances = self._flann.knnSearch(
+                np.ascontiguousarray(target_descriptors, dtype=np.float32), neighbour_count, params=_FLANN_SEARCH_PARAMS
+            )
+
+            # the index reports squared euclidean distances, sorted in ascending order
+            is_close = neighbour_distances[:, :1] >= (_ROUTING_RATIO ** 2) * neighbour_distances
+            is_distinctive = ~is_close[:, -1]
+
+            neighbour_labels = self._template_labels[neighbour_indices[is_distinctive]]
+            neighbour_labels[~is_close[is_distinctive]] = -1
+
+            # every target descriptor votes at most once for each template
+            voting_rows = np.broadcast_to(np.arange(neighbour_labels.shape[0])[:, np.newaxis], neighbour_labels.shape)
+            template_count = len(self._template_ids)
+            ballots = np.unique(voting_rows[neighbour_labels >= 0] * template_count + neighbour_labels[neighbour_labels >= 0])
+
+            votes = np.bincount(ballots % template_count, minlength=template_count)
+
+        return TemplateVotes({
+            template_id: int(template_votes) for template_id, template_votes in zip(self._template_ids, votes, strict=True)
+        })
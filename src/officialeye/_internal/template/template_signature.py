@@ -0,0 +1,78 @@
+"""
+Module implementing compact global signatures of images, which can be compared much faster than running the matching engine.
+They are used to discard templates that obviously do not correspond to a target image, before any per-template analysis takes place.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import cv2
+import numpy as np
+
+from officialeye._internal.api_implementation import IApiInterfaceImplementation
+
+if TYPE_CHECKING:
+    # noinspection PyProtectedMember
+    from officialeye._api.context import Context
+
+# length of the longer side of the thumbnail the signature is computed from
+_THUMBNAIL_SIZE = 128
+
+# number of bins of the hue, saturation and value channels, respectively
+_HISTOGRAM_BINS = [8, 4, 4]
+
+
+def compute_signature(img: np.ndarray, /) -> np.ndarray:
+    """
+    Computes the signature of an image in the BGR format, which is its normalized HSV colour histogram.
+    Unlike thumbnails or aspect ratios, histograms are not affected by the position, scale or orientation of the document in the image.
+    """
+
+    height, width = img.shape[:2]
+    scale = _THUMBNAIL_SIZE / max(height, width, 1)
+
+    if scale < 1.0:
+        img = cv2.resize(img, (max(round(width * scale), 1), max(round(height * scale), 1)), interpolation=cv2.INTER_AREA)
+
+    img_hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+
+    histogram = cv2.calcHist([img_hsv], [0, 1, 2], None, _HISTOGRAM_BINS, [0, 180, 0, 256, 0, 256]).flatten()
+
+    total = histogram.sum()
+
+    if total > 0:
+        histogram /= total
+
+    return histogram.astype(np.float32)
+
+
+def compare_signatures(signature_1: np.ndarray, signature_2: np.ndarray, /) -> float:
+    """
+    Computes the similarity of two signatures, which is a value between 0 (nothing in common) and 1 (identical colour distribution).
+    """
+
+    assert signature_1.shape == signature_2.shape
+    return float(np.minimum(signature_1, signature_2).sum())
+
+
+class TemplateSignature(IApiInterfaceImplementation):
+    """
+    Representation of the signature of a template, designed to be passed between processes.
+    It is very important that this class is picklable!
+    """
+
+    def __init__(self, signature: np.ndarray, /):
+        self._signature = signature
+
+    @property
+    def signature(self) -> np.ndarray:
+        return self._signature
+
+    def set_api_context(self, context: Context, /) -> None:
+        # no methods of this class require any contextual information to work, nothing to do
+        pass
+
+    def clear_api_context(self) -> None:
+        # no methods of this class require any contextual information to work, nothing to do
+        pass
@@ -6,4 +6,4 @@ Module providing an API for all OfficialEye's document detection tools.
 # ruff: noqa: F401
 
 # noinspection PyProtectedMember,PyUnresolvedReferences
-from officialeye._api.detection import detect
+from officialeye._api.detection import detect, detect_and_interpret, detect_and_interpret_async, detect_async, detect_many
@@ -0,0 +1,45 @@
+import os
+import signal
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+# noinspection PyProtectedMember
+from officialeye._api.backend import AffinityExecutor
+
+
+def _kill_worker():
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def test_affinity_executor_affinity():
+
+    executor = AffinityExecutor(2)
+
+    try:
+        worker_pid = executor.submit_with_affinity("a", os.getpid).result()
+
+        for _ in range(3):
+            assert executor.submit_with_affinity("a", os.getpid).result() == worker_pid
+    finally:
+        executor.shutdown()
+
+
+def test_affinity_executor_killed_worker():
+
+    executor = AffinityExecutor(1)
+
+    try:
+        worker_pid = executor.submit_with_affinity("a", os.getpid).result()
+
+        with pytest.raises(BrokenProcessPool):
+            executor.submit_with_affinity("a", _kill_worker).result()
+
+        # the dead worker has been replaced by a fresh one, which runs all the following tasks
+        new_worker_pid = executor.submit_with_affinity("a", os.getpid).result()
+        assert new_worker_pid != worker_pid
+
+        assert executor.submit(sum, [1, 2, 3]).result() == 6
+        assert executor.submit_with_affinity("a", os.getpid).result() == new_worker_pid
+    finally:
+        executor.shutdown()
@@ -1,5 +1,16 @@
+import os
+import pickle
+import shutil
+
+import cv2
+import numpy as np
 import pytest
-from officialeye import Context, Template
+
+from officialeye import Backend, Context, Image, Template
+
+# noinspection PyProtectedMember
+from officialeye._internal.image_transport import SharedImage, open_image
+from officialeye.error.errors.general import ErrInvalidArgument, ErrInvalidIdentifier, ErrInvalidImage
 from officialeye.error.errors.internal import ErrInvalidState
 
 
@@ -38,6 +49,45 @@ def test_template_load():
         assert template.name == "Driver License RU"
 
 
+@pytest.mark.parametrize("backend", [Backend.INLINE, Backend.THREAD, Backend.PROCESS])
+def test_template_load_backend(backend: Backend):
+
+    with Context(backend=backend, max_workers=2) as context:
+        template = Template(context, path="docs/assets/templates/driver_license_ru_01/driver_license_ru.yml")
+        assert template.identifier == "driver_license_ru"
+        assert len([k for k in template.keypoints]) == 6
+
+
+def test_context_invalid_backend():
+
+    with pytest.raises(ErrInvalidArgument):
+        Context(backend="cluster")
+
+    with pytest.raises(ErrInvalidArgument):
+        Context(backend=Backend.THREAD, max_workers=0)
+
+    with pytest.raises(ErrInvalidArgument):
+        Context(interpretation_threads=0)
+
+    with pytest.raises(ErrInvalidArgument):
+        Context(interpretation_cache_size=-1)
+
+
+def test_template_load_does_not_decode_images(monkeypatch):
+
+    def _imread(*_args, **_kwargs):
+        pytest.fail("Loading a template should not decode any images.")
+
+    monkeypatch.setattr(cv2, "imread", _imread)
+
+    with Context(backend=Backend.INLINE) as context:
+        template = Template(context, path="docs/assets/templates/driver_license_ru_01/driver_license_ru.yml")
+        template.load()
+
+        # the dimensions are read from the header of the source image
+        assert (template.width, template.height) == (1308, 812)
+
+
 def test_image_dimensions():
 
     with Context() as context:
@@ -55,3 +105,97 @@ def test_mutated_image_dimensions():
         h, w, _ = img.shape
         assert template.width == w
         assert template.height == h
+
+
+def test_in_memory_images():
+
+    image_path = "docs/assets/templates/driver_license_ru_01/examples/01.jpg"
+
+    with Context() as context:
+        img = Image(context, path=image_path).load()
+
+        with open(image_path, "rb") as fh:
+            assert np.array_equal(Image.from_bytes(context, fh.read()).load(), img)
+
+        assert np.array_equal(Image.from_array(context, img).load(), img)
+
+        with pytest.raises(ErrInvalidImage):
+            Image.from_array(context, img[:, :, 0])
+
+        with pytest.raises(ErrInvalidArgument):
+            Image(context)
+
+
+def _assert_released(shared_image: SharedImage, /):
+
+    # the handles received by the workers can no longer attach to the segment
+    with pytest.raises(FileNotFoundError):
+        with open_image(pickle.loads(pickle.dumps(shared_image))):
+            pass
+
+
+def test_shared_images():
+
+    image_path = "docs/assets/templates/driver_license_ru_01/examples/01.jpg"
+
+    with Context(backend=Backend.PROCESS, share_images=True) as context:
+        image = Image(context, path=image_path)
+
+        # noinspection PyProtectedMember
+        shared_image = image._get_source()
+
+        assert isinstance(shared_image, SharedImage)
+
+        # the image is decoded and shared only once
+        # noinspection PyProtectedMember
+        assert image._get_source() is shared_image
+
+        with open_image(pickle.loads(pickle.dumps(shared_image))) as img:
+            assert np.array_equal(img, image.load())
+
+        # noinspection PyProtectedMember
+        image._release_source()
+        _assert_released(shared_image)
+
+        # releasing the image again does nothing, while the image is shared again once it is needed
+        # noinspection PyProtectedMember
+        image._release_source()
+
+        # noinspection PyProtectedMember
+        live_shared_image = image._get_source()
+        assert live_shared_image is not shared_image
+
+    # disposing the context releases the images that are still shared
+    _assert_released(live_shared_image)
+
+    # noinspection PyProtectedMember
+    assert len(context._shared_images) == 0
+
+    # releasing the image once the context has been disposed does nothing
+    # noinspection PyProtectedMember
+    image._release_source()
+
+
+def test_register_duplicate_supervisor():
+
+    with Context() as context:
+        with pytest.raises(ErrInvalidIdentifier):
+            context.register_supervisor("least_squares_regression", lambda config: None)
+
+
+def test_thread_contexts_isolated(tmp_path):
+
+    template_dir = "docs/assets/templates/driver_license_ru_01"
+
+    # a copy of the template, located at a different path, but with the same template id
+    for file_name in ("driver_license_ru.yml", "driver_license_ru.jpg"):
+        shutil.copy(os.path.join(template_dir, file_name), tmp_path / file_name)
+
+    with Context(backend=Backend.THREAD) as context_1, Context(backend=Backend.THREAD) as context_2:
+        template_1 = Template(context_1, path=os.path.join(template_dir, "driver_license_ru.yml"))
+        template_2 = Template(context_2, path=str(tmp_path / "driver_license_ru.yml"))
+
+        template_1.load()
+        template_2.load()
+
+        assert template_1.identifier == template_2.identifier == "driver_license_ru"
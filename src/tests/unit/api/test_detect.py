@@ -1,13 +1,106 @@
+import asyncio
+import os
+import shutil
+import threading
 from difflib import SequenceMatcher
+from typing import Dict
 
-from officialeye import Context, IImage, IInterpretationResult, Image, ISupervisionResult, Template
-from officialeye.detection import detect
+import cv2
+import numpy as np
+import pytest
+
+from officialeye import Backend, Context, Future, IImage, IInterpretationResult, Image, ISupervisionResult, SupervisionResult, Template, wait_async
+
+# noinspection PyProtectedMember
+from officialeye._api.template.interpretation import Interpretation
+
+# noinspection PyProtectedMember
+from officialeye._api_builtins.matcher import sift_flann
+
+# noinspection PyProtectedMember
+from officialeye._api_builtins.matcher.sift_flann import SiftFlannMatcher
+
+# noinspection PyProtectedMember
+from officialeye._internal.api.interpret import interpret_features
+
+# noinspection PyProtectedMember
+from officialeye._internal.context.singleton import get_internal_context
+
+# noinspection PyProtectedMember
+from officialeye._internal.feedback.dummy import DummyFeedbackInterface
+
+# noinspection PyProtectedMember
+from officialeye._internal.template import external_supervision_result
+
+# noinspection PyProtectedMember
+from officialeye._internal.template.internal_template import InternalTemplate
+
+# noinspection PyProtectedMember
+from officialeye._internal.template.schema.loader import load_template
+from officialeye.detection import detect, detect_and_interpret, detect_and_interpret_async, detect_async, detect_many
+from officialeye.error.errors.general import ErrInvalidArgument
+from officialeye.error.errors.internal import ErrInternal
+from officialeye.error.errors.supervision import ErrSupervisionCorrespondenceNotFound
+
+_TEMPLATE_DIR = "docs/assets/templates/driver_license_ru_01"
+_TARGET_PATH = "docs/assets/templates/driver_license_ru_01/examples/01.jpg"
 
 
 def sequence_similarity_measure(str_1: str, str_2: str, /) -> float:
     return SequenceMatcher(None, str_1, str_2).ratio()
 
 
+def copy_template(directory, /, *, template_id: str = "driver_license_ru", pyramid_scale: float | None = None,
+                  source_img: np.ndarray | None = None, interpretation_method: str | None = None,
+                  interpretation_config: Dict[str, str] | None = None) -> str:
+    """
+    Copies the driver license template to the given directory, using the deterministic and fast least squares regression supervisor.
+    If a pyramid scale is given, the keypoints are matched in the coarse-to-fine mode.
+    If a source image is given, the copy uses it instead of the image of the driver license.
+    If an interpretation method is given, all features are interpreted by it, with the given configuration, instead of by OCR.
+
+    Returns:
+        The path to the copied template.
+    """
+
+    if source_img is None:
+        source_name = f"{template_id}.jpg"
+        shutil.copy(os.path.join(_TEMPLATE_DIR, "driver_license_ru.jpg"), os.path.join(directory, source_name))
+    else:
+        source_name = f"{template_id}.png"
+        cv2.imwrite(os.path.join(directory, source_name), source_img)
+
+    with open(os.path.join(_TEMPLATE_DIR, "driver_license_ru.yml"), "r") as fh:
+        template_yml = fh.read()
+
+    template_yml = template_yml.replace("engine: combinatorial", "engine: least_squares_regression")
+    template_yml = template_yml.replace('id: "driver_license_ru"', f'id: "{template_id}"', 1)
+    template_yml = template_yml.replace('source: "driver_license_ru.jpg"', f'source: "{source_name}"', 1)
+
+    if pyramid_scale is not None:
+        template_yml = template_yml.replace("sensitivity: 0.7", f"sensitivity: 0.7\n      pyramid_scale: {pyramid_scale}", 1)
+
+    if interpretation_method is not None:
+        config_yml = "".join(f"\n        {key}: {value}" for key, value in (interpretation_config or {}).items())
+        template_yml = template_yml.replace(
+            "method: ocr_tesseract\n      config:\n        config: --dpi 1000",
+            f"method: {interpretation_method}\n      config:{config_yml}",
+            1
+        )
+
+        # the feature classes inheriting the interpretation method replace its configuration with their own
+        if interpretation_config is not None:
+            for lang in ("rus", "eng"):
+                template_yml = template_yml.replace(f"\n        lang: {lang}", config_yml, 1)
+
+    template_path = os.path.join(directory, f"{template_id}.yml")
+
+    with open(template_path, "w") as fh:
+        fh.write(template_yml)
+
+    return template_path
+
+
 def test_driver_license_ru():
 
     with Context() as context:
@@ -32,3 +125,688 @@ def test_driver_license_ru():
         assert sequence_similarity_measure(feature_interpretation_dict["last_name_ru"], "СУРГУТСКИЙ") >= 0.6
         assert sequence_similarity_measure(feature_interpretation_dict["name_ru"], "ИГОРЬ ВЛАДИСЛАВОВИЧ") >= 0.6
         assert sequence_similarity_measure(feature_interpretation_dict["birthday"], "16.10.1986") >= 0.8
+
+
+def test_detect_invalid_route_top_k():
+
+    with Context() as context:
+        template = Template(context, path="docs/assets/templates/driver_license_ru_01/driver_license_ru.yml")
+        image = Image(context, path="docs/assets/templates/driver_license_ru_01/examples/01.jpg")
+
+        with pytest.raises(ErrInvalidArgument):
+            detect(context, template, target=image, route_top_k=0)
+
+
+def test_detect_prefilter(tmp_path):
+
+    template_path = copy_template(tmp_path)
+
+    with Context() as context:
+        template = Template(context, path=template_path)
+        image = Image(context, path=_TARGET_PATH)
+
+        result = detect(context, template, target=image, prefilter_threshold=0.0)
+        assert result.template.identifier == "driver_license_ru"
+
+        # the colour histograms of the photo and of the template differ, hence the template is discarded
+        with pytest.raises(ErrSupervisionCorrespondenceNotFound):
+            detect(context, template, target=image, prefilter_threshold=1.0)
+
+
+class _UnreadableImage(Image):
+
+    def _get_source(self):
+        raise RuntimeError("The image cannot be read.")
+
+
+def test_detect_many_error(tmp_path):
+
+    template_path = copy_template(tmp_path)
+
+    with Context() as context:
+        template = Template(context, path=template_path)
+
+        targets = [Image(context, path=_TARGET_PATH), _UnreadableImage(context, path=_TARGET_PATH), Image(context, path=_TARGET_PATH)]
+
+        results = dict(detect_many(context, [template], targets, max_in_flight=1))
+
+        assert len(results) == 3
+
+        assert isinstance(results[targets[0]], ISupervisionResult)
+        assert isinstance(results[targets[2]], ISupervisionResult)
+
+        # the error concerning the second target image is reported as its result, without aborting the analysis of the third one
+        error = results[targets[1]]
+        assert isinstance(error, ErrInternal)
+        assert isinstance(error.get_external_causes()[0], RuntimeError)
+
+
+def test_warp_features(tmp_path):
+
+    template_path = copy_template(tmp_path)
+
+    with Context() as context:
+        image = Image(context, path=_TARGET_PATH)
+        result = detect(context, Template(context, path=template_path), target=image)
+
+        features = list(result.template.features)
+        target = image.load()
+
+        feature_images = result.warp_features(features, target, union=True)
+
+        for feature, feature_image in zip(features, feature_images, strict=True):
+            assert feature_image.shape == (feature.h, feature.w, 3)
+
+        # the images of the features do not share their pixels, even though they are cut out of the same image
+        for feature_image in feature_images[1:]:
+            feature_image[:] = 0
+
+        assert np.array_equal(feature_images[0], result.warp_features(features, target, union=True)[0])
+
+
+def test_detect_early_exit(tmp_path, monkeypatch):
+
+    template_paths = [copy_template(tmp_path, template_id=f"driver_license_ru_{i}") for i in range(4)]
+
+    # ids of the templates whose analysis has been completed
+    detected_template_ids = []
+
+    original_do_detect = InternalTemplate.do_detect
+
+    def _do_detect(self, *args, **kwargs):
+        result = original_do_detect(self, *args, **kwargs)
+        detected_template_ids.append(self.identifier)
+        return result
+
+    monkeypatch.setattr(InternalTemplate, "do_detect", _do_detect)
+
+    with Context(backend=Backend.THREAD, max_workers=1) as context:
+        templates = [Template(context, path=template_path) for template_path in template_paths]
+        image = Image(context, path=_TARGET_PATH)
+
+        result = detect(context, *templates, target=image, early_exit_threshold=0.0)
+
+        # the first result is accepted right away, so the templates waiting for the worker are not analyzed at all,
+        # and the analysis that has possibly started in the meantime is cancelled
+        assert result.template.identifier == detected_template_ids[0]
+
+    assert 1 <= len(detected_template_ids) < len(templates)
+
+
+def _create_scaled_target(directory, /, *, scale: float, offset: tuple) -> str:
+    """
+    Creates a synthetic target image, showing the template image scaled by the given factor and placed at the given offset.
+
+    Returns:
+        The path to the target image.
+    """
+
+    template_img = cv2.imread(os.path.join(_TEMPLATE_DIR, "driver_license_ru.jpg"))
+    scaled_img = cv2.resize(template_img, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+
+    target_img = np.full((scaled_img.shape[0] + 2 * offset[1], scaled_img.shape[1] + 2 * offset[0], 3), 127, dtype=np.uint8)
+    target_img[offset[1]:offset[1] + scaled_img.shape[0], offset[0]:offset[0] + scaled_img.shape[1]] = scaled_img
+
+    target_path = os.path.join(directory, "scaled_target.png")
+    cv2.imwrite(target_path, target_img)
+
+    return target_path
+
+
+def _check_alignment(result: ISupervisionResult, scale: float, offset: tuple, /):
+
+    for template_point in ([0.0, 0.0], [1000.0, 0.0], [500.0, 600.0]):
+        expected_target_point = np.array(template_point) * scale + np.array(offset)
+        assert np.abs(result.translate(np.array(template_point)) - expected_target_point).max() < 5.0
+
+
+def test_detect_combinatorial(monkeypatch):
+
+    # the weights that have been assigned to the matches one by one
+    single_match_weights = []
+
+    original_set_match_weight = SupervisionResult.set_match_weight
+
+    def _set_match_weight(self, match, weight, /):
+        single_match_weights.append(weight)
+        original_set_match_weight(self, match, weight)
+
+    monkeypatch.setattr(SupervisionResult, "set_match_weight", _set_match_weight)
+
+    with Context(backend=Backend.INLINE) as context:
+        template = Template(context, path=os.path.join(_TEMPLATE_DIR, "driver_license_ru.yml"))
+        result = detect(context, template, target=Image(context, path=_TARGET_PATH))
+
+        assert result.template.identifier == "driver_license_ru"
+
+        # the supervisor assigns the weights of all matches at once
+        assert single_match_weights == []
+        assert 0.0 < result.get_normalized_score() <= 1.0
+        assert np.isfinite(result.get_weighted_mse())
+
+
+def test_detect_pyramid(tmp_path, monkeypatch):
+
+    template_path = copy_template(tmp_path, pyramid_scale=0.25)
+    target_path = _create_scaled_target(tmp_path, scale=1.5, offset=(200, 150))
+
+    estimated_alignments = []
+
+    original_estimate_alignment = SiftFlannMatcher._estimate_alignment
+
+    def _estimate_alignment(self, *args, **kwargs):
+        alignment = original_estimate_alignment(self, *args, **kwargs)
+        estimated_alignments.append(alignment)
+        return alignment
+
+    monkeypatch.setattr(SiftFlannMatcher, "_estimate_alignment", _estimate_alignment)
+
+    with Context(backend=Backend.INLINE) as context:
+        result = detect(context, Template(context, path=template_path), target=Image(context, path=target_path))
+
+    # the template has been located in the downscaled target, and only then matched in full resolution
+    assert len(estimated_alignments) == 1 and estimated_alignments[0] is not None
+    _check_alignment(result, 1.5, (200, 150))
+
+
+def test_detect_pyramid_fallback(tmp_path, monkeypatch):
+
+    template_path = copy_template(tmp_path, pyramid_scale=0.25)
+    target_path = _create_scaled_target(tmp_path, scale=1.5, offset=(200, 150))
+
+    # the template cannot be located in the downscaled target, hence the whole full-resolution target is matched instead
+    monkeypatch.setattr(SiftFlannMatcher, "_estimate_alignment", lambda *_args, **_kwargs: None)
+
+    with Context(backend=Backend.INLINE) as context:
+        result = detect(context, Template(context, path=template_path), target=Image(context, path=target_path))
+
+    _check_alignment(result, 1.5, (200, 150))
+
+
+def test_detect_pyramid_fallback_shared(tmp_path, monkeypatch):
+
+    template_paths = [copy_template(tmp_path, template_id=f"driver_license_ru_{i}", pyramid_scale=0.25) for i in range(3)]
+    target_path = _create_scaled_target(tmp_path, scale=1.5, offset=(200, 150))
+
+    monkeypatch.setattr(SiftFlannMatcher, "_estimate_alignment", lambda *_args, **_kwargs: None)
+
+    target_shape = cv2.imread(target_path).shape[:2]
+
+    # number of times the features of the full-resolution target have been computed
+    full_resolution_detection_count = 0
+
+    original_detect_features = sift_flann._detect_features
+
+    def _detect_features(img, /):
+        nonlocal full_resolution_detection_count
+        if img.shape[:2] == target_shape:
+            full_resolution_detection_count += 1
+        return original_detect_features(img)
+
+    monkeypatch.setattr(sift_flann, "_detect_features", _detect_features)
+
+    with Context(backend=Backend.INLINE) as context:
+        templates = [Template(context, path=template_path) for template_path in template_paths]
+        result = detect(context, *templates, target=Image(context, path=target_path))
+
+    # none of the templates can be located in the downscaled target, but the features of the full-resolution target are computed only once
+    assert full_resolution_detection_count == 1
+    _check_alignment(result, 1.5, (200, 150))
+
+
+def test_route_pyramid(tmp_path, monkeypatch):
+
+    # a template with the same keypoints and features, but showing noise instead of a driver license
+    decoy_img = np.random.default_rng(0).integers(0, 256, size=(812, 1308, 3), dtype=np.uint8)
+
+    template_path = copy_template(tmp_path, pyramid_scale=0.25)
+    decoy_template_path = copy_template(tmp_path, template_id="decoy", pyramid_scale=0.25, source_img=decoy_img)
+
+    target_path = _create_scaled_target(tmp_path, scale=1.5, offset=(200, 150))
+
+    # ids of the templates that have been fully analyzed
+    detected_template_ids = []
+
+    original_do_detect = InternalTemplate.do_detect
+
+    def _do_detect(self, *args, **kwargs):
+        detected_template_ids.append(self.identifier)
+        return original_do_detect(self, *args, **kwargs)
+
+    monkeypatch.setattr(InternalTemplate, "do_detect", _do_detect)
+
+    # ids of the templates whose keypoint features have been computed in full resolution
+    full_resolution_template_ids = set()
+
+    original_compute_keypoint_features = SiftFlannMatcher._compute_keypoint_features
+
+    def _compute_keypoint_features(self, keypoint, /, *, coarse: bool):
+        if not coarse:
+            full_resolution_template_ids.add(keypoint.template.identifier)
+        return original_compute_keypoint_features(self, keypoint, coarse=coarse)
+
+    monkeypatch.setattr(SiftFlannMatcher, "_compute_keypoint_features", _compute_keypoint_features)
+
+    with Context(backend=Backend.INLINE) as context:
+        templates = [Template(context, path=decoy_template_path), Template(context, path=template_path)]
+        result = detect(context, *templates, target=Image(context, path=target_path), route_top_k=1)
+
+    assert detected_template_ids == ["driver_license_ru"]
+
+    # the descriptors of the downscaled target have been compared with the descriptors of the equally downscaled keypoints
+    assert full_resolution_template_ids == {"driver_license_ru"}
+    _check_alignment(result, 1.5, (200, 150))
+
+
+def test_route_templates(tmp_path, monkeypatch):
+
+    # a template with the same keypoints and features, but showing noise instead of a driver license
+    decoy_img = np.random.default_rng(0).integers(0, 256, size=(812, 1308, 3), dtype=np.uint8)
+
+    template_path = copy_template(tmp_path)
+    decoy_template_path = copy_template(tmp_path, template_id="decoy", source_img=decoy_img)
+
+    # ids of the templates that have been fully analyzed
+    detected_template_ids = []
+
+    original_do_detect = InternalTemplate.do_detect
+
+    def _do_detect(self, *args, **kwargs):
+        detected_template_ids.append(self.identifier)
+        return original_do_detect(self, *args, **kwargs)
+
+    monkeypatch.setattr(InternalTemplate, "do_detect", _do_detect)
+
+    with Context(backend=Backend.INLINE) as context:
+        templates = [Template(context, path=decoy_template_path), Template(context, path=template_path)]
+        image = Image(context, path=_TARGET_PATH)
+
+        result = detect(context, *templates, target=image, route_top_k=1)
+        assert result.template.identifier == "driver_license_ru"
+        assert detected_template_ids == ["driver_license_ru"]
+
+        # with enough room for all the templates, none of them is discarded
+        detected_template_ids.clear()
+
+        result = detect(context, *templates, target=image, route_top_k=2)
+        assert result.template.identifier == "driver_license_ru"
+        assert sorted(detected_template_ids) == ["decoy", "driver_license_ru"]
+
+
+def test_route_templates_per_preparation_key(tmp_path, monkeypatch):
+
+    # a template with the same keypoints and features, but showing noise instead of a driver license
+    decoy_img = np.random.default_rng(0).integers(0, 256, size=(812, 1308, 3), dtype=np.uint8)
+
+    # two groups of templates, whose target images are prepared differently, and whose votes are hence not comparable
+    template_paths = [
+        copy_template(tmp_path, template_id="decoy", source_img=decoy_img),
+        copy_template(tmp_path),
+        copy_template(tmp_path, template_id="decoy_pyramid", pyramid_scale=0.25, source_img=decoy_img),
+        copy_template(tmp_path, template_id="driver_license_ru_pyramid", pyramid_scale=0.25),
+    ]
+
+    # ids of the templates that have been fully analyzed
+    detected_template_ids = []
+
+    original_do_detect = InternalTemplate.do_detect
+
+    def _do_detect(self, *args, **kwargs):
+        detected_template_ids.append(self.identifier)
+        return original_do_detect(self, *args, **kwargs)
+
+    monkeypatch.setattr(InternalTemplate, "do_detect", _do_detect)
+
+    with Context(backend=Backend.INLINE) as context:
+        templates = [Template(context, path=template_path) for template_path in template_paths]
+        result = detect(context, *templates, target=Image(context, path=_TARGET_PATH), route_top_k=1)
+
+    # the best template of each group is analyzed
+    assert sorted(detected_template_ids) == ["driver_license_ru", "driver_license_ru_pyramid"]
+    assert result.template.identifier in detected_template_ids
+
+
+def test_detect_prepared_target(tmp_path, monkeypatch):
+
+    template_paths = [copy_template(tmp_path, template_id=f"driver_license_ru_{i}") for i in range(2)]
+    target_path = _create_scaled_target(tmp_path, scale=1.5, offset=(200, 150))
+
+    prepared_target_count = 0
+
+    original_prepare_target = InternalTemplate.prepare_target
+
+    def _prepare_target(self, *args, **kwargs):
+        nonlocal prepared_target_count
+        prepared_target_count += 1
+        return original_prepare_target(self, *args, **kwargs)
+
+    monkeypatch.setattr(InternalTemplate, "prepare_target", _prepare_target)
+
+    # whether the analyses have been given a prepared target
+    given_prepared_targets = []
+
+    original_do_detect = InternalTemplate.do_detect
+
+    def _do_detect(self, target, /, *, prepared_target=None):
+        given_prepared_targets.append(prepared_target is not None)
+        return original_do_detect(self, target, prepared_target=prepared_target)
+
+    monkeypatch.setattr(InternalTemplate, "do_detect", _do_detect)
+
+    with Context(backend=Backend.INLINE) as context:
+        templates = [Template(context, path=template_path) for template_path in template_paths]
+        image = Image(context, path=target_path)
+
+        # the templates share their target preparation key, hence the target image is prepared once for both of them
+        shared_result = detect(context, *templates, target=image)
+
+        assert prepared_target_count == 1
+        assert given_prepared_targets == [True, True]
+
+        prepared_target_count = 0
+        given_prepared_targets.clear()
+
+        # a single template prepares the target image as part of its own analysis
+        result = detect(context, templates[0], target=image)
+
+        assert prepared_target_count == 0
+        assert given_prepared_targets == [False]
+
+    # the matcher is randomized, so both ways of preparing the target image are only expected to locate the template equally well
+    _check_alignment(shared_result, 1.5, (200, 150))
+    _check_alignment(result, 1.5, (200, 150))
+
+
+class _ProbeInterpretation(Interpretation):
+    """ Interprets a feature as its id and the mean of its pixels, and records the threads that have interpreted features. """
+
+    def __init__(self, config_dict, thread_names: set, /):
+        super().__init__("probe", config_dict)
+        self._thread_names = thread_names
+
+    def interpret(self, feature_img: np.ndarray, feature, /):
+        self._thread_names.add(threading.current_thread().name)
+        return feature.identifier, float(feature_img.mean())
+
+
+def test_interpret_features_threads(tmp_path):
+
+    template_path = copy_template(tmp_path, interpretation_method="probe")
+
+    thread_names = set()
+
+    with Context(backend=Backend.INLINE) as context:
+        context.register_interpretation("probe", lambda config_dict: _ProbeInterpretation(config_dict, thread_names))
+
+        image = Image(context, path=_TARGET_PATH)
+        result = detect(context, Template(context, path=template_path), target=image)
+        target = image.load()
+
+        # the same supervision result is interpreted both ways, so that the images of the features are identical
+        # noinspection PyProtectedMember
+        with get_internal_context().setup(afi=DummyFeedbackInterface(), context_key=context._context_key, **context._get_registries()):
+            template = load_template(template_path)
+            interpreted_feature_count = len([feature for feature in template.features if feature.get_feature_class() is not None])
+
+            sequential_result = interpret_features(template, result, target)
+            assert thread_names == {threading.current_thread().name}
+
+            threaded_result = interpret_features(template, result, target, max_threads=4)
+
+    assert any(thread_name.startswith("officialeye_interpretation") for thread_name in thread_names)
+
+    # noinspection PyProtectedMember
+    sequential_interpretations = list(sequential_result._feature_interpretation.items())
+
+    # noinspection PyProtectedMember
+    threaded_interpretations = list(threaded_result._feature_interpretation.items())
+
+    assert len(sequential_interpretations) == interpreted_feature_count
+    assert threaded_interpretations == sequential_interpretations
+
+    for feature_id, (interpreted_feature_id, _) in threaded_interpretations:
+        assert interpreted_feature_id == feature_id
+
+
+def _record_interpret_tasks(monkeypatch, /) -> list:
+    """ Records the paths to the templates whose features are interpreted by a separate task, rather than by the task that has found them. """
+
+    interpreted_template_paths = []
+
+    original_template_interpret = external_supervision_result.template_interpret
+
+    def _template_interpret(template_path, *args, **kwargs):
+        interpreted_template_paths.append(template_path)
+        return original_template_interpret(template_path, *args, **kwargs)
+
+    monkeypatch.setattr(external_supervision_result, "template_interpret", _template_interpret)
+
+    return interpreted_template_paths
+
+
+def test_detect_and_interpret(tmp_path, monkeypatch):
+
+    feature_path = str(tmp_path / "features" / "feature.png")
+    template_path = copy_template(tmp_path, interpretation_method="file", interpretation_config={"path": f'"{feature_path}"'})
+
+    interpreted_template_paths = _record_interpret_tasks(monkeypatch)
+
+    with Context(backend=Backend.INLINE) as context:
+        image = Image(context, path=_TARGET_PATH)
+
+        result, interpretation_result = detect_and_interpret(context, Template(context, path=template_path), target=image)
+
+        assert result.template.identifier == "driver_license_ru"
+        assert interpretation_result.template.identifier == "driver_license_ru"
+
+    # the features have been interpreted by the same task that has found the template
+    assert interpreted_template_paths == []
+    assert os.path.isfile(feature_path)
+
+
+def test_detect_and_interpret_multiple_templates(tmp_path, monkeypatch):
+
+    feature_path = str(tmp_path / "features" / "feature.png")
+    interpretation_config = {"path": f'"{feature_path}"'}
+
+    template_paths = [
+        copy_template(tmp_path, template_id=f"driver_license_ru_{i}", interpretation_method="file", interpretation_config=interpretation_config)
+        for i in range(2)
+    ]
+
+    interpreted_template_paths = _record_interpret_tasks(monkeypatch)
+
+    with Context(backend=Backend.INLINE) as context:
+        templates = [Template(context, path=template_path) for template_path in template_paths]
+        image = Image(context, path=_TARGET_PATH)
+
+        result, interpretation_result = detect_and_interpret(context, *templates, target=image)
+
+        assert interpretation_result.template.identifier == result.template.identifier
+
+        # the supervision result is still usable, after it has been passed to the task interpreting it
+        assert result.translate(np.array([0.0, 0.0])).shape == (2,)
+
+    # only the best of the results has been interpreted, by a separate task
+    assert interpreted_template_paths == [os.path.join(tmp_path, f"{result.template.identifier}.yml")]
+    assert os.path.isfile(feature_path)
+
+
+def test_detect_and_interpret_in_memory_images(tmp_path):
+
+    feature_path = str(tmp_path / "features" / "feature.png")
+    template_path = copy_template(tmp_path, interpretation_method="file", interpretation_config={"path": f'"{feature_path}"'})
+    target_path = _create_scaled_target(tmp_path, scale=1.5, offset=(200, 150))
+
+    with open(target_path, "rb") as fh:
+        target_bytes = fh.read()
+
+    with Context(backend=Backend.PROCESS) as context:
+        template = Template(context, path=template_path)
+
+        # the in-memory images have to be passed to the worker processes, instead of being loaded by them
+        images = [
+            Image(context, path=target_path),
+            Image.from_bytes(context, target_bytes),
+            Image.from_array(context, cv2.imread(target_path))
+        ]
+
+        # keys: feature ids
+        # values: the interpretations of the feature, of each of the images
+        feature_interpretations = {feature.identifier: [] for feature in template.features}
+
+        # the images of the last interpreted feature, of each of the images
+        feature_imgs = []
+
+        for image in images:
+            result, interpretation_result = detect_and_interpret(context, template, target=image)
+
+            assert result.template.identifier == "driver_license_ru"
+            assert interpretation_result.template.identifier == "driver_license_ru"
+            _check_alignment(result, 1.5, (200, 150))
+
+            for feature in interpretation_result.template.features:
+                feature_interpretations[feature.identifier].append(interpretation_result.get_feature_interpretation(feature))
+
+            feature_imgs.append(cv2.imread(feature_path))
+            os.remove(feature_path)
+
+    assert all(interpretations == [None] * len(images) for interpretations in feature_interpretations.values())
+
+    # the features have been extracted from equivalent images
+    assert all(feature_img is not None and feature_img.shape == feature_imgs[0].shape for feature_img in feature_imgs)
+
+
+def test_detect_async(tmp_path):
+
+    feature_path = str(tmp_path / "features" / "feature.png")
+    template_path = copy_template(tmp_path, interpretation_method="file", interpretation_config={"path": f'"{feature_path}"'})
+
+    async def _detect_async(context: Context, /):
+
+        template = Template(context, path=template_path)
+        image = Image(context, path=_TARGET_PATH)
+
+        result = await detect_async(context, template, target=image)
+        assert isinstance(result, ISupervisionResult)
+        assert result.template.identifier == "driver_license_ru"
+
+        result, interpretation_result = await detect_and_interpret_async(context, template, target=image)
+        assert result.template.identifier == "driver_license_ru"
+        assert interpretation_result.template.identifier == "driver_license_ru"
+
+        # the futures returned by the templates can be awaited as well
+        result = await template.detect_async(target=image)
+        assert result.template.identifier == "driver_license_ru"
+
+    with Context(backend=Backend.THREAD, max_workers=2) as context:
+        asyncio.run(_detect_async(context))
+
+    assert os.path.isfile(feature_path)
+
+
+def test_wait_async(tmp_path):
+
+    template_paths = [copy_template(tmp_path, template_id=f"driver_license_ru_{i}") for i in range(3)]
+
+    async def _wait_async(context: Context, /):
+
+        templates = [Template(context, path=template_path) for template_path in template_paths]
+        image = Image(context, path=_TARGET_PATH)
+
+        futures = [template.detect_async(target=image) for template in templates]
+
+        done, not_done = await wait_async(futures)
+
+        assert done == set(futures) and not_done == set()
+
+        assert sorted(future.result().template.identifier for future in futures) == [
+            "driver_license_ru_0", "driver_license_ru_1", "driver_license_ru_2"
+        ]
+
+        assert await wait_async([]) == (set(), set())
+
+    with Context(backend=Backend.THREAD, max_workers=2) as context:
+        asyncio.run(_wait_async(context))
+
+
+def test_detect_async_cancel(tmp_path, monkeypatch):
+
+    template_paths = [copy_template(tmp_path, template_id=f"driver_license_ru_{i}") for i in range(4)]
+
+    # ids of the templates whose analysis has been started
+    detected_template_ids = []
+
+    detection_started = threading.Event()
+    detection_released = threading.Event()
+
+    original_do_detect = InternalTemplate.do_detect
+
+    def _do_detect(self, *args, **kwargs):
+        detected_template_ids.append(self.identifier)
+
+        # keep the only worker busy until the awaiting task has been cancelled
+        detection_started.set()
+        assert detection_released.wait(timeout=30.0)
+
+        return original_do_detect(self, *args, **kwargs)
+
+    monkeypatch.setattr(InternalTemplate, "do_detect", _do_detect)
+
+    cancelled_futures = []
+
+    async def _detect_and_cancel(context: Context, /):
+
+        templates = [Template(context, path=template_path) for template_path in template_paths]
+
+        for template in templates:
+            template.load()
+
+        task = asyncio.create_task(detect_async(context, *templates, target=Image(context, path=_TARGET_PATH)))
+
+        await asyncio.get_running_loop().run_in_executor(None, detection_started.wait)
+
+        task.cancel()
+
+        try:
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        finally:
+            detection_released.set()
+
+    original_cancel = Future.cancel
+
+    def _cancel(self):
+        cancelled = original_cancel(self)
+        cancelled_futures.append(cancelled)
+        return cancelled
+
+    monkeypatch.setattr(Future, "cancel", _cancel)
+
+    with Context(backend=Backend.THREAD, max_workers=1) as context:
+        asyncio.run(_detect_and_cancel(context))
+
+    # the analysis that was running could not be cancelled, unlike the analyses still waiting for the worker, which never ran
+    assert len(detected_template_ids) == 1
+    assert sorted(cancelled_futures) == [False, True, True, True]
+
+
+def test_detect_shared_images(tmp_path):
+
+    template_path = copy_template(tmp_path)
+    target_path = _create_scaled_target(tmp_path, scale=1.5, offset=(200, 150))
+
+    results = []
+
+    for share_images in (False, True):
+        with Context(backend=Backend.PROCESS, max_workers=1, share_images=share_images) as context:
+            image = Image(context, path=target_path)
+            results.append(detect(context, Template(context, path=template_path), target=image))
+
+            # noinspection PyProtectedMember
+            assert len(context._shared_images) == int(share_images)
+
+    # the matcher is randomized, so both ways of passing the target image to the workers are only expected to locate the template equally well
+    for result in results:
+        assert result.template.identifier == "driver_license_ru"
+        _check_alignment(result, 1.5, (200, 150))
@@ -0,0 +1,76 @@
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+
+# noinspection PyProtectedMember
+from officialeye._internal.context.cancellation import CancellationToken
+
+
+def _wait_cancelled(token: CancellationToken, /) -> bool:
+
+    try:
+        deadline = time.monotonic() + 10.0
+
+        while time.monotonic() < deadline:
+            if token.is_cancelled():
+                return True
+            time.sleep(0.01)
+
+        return False
+    finally:
+        token.release()
+
+
+def test_token_copy():
+
+    token = CancellationToken()
+
+    try:
+        token_copy = pickle.loads(pickle.dumps(token))
+
+        assert not token.is_cancelled()
+        assert not token_copy.is_cancelled()
+
+        token.cancel()
+
+        assert token.is_cancelled()
+        assert token_copy.is_cancelled()
+
+        token_copy.release()
+    finally:
+        token.close()
+
+
+def test_token_worker_process():
+
+    # the worker process is only started once the tokens exist, so it inherits everything the tokens are made of
+    cancelled_token = CancellationToken()
+    closed_token = CancellationToken()
+
+    # let the worker process report the attached segments to the resource tracker of this process, as contexts do
+    resource_tracker.ensure_running()
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        cancelled_future = executor.submit(_wait_cancelled, cancelled_token)
+        closed_future = executor.submit(_wait_cancelled, closed_token)
+
+        cancelled_token.cancel()
+        assert cancelled_future.result()
+
+        # closing the token cancels the tasks too
+        closed_token.close()
+        assert closed_future.result()
+
+    cancelled_token.close()
+
+
+def test_token_closed_before_check():
+
+    token = CancellationToken()
+    token_copy = pickle.loads(pickle.dumps(token))
+
+    token.close()
+
+    assert token.is_cancelled()
+    assert token_copy.is_cancelled()
@@ -0,0 +1,108 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# noinspection PyProtectedMember
+from officialeye._internal.context import context as context_module
+
+# noinspection PyProtectedMember
+from officialeye._internal.context.singleton import get_internal_context
+
+# noinspection PyProtectedMember
+from officialeye._internal.feedback.dummy import DummyFeedbackInterface
+
+_REGISTRIES = {
+    "mutator_factories": {},
+    "matcher_factories": {},
+    "supervisor_factories": {},
+    "interpretation_factories": {}
+}
+
+
+def _get_task_state():
+    return get_internal_context().get_afi(), get_internal_context().get_interpretation_cache()
+
+
+class _Template:
+    """ Stand-in for a template, providing only what the template index cache needs. """
+
+    def __init__(self, identifier: str, /):
+        self.identifier = identifier
+
+
+def _fail():
+    raise RuntimeError("The bound function has failed.")
+
+
+def test_bind_task():
+
+    afi = DummyFeedbackInterface()
+
+    with get_internal_context().setup(afi=afi, interpretation_cache_size=4, **_REGISTRIES), ThreadPoolExecutor(max_workers=1) as executor:
+
+        interpretation_cache = get_internal_context().get_interpretation_cache()
+        assert interpretation_cache is not None
+
+        # other threads do not see the task by default
+        thread_afi, thread_interpretation_cache = executor.submit(_get_task_state).result()
+        assert thread_afi is not afi and thread_interpretation_cache is None
+
+        assert executor.submit(get_internal_context().bind_task(_get_task_state)).result() == (afi, interpretation_cache)
+
+        # once the bound function has returned, the thread gets its own state back, even if the function has failed
+        assert executor.submit(_get_task_state).result() == (thread_afi, None)
+
+        with pytest.raises(RuntimeError):
+            executor.submit(get_internal_context().bind_task(_fail)).result()
+
+        assert executor.submit(_get_task_state).result() == (thread_afi, None)
+
+        # the bound function may also be called by the thread running the task
+        assert get_internal_context().bind_task(_get_task_state)() == (afi, interpretation_cache)
+        assert _get_task_state() == (afi, interpretation_cache)
+
+
+def test_template_index_built_without_lock(monkeypatch):
+
+    # templates whose index should block while being built, until the corresponding event is set
+    blocking_events = {"a": threading.Event()}
+    build_started = threading.Event()
+
+    built_indices = []
+
+    class _TemplateIndex:
+
+        def __init__(self, templates, /):
+            built_indices.append(self)
+
+            for template in templates:
+                if template.identifier in blocking_events:
+                    build_started.set()
+                    assert blocking_events[template.identifier].wait(timeout=10)
+
+    monkeypatch.setattr(context_module, "TemplateIndex", _TemplateIndex)
+
+    with get_internal_context().setup(afi=DummyFeedbackInterface(), **_REGISTRIES), ThreadPoolExecutor(max_workers=2) as executor:
+
+        internal_context = get_internal_context()
+
+        first_future = executor.submit(internal_context.bind_task(internal_context.get_template_index), [_Template("a")])
+        assert build_started.wait(timeout=10)
+
+        # other indices can be retrieved while the first one is still being built
+        other_index = internal_context.get_template_index([_Template("b")])
+        assert internal_context.get_template_index([_Template("b")]) is other_index
+
+        # the same index can be built concurrently, in which case all the threads get the index built first
+        second_future = executor.submit(internal_context.bind_task(internal_context.get_template_index), [_Template("a")])
+
+        while len(built_indices) < 3:
+            time.sleep(0.01)
+
+        blocking_events["a"].set()
+
+        assert first_future.result() is second_future.result()
+        assert internal_context.get_template_index([_Template("a")]) is first_future.result()
+        assert len(built_indices) == 3
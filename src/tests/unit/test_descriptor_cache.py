@@ -0,0 +1,129 @@
+import os
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+from officialeye import Backend, Context, Image, Template
+
+# noinspection PyProtectedMember
+from officialeye._api_builtins.matcher.sift_flann import SiftFlannMatcher
+
+# noinspection PyProtectedMember
+from officialeye._internal.template.descriptor_cache import DescriptorCache, compute_cache_key
+from officialeye.detection import detect
+
+_TEMPLATE_DIR = "docs/assets/templates/driver_license_ru_01"
+_TARGET_PATH = "docs/assets/templates/driver_license_ru_01/examples/01.jpg"
+
+
+def _count_entries(cache_dir) -> int:
+    return sum(
+        1
+        for bucket in os.listdir(cache_dir)
+        for entry in os.listdir(os.path.join(cache_dir, bucket))
+        if not entry.startswith(".")
+    )
+
+
+def test_cache_key():
+
+    assert compute_cache_key("a", {"x": 1, "y": 2}) == compute_cache_key("a", {"y": 2, "x": 1})
+    assert compute_cache_key("a", {"x": 1}) != compute_cache_key("a", {"x": 2})
+    assert compute_cache_key("a", [1, 2]) != compute_cache_key("b", [1, 2])
+
+
+def test_store_load_round_trip(tmp_path):
+
+    cache = DescriptorCache(str(tmp_path))
+    key = compute_cache_key("round_trip")
+
+    points = np.arange(10, dtype=np.float32).reshape(-1, 2)
+    descriptors = np.ones((5, 128), dtype=np.float32)
+
+    assert cache.load(key, ("points", "descriptors")) is None
+
+    cache.store(key, {"points": points, "descriptors": descriptors})
+
+    loaded = cache.load(key, ("points", "descriptors"))
+
+    assert loaded is not None
+    assert np.array_equal(loaded["points"], points)
+    assert np.array_equal(loaded["descriptors"], descriptors)
+    assert not loaded["points"].flags.writeable
+
+    # storing the same entry again, as a concurrent process would, leaves the existing entry intact
+    cache.store(key, {"points": points[:1], "descriptors": descriptors[:1]})
+    assert np.array_equal(cache.load(key, ("points", "descriptors"))["points"], points)
+
+
+def test_partial_entries_ignored(tmp_path):
+
+    cache = DescriptorCache(str(tmp_path))
+    key = compute_cache_key("partial")
+
+    cache.store(key, {"points": np.zeros((3, 2), dtype=np.float32)})
+
+    # an entry lacking some of the requested arrays is treated as missing
+    assert cache.load(key, ("points", "descriptors")) is None
+
+    # a truncated array file is treated as missing too
+    other_key = compute_cache_key("truncated")
+    cache.store(other_key, {"points": np.zeros((100, 2), dtype=np.float32)})
+
+    points_path = os.path.join(tmp_path, other_key[:2], other_key, "points.npy")
+
+    with open(points_path, "r+b") as fh:
+        fh.truncate(os.path.getsize(points_path) // 2)
+
+    assert cache.load(other_key, ("points",)) is None
+
+
+def test_sift_flann_cache(tmp_path, monkeypatch):
+
+    template_dir = tmp_path / "template"
+    template_dir.mkdir()
+    cache_dir = tmp_path / "cache"
+
+    shutil.copy(os.path.join(_TEMPLATE_DIR, "driver_license_ru.jpg"), template_dir / "driver_license_ru.jpg")
+
+    with open(os.path.join(_TEMPLATE_DIR, "driver_license_ru.yml"), "r") as fh:
+        template_yml = fh.read().replace("engine: combinatorial", "engine: least_squares_regression")
+
+    template_path = template_dir / "driver_license_ru.yml"
+    template_path.write_text(template_yml)
+
+    def _detect():
+        with Context(backend=Backend.INLINE, descriptor_cache_path=str(cache_dir)) as context:
+            detect(context, Template(context, path=str(template_path)), target=Image(context, path=_TARGET_PATH))
+
+    _detect()
+
+    entry_count = _count_entries(cache_dir)
+    assert entry_count > 0
+
+    # every descriptor is now loaded from the cache instead of being computed
+    with monkeypatch.context() as patch:
+        def _compute_keypoint_features(*_args, **_kwargs):
+            pytest.fail("The descriptors should have been loaded from the cache.")
+
+        patch.setattr(SiftFlannMatcher, "_compute_keypoint_features", _compute_keypoint_features)
+        _detect()
+
+    assert _count_entries(cache_dir) == entry_count
+
+    # changing the configuration of the matcher invalidates the entries
+    template_path.write_text(template_yml.replace("sensitivity: 0.7", "sensitivity: 0.75"))
+    _detect()
+
+    assert _count_entries(cache_dir) == 2 * entry_count
+
+    # changing the source image invalidates the entries as well
+    source_image = cv2.imread(str(template_dir / "driver_license_ru.jpg"))
+    source_image[0, 0] = 255 - source_image[0, 0]
+    cv2.imwrite(str(template_dir / "driver_license_ru.png"), source_image)
+    template_path.write_text(template_yml.replace('source: "driver_license_ru.jpg"', 'source: "driver_license_ru.png"'))
+    _detect()
+
+    assert _count_entries(cache_dir) == 3 * entry_count
@@ -0,0 +1,67 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+
+import cv2
+import numpy as np
+import pytest
+
+# noinspection PyProtectedMember
+from officialeye._internal.image_transport import SharedImage, open_image
+from officialeye.error.errors.io import ErrIOInvalidImage
+
+
+def _create_image() -> np.ndarray:
+    return np.random.default_rng(0).integers(0, 256, size=(20, 30, 3), dtype=np.uint8)
+
+
+def _load_shared_image(shared_image: SharedImage, /) -> np.ndarray:
+    with open_image(shared_image) as img:
+        return img.copy()
+
+
+def test_open_image(tmp_path):
+
+    img = _create_image()
+
+    image_path = str(tmp_path / "image.png")
+    cv2.imwrite(image_path, img)
+
+    for source in (image_path, cv2.imencode(".png", img)[1].tobytes(), img):
+        with open_image(source) as opened_img:
+            assert np.array_equal(opened_img, img)
+
+    for source in (str(tmp_path / "missing.png"), b"not an image"):
+        with pytest.raises(ErrIOInvalidImage):
+            with open_image(source):
+                pass
+
+
+def test_shared_image():
+
+    img = _create_image()
+    shared_image = SharedImage(img)
+
+    try:
+        # the segment holds a copy of the image
+        img[:] = 0
+
+        with open_image(shared_image) as shared_img:
+            assert np.array_equal(shared_img, _create_image())
+            assert not shared_img.flags.writeable
+
+        # only the handle is pickled, and the copy attaches to the same segment
+        assert len(pickle.dumps(shared_image)) < img.nbytes
+        assert np.array_equal(_load_shared_image(pickle.loads(pickle.dumps(shared_image))), _create_image())
+
+        # let the worker process report the attached segment to the resource tracker of this process, as contexts do
+        resource_tracker.ensure_running()
+
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            assert np.array_equal(executor.submit(_load_shared_image, shared_image).result(), _create_image())
+    finally:
+        shared_image.unlink()
+
+    # the segment no longer exists once it has been unlinked
+    with pytest.raises(FileNotFoundError):
+        _load_shared_image(pickle.loads(pickle.dumps(shared_image)))
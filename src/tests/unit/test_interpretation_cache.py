@@ -0,0 +1,140 @@
+import threading
+
+import numpy as np
+import pytest
+
+from officialeye import IInterpretation
+
+# noinspection PyProtectedMember
+from officialeye._internal.context.singleton import get_internal_context
+
+# noinspection PyProtectedMember
+from officialeye._internal.feedback.dummy import DummyFeedbackInterface
+
+# noinspection PyProtectedMember
+from officialeye._internal.template.internal_feature import interpret_feature_images
+
+# noinspection PyProtectedMember
+from officialeye._internal.template.interpretation_cache import InterpretationCache, compute_interpretation_cache_key
+
+
+class _CountingInterpretation(IInterpretation):
+    """ Interprets an image as the sum of its pixels, and records the number of images it has interpreted. """
+
+    def __init__(self, cacheable: bool, /):
+        self._cacheable = cacheable
+        self.interpreted_count = 0
+
+    def is_cacheable(self) -> bool:
+        return self._cacheable
+
+    def interpret(self, feature_img: np.ndarray, feature, /):
+        self.interpreted_count += 1
+        return int(feature_img.sum())
+
+
+def _interpret_twice(interpretation: _CountingInterpretation, interpretation_key: str, /) -> list:
+
+    items = [(np.full((3, 3), value, dtype=np.uint8), None) for value in (1, 2, 1)]
+
+    results = []
+
+    with get_internal_context().setup(afi=DummyFeedbackInterface(), mutator_factories={}, matcher_factories={}, supervisor_factories={},
+                                      interpretation_factories={}, interpretation_cache_size=16):
+        for _ in range(2):
+            results.append(interpret_feature_images(interpretation, interpretation_key, items))
+
+    return results
+
+
+def test_cache_key():
+
+    img = np.zeros((4, 4), dtype=np.uint8)
+
+    key = compute_interpretation_cache_key("a", img)
+
+    assert compute_interpretation_cache_key("a", img.copy()) == key
+    assert compute_interpretation_cache_key("b", img) != key
+    assert compute_interpretation_cache_key("a", img.reshape(2, 8)) != key
+    assert compute_interpretation_cache_key("a", img.astype(np.uint16)) != key
+
+
+def test_lru_eviction():
+
+    cache = InterpretationCache(2, None)
+
+    cache.store("a", 1)
+    cache.store("b", 2)
+
+    # loading an entry makes it the most recently used one
+    assert cache.load("a") == (True, 1)
+
+    cache.store("c", 3)
+
+    assert cache.load("b") == (False, None)
+    assert cache.load("a") == (True, 1)
+    assert cache.load("c") == (True, 3)
+
+    # storing an entry again replaces it, and makes it the most recently used one
+    cache.store("a", 4)
+    cache.store("d", 5)
+
+    assert cache.load("c") == (False, None)
+    assert cache.load("a") == (True, 4)
+
+
+def test_sqlite_round_trip(tmp_path):
+
+    path = str(tmp_path / "cache" / "interpretations.sqlite3")
+
+    InterpretationCache(1, path).store("a", {"text": "A", "confidence": [0.5]})
+
+    # a separate cache, without an in-memory tier, finds the entry on disk
+    cache = InterpretationCache(0, path)
+
+    assert cache.load("a") == (True, {"text": "A", "confidence": [0.5]})
+    assert cache.load("b") == (False, None)
+
+    # the entries can be read by other threads too, each of which has its own connection
+    loaded = []
+    thread = threading.Thread(target=lambda: loaded.append(cache.load("a")))
+    thread.start()
+    thread.join()
+
+    assert loaded == [(True, {"text": "A", "confidence": [0.5]})]
+
+
+def test_unpicklable_value(tmp_path):
+
+    cache = InterpretationCache(1, str(tmp_path / "interpretations.sqlite3"))
+
+    value = threading.Lock()
+
+    with pytest.raises(TypeError):
+        cache.store("a", value)
+
+    # the entry is still kept in memory
+    assert cache.load("a") == (True, value)
+    assert InterpretationCache(0, str(tmp_path / "interpretations.sqlite3")).load("a") == (False, None)
+
+
+def test_interpret_cached():
+
+    interpretation = _CountingInterpretation(True)
+
+    results = _interpret_twice(interpretation, "cached")
+
+    assert results == [[9, 18, 9], [9, 18, 9]]
+
+    # the second call finds all the interpretations in the cache
+    assert interpretation.interpreted_count == 3
+
+
+def test_interpret_not_cacheable():
+
+    interpretation = _CountingInterpretation(False)
+
+    results = _interpret_twice(interpretation, "not_cacheable")
+
+    assert results == [[9, 18, 9], [9, 18, 9]]
+    assert interpretation.interpreted_count == 6
@@ -0,0 +1,104 @@
+import numpy as np
+
+# noinspection PyProtectedMember
+from officialeye._api_builtins.supervisor.least_squares_regression import LeastSquaresRegressionSupervisor, _get_statistics, _solve
+
+_TRANSFORMATION_MATRIX = np.array([[0.9, -0.2], [0.15, 1.1]])
+_OFFSET = np.array([40.0, -25.0])
+
+
+class _PackedMatchingResult:
+    """ Stand-in for a matching result, providing only what the supervisor needs. """
+
+    def __init__(self, template_points: np.ndarray, target_points: np.ndarray, /):
+        self._packed_points = template_points, target_points
+
+    def get_packed_points(self):
+        return self._packed_points
+
+
+def _solve_normal_equations(template_points: np.ndarray, target_points: np.ndarray, weights: np.ndarray, anchor: int, /) -> np.ndarray:
+    """ Solves the regression for a single anchor by setting up the weighted normal equations explicitly, one match at a time. """
+
+    matrix = np.zeros((2 * template_points.shape[0], 4), dtype=np.float64)
+    rhs = np.zeros(2 * template_points.shape[0], dtype=np.float64)
+
+    for i in range(template_points.shape[0]):
+        s = template_points[i] - template_points[anchor]
+        d = target_points[i] - target_points[anchor]
+
+        matrix[2 * i, 0:2] = s
+        matrix[2 * i + 1, 2:4] = s
+        rhs[2 * i:2 * i + 2] = d
+
+    row_weights = np.repeat(weights, 2)
+
+    x = np.linalg.solve(matrix.T @ (row_weights[:, np.newaxis] * matrix), matrix.T @ (row_weights * rhs))
+
+    return x.reshape(2, 2)
+
+
+def _generate_points(match_count: int, /, *, noise: float = 0.5, seed: int = 0):
+
+    rng = np.random.default_rng(seed)
+
+    template_points = rng.uniform(-500.0, 500.0, size=(match_count, 2))
+    target_points = template_points @ _TRANSFORMATION_MATRIX.T + _OFFSET + rng.normal(0.0, noise, size=(match_count, 2))
+
+    return template_points, target_points
+
+
+def test_solve():
+
+    template_points, target_points = _generate_points(50)
+
+    for weights in (np.ones(50), np.random.default_rng(1).uniform(0.1, 1.0, size=50)):
+        transformation_matrices = _solve(_get_statistics(template_points, target_points, weights), template_points, target_points)
+
+        for anchor in range(template_points.shape[0]):
+            expected = _solve_normal_equations(template_points, target_points, weights, anchor)
+            np.testing.assert_allclose(transformation_matrices[anchor], expected, rtol=0.0, atol=1e-14)
+
+
+def test_solve_per_anchor_weights():
+
+    template_points, target_points = _generate_points(20)
+
+    weights = np.random.default_rng(2).uniform(0.1, 1.0, size=(20, 20))
+    transformation_matrices = _solve(_get_statistics(template_points, target_points, weights), template_points, target_points)
+
+    for anchor in range(template_points.shape[0]):
+        expected = _solve_normal_equations(template_points, target_points, weights[anchor], anchor)
+        np.testing.assert_allclose(transformation_matrices[anchor], expected, rtol=0.0, atol=1e-14)
+
+
+def test_huber_outliers():
+
+    template_points, target_points = _generate_points(60)
+
+    # every fifth match is an outlier, pointing to an arbitrary location of the target image
+    outliers = np.arange(60) % 5 == 0
+    target_points[outliers] = np.random.default_rng(3).uniform(-500.0, 500.0, size=(int(outliers.sum()), 2))
+
+    supervisor = LeastSquaresRegressionSupervisor({"loss": "huber", "huber_threshold": 3.0, "max_iterations": 50})
+    results = list(supervisor.supervise(None, _PackedMatchingResult(template_points, target_points)))
+
+    assert len(results) == 60
+
+    for anchor in np.flatnonzero(~outliers):
+        result = results[anchor]
+
+        np.testing.assert_allclose(result.transformation_matrix, _TRANSFORMATION_MATRIX, atol=0.01)
+
+        # noinspection PyProtectedMember
+        match_weights = result._match_weight_array
+
+        assert np.all(match_weights[outliers] < 0.5)
+        assert np.all(match_weights[~outliers] > 0.5)
+        assert result.get_score() == match_weights.sum()
+
+    squared_supervisor = LeastSquaresRegressionSupervisor({})
+    squared_results = list(squared_supervisor.supervise(None, _PackedMatchingResult(template_points, target_points)))
+
+    # the squared loss is thrown off by the outliers
+    assert np.abs(squared_results[1].transformation_matrix - _TRANSFORMATION_MATRIX).max() > 0.05
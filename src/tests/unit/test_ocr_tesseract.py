@@ -0,0 +1,126 @@
+from typing import Dict, List
+
+import numpy as np
+
+# noinspection PyProtectedMember
+from officialeye._api_builtins.interpretation.ocr_tesseract import _MIN_TILE_SEPARATOR, _TESSERACT_WORD_LEVEL, _split_text, _tile_images
+
+
+def _image_to_data(entries: List[tuple], /) -> Dict[str, list]:
+    """
+    Builds the output of `image_to_data` listing the given entries.
+    Every entry consists of the level, the text, the top and the height of the entry, and the block, paragraph and line number.
+    """
+
+    data = {key: [] for key in ("level", "text", "top", "height", "block_num", "par_num", "line_num")}
+
+    for entry in entries:
+        for key, value in zip(data, entry, strict=True):
+            data[key].append(value)
+
+    return data
+
+
+def _word(text: str, top: int, height: int, line: tuple, /) -> tuple:
+    return (_TESSERACT_WORD_LEVEL, text, top, height, *line)
+
+
+def test_tile_images():
+
+    gray_img = np.full((30, 50), 10, dtype=np.uint8)
+
+    bgr_img = np.zeros((60, 20, 3), dtype=np.uint8)
+    bgr_img[:, :] = (1, 2, 3)
+
+    bgra_img = np.zeros((5, 80, 4), dtype=np.uint8)
+    bgra_img[:, :] = (4, 5, 6, 7)
+
+    canvas, boundaries = _tile_images([gray_img, bgr_img, bgra_img])
+
+    # the bands separating the images are as high as the highest image
+    separator = 60
+
+    assert canvas.dtype == np.uint8
+    assert canvas.shape == (30 + 60 + 5 + 4 * separator, 80 + 2 * separator, 3)
+
+    tops = [separator, 30 + 2 * separator, 90 + 3 * separator]
+
+    assert np.all(canvas[tops[0]:tops[0] + 30, separator:separator + 50] == 10)
+    assert np.all(canvas[tops[1]:tops[1] + 60, separator:separator + 20] == (1, 2, 3))
+    assert np.all(canvas[tops[2]:tops[2] + 5, separator:separator + 80] == (4, 5, 6))
+
+    # every boundary lies in the middle of the band below an image, which is left blank
+    assert boundaries == [tops[0] + 30 + separator // 2, tops[1] + 60 + separator // 2]
+
+    for boundary in boundaries:
+        assert np.all(canvas[boundary] == 0xff)
+
+    # the rest of the canvas is blank
+    assert np.count_nonzero(canvas != 0xff) == (30 * 50 + 60 * 20 + 5 * 80) * 3
+
+
+def test_tile_images_small():
+
+    canvas, boundaries = _tile_images([np.zeros((2, 3), dtype=np.uint8), np.zeros((4, 1), dtype=np.uint8)])
+
+    # the bands separating tiny images are not any thinner than the minimal separator
+    assert canvas.shape == (6 + 3 * _MIN_TILE_SEPARATOR, 3 + 2 * _MIN_TILE_SEPARATOR, 3)
+    assert boundaries == [_MIN_TILE_SEPARATOR + 2 + _MIN_TILE_SEPARATOR // 2]
+
+    # a single image needs no boundaries
+    canvas, boundaries = _tile_images([np.zeros((40, 10, 3), dtype=np.uint8)])
+
+    assert canvas.shape == (40 * 3, 10 + 40 * 2, 3)
+    assert boundaries == []
+
+
+def test_split_text():
+
+    data = _image_to_data([
+        # entries of levels other than words, spanning the whole canvas, are ignored
+        (1, "", 0, 500, 1, 0, 0),
+        (4, "", 10, 20, 1, 1, 1),
+        _word("first", 10, 20, (1, 1, 1)),
+        _word("line", 12, 18, (1, 1, 1)),
+        _word("second", 40, 20, (1, 1, 2)),
+        # empty words are ignored
+        _word(" ", 40, 20, (1, 1, 2)),
+        _word("line", 40, 20, (1, 1, 2)),
+        # a word whose center lies just above the boundary belongs to the image above it
+        _word("above", 90, 19, (2, 1, 1)),
+        # a word whose center lies exactly on the boundary belongs to the image below it
+        _word("below", 90, 20, (3, 1, 1)),
+        # a line that tesseract has merged across the boundary is split between the images
+        _word("third", 150, 20, (4, 1, 1)),
+        _word("image", 250, 20, (4, 1, 1)),
+        # the values may also be strings
+        (str(_TESSERACT_WORD_LEVEL), "string", "160", "20", "5", "1", "1"),
+    ])
+
+    assert _split_text(data, [100, 200, 300]) == [
+        "first line\nsecond line\nabove",
+        "below\nthird\nstring",
+        "image",
+        ""
+    ]
+
+
+def test_split_text_empty():
+
+    assert _split_text(_image_to_data([]), []) == [""]
+    assert _split_text(_image_to_data([_word("word", 0, 10, (1, 1, 1))]), []) == ["word"]
+
+
+def test_tile_and_split():
+
+    images = [np.zeros((h, 40), dtype=np.uint8) for h in (10, 30, 20)]
+
+    canvas, boundaries = _tile_images(images)
+
+    # a word covering every tiled image, as tesseract would find it
+    separator = 30
+    tops = [separator, 10 + 2 * separator, 40 + 3 * separator]
+
+    data = _image_to_data([_word(f"word{i}", top, img.shape[0], (i, 1, 1)) for i, (top, img) in enumerate(zip(tops, images, strict=True))])
+
+    assert _split_text(data, boundaries) == ["word0", "word1", "word2"]
@@ -0,0 +1,181 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from officialeye import Match
+
+# noinspection PyProtectedMember
+from officialeye._internal.template.shared_matching_result import SharedMatchingResult
+from officialeye.error.errors.matching import ErrMatchingMatchCountOutOfBounds
+
+
+class _Keypoint:
+    """ Stand-in for a keypoint, providing only what the matching result needs. """
+
+    def __init__(self, identifier: str, top_left: tuple, matches_min: int, matches_max: int, /):
+        self.identifier = identifier
+        self.top_left = np.array(top_left)
+        self.matches_min = matches_min
+        self.matches_max = matches_max
+
+
+class _Template:
+    """ Stand-in for a template, providing only what the matching result needs. """
+
+    def __init__(self, *keypoints: _Keypoint):
+        self.identifier = "template"
+        self.keypoints = keypoints
+
+    def get_keypoint(self, keypoint_id: str, /) -> _Keypoint:
+        return next(keypoint for keypoint in self.keypoints if keypoint.identifier == keypoint_id)
+
+
+class _MatchingResult(SharedMatchingResult):
+
+    def __init__(self, template: _Template, /):
+        super().__init__(template)
+        self._template = template
+
+    @property
+    def template(self):
+        return self._template
+
+
+def _create_matching_result(*, a_max: int = 10, b_min: int = 0) -> _MatchingResult:
+    return _MatchingResult(_Template(_Keypoint("a", (100, 200), 0, a_max), _Keypoint("b", (10, 20), b_min, 10), _Keypoint("c", (0, 0), 0, 10)))
+
+
+def _add_matches(matching_result: _MatchingResult, keypoint_id: str, first_score: int, count: int, /):
+    """ Adds matches whose keypoint points, target points and scores are derived from consecutive numbers, starting from the given one. """
+
+    values = np.arange(first_score, first_score + count)
+
+    matching_result.add_matches(keypoint_id, np.stack((values, values), axis=1), np.stack((values, -values), axis=1), values.astype(np.float64))
+
+
+def _describe(matches) -> list:
+    return [(match.keypoint.identifier, match.get_score()) for match in matches]
+
+
+def test_add_matches_order():
+
+    matching_result = _create_matching_result()
+
+    _add_matches(matching_result, "c", 1, 2)
+    _add_matches(matching_result, "a", 3, 2)
+    _add_matches(matching_result, "c", 5, 0)
+
+    keypoint_a = matching_result.template.get_keypoint("a")
+    matching_result.add_match(Match(matching_result.template, keypoint_a, keypoint_point=np.array([0, 0]), target_point=np.array([0, 0]), score=6.0))
+
+    _add_matches(matching_result, "c", 7, 1)
+
+    assert matching_result.get_total_match_count() == 6
+
+    # the matches are ordered by the keypoint, while the matches of every keypoint keep the order in which they have been added
+    assert _describe(matching_result.get_all_matches()) == [("a", 3.0), ("a", 4.0), ("a", 6.0), ("c", 1.0), ("c", 2.0), ("c", 7.0)]
+    assert np.array_equal(matching_result.get_match_scores(), [3.0, 4.0, 6.0, 1.0, 2.0, 7.0])
+
+    # matches added later on are merged into the matches created before
+    _add_matches(matching_result, "b", 8, 1)
+
+    assert _describe(matching_result.get_all_matches()) == [("a", 3.0), ("a", 4.0), ("a", 6.0), ("b", 8.0), ("c", 1.0), ("c", 2.0), ("c", 7.0)]
+
+
+def test_get_matches_for_keypoint():
+
+    matching_result = _create_matching_result()
+
+    _add_matches(matching_result, "c", 1, 2)
+    _add_matches(matching_result, "a", 3, 3)
+
+    for _ in range(2):
+        assert _describe(matching_result.get_matches_for_keypoint("a")) == [("a", 3.0), ("a", 4.0), ("a", 5.0)]
+        assert _describe(matching_result.get_matches_for_keypoint("b")) == []
+        assert _describe(matching_result.get_matches_for_keypoint("c")) == [("c", 1.0), ("c", 2.0)]
+
+        # once all the matches have been created, the matches of a keypoint are taken from them
+        all_matches = list(matching_result.get_all_matches())
+
+    assert all(match is created_match for match, created_match in zip(matching_result.get_matches_for_keypoint("c"), all_matches[3:], strict=True))
+
+    assert np.array_equal(all_matches[0].keypoint_point, [3, 3])
+    assert np.array_equal(all_matches[0].target_point, [3, -3])
+
+
+def test_validate_caps_matches():
+
+    matching_result = _create_matching_result(a_max=3)
+
+    matching_result.add_matches(
+        "a",
+        np.arange(10).reshape(5, 2),
+        np.arange(10, 20).reshape(5, 2),
+        np.array([0.5, 0.9, 0.1, 0.7, 0.9])
+    )
+    _add_matches(matching_result, "b", 1, 2)
+
+    matching_result.validate()
+
+    # the best matches are kept, ordered from the worst one to the best one, the tied ones by the order in which they have been added
+    assert _describe(matching_result.get_matches_for_keypoint("a")) == [("a", 0.7), ("a", 0.9), ("a", 0.9)]
+    assert [match.keypoint_point.tolist() for match in matching_result.get_matches_for_keypoint("a")] == [[6, 7], [2, 3], [8, 9]]
+
+    # the matches of the other keypoints are left untouched
+    assert _describe(matching_result.get_matches_for_keypoint("b")) == [("b", 1.0), ("b", 2.0)]
+    assert matching_result.get_total_match_count() == 5
+
+
+def test_validate_errors():
+
+    matching_result = _create_matching_result(b_min=1)
+    _add_matches(matching_result, "a", 1, 3)
+
+    with pytest.raises(ErrMatchingMatchCountOutOfBounds):
+        matching_result.validate()
+
+    matching_result = _create_matching_result()
+    _add_matches(matching_result, "a", 1, 2)
+
+    with pytest.raises(ErrMatchingMatchCountOutOfBounds):
+        matching_result.validate()
+
+
+def test_pickle_drops_derived_caches():
+
+    matching_result = _create_matching_result()
+
+    _add_matches(matching_result, "b", 1, 2)
+    _add_matches(matching_result, "a", 3, 1)
+
+    template_points, target_points = matching_result.get_packed_points()
+
+    # the points of the template are offset by the top-left corner of the keypoint
+    assert np.array_equal(template_points, [[103, 203], [11, 21], [12, 22]])
+    assert np.array_equal(target_points, [[3, -3], [1, -1], [2, -2]])
+
+    matches = list(matching_result.get_all_matches())
+
+    # the derived representations are not pickled, while the original matching result keeps them
+    state = matching_result.__getstate__()
+
+    assert state["_matches"] is None and state["_packed_points"] is None
+
+    # noinspection PyProtectedMember
+    assert all(match is created_match for match, created_match in zip(matching_result._matches, matches, strict=True))
+    # noinspection PyProtectedMember
+    assert matching_result._packed_points is not None
+
+    # the pending matches are merged before pickling
+    _add_matches(matching_result, "c", 4, 1)
+
+    state = matching_result.__getstate__()
+
+    assert state["_pending_columns"] == []
+    assert np.array_equal(state["_scores"], [3.0, 1.0, 2.0, 4.0])
+
+    matching_result_copy = pickle.loads(pickle.dumps(matching_result))
+
+    assert _describe(matching_result_copy.get_all_matches()) == _describe(matches) + [("c", 4.0)]
+    assert np.array_equal(matching_result_copy.get_packed_points()[0], np.concatenate((template_points, [[4, 4]])))
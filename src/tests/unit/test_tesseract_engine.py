@@ -0,0 +1,191 @@
+import os
+
+import numpy as np
+import pytest
+
+# noinspection PyProtectedMember
+from officialeye._api_builtins.interpretation.tesseract_engine import TesseractEnginePool, _parse_tesseract_config, _to_rgb
+from officialeye.error.errors.general import ErrGeneral, ErrOperationTimedOut
+
+# Stand-in for the tesserocr bindings, imported by the engine processes instead of the real ones.
+# The value of the first pixel of a grayscale image selects the behaviour of the engine, while the other images are echoed back.
+_FAKE_TESSEROCR = """
+import os
+import time
+
+
+class PyTessBaseAPI:
+
+    def __init__(self, lang="eng", path=None, psm=3, oem=3):
+        if lang == "broken":
+            raise RuntimeError("Failed to load the language models.")
+
+    def SetVariable(self, name, value):
+        return name == "user_defined_dpi"
+
+    def SetImageBytes(self, data, width, height, bytes_per_pixel, bytes_per_line):
+        assert len(data) == height * bytes_per_line
+        self._pixel = data[:bytes_per_pixel]
+
+    def GetUTF8Text(self):
+
+        if len(self._pixel) == 1 and self._pixel[0] == 1:
+            time.sleep(60)
+
+        # crash the first time, but not the second time
+        crash_marker = os.path.join(os.environ["FAKE_TESSEROCR_STATE"], "crashed")
+        if len(self._pixel) == 1 and self._pixel[0] == 2 and not os.path.exists(crash_marker):
+            open(crash_marker, "w").close()
+            os._exit(3)
+
+        if len(self._pixel) == 1 and self._pixel[0] == 3:
+            os._exit(3)
+
+        return f"{','.join(str(v) for v in self._pixel)} {os.getpid()}"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+"""
+
+
+@pytest.fixture()
+def fake_tesserocr(tmp_path, monkeypatch):
+
+    (tmp_path / "tesserocr.py").write_text(_FAKE_TESSEROCR)
+
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(path for path in (str(tmp_path), os.environ.get("PYTHONPATH")) if path))
+    monkeypatch.setenv("FAKE_TESSEROCR_STATE", str(tmp_path))
+
+
+def _command_image(command: int, /) -> np.ndarray:
+    return np.full((4, 4), command, dtype=np.uint8)
+
+
+def _recognize_pixel(pool: TesseractEnginePool, img: np.ndarray, /, *, timeout: float = 30.0):
+    """ Returns the value of the first pixel of the given image, as received by the engine, and the pid of the engine. """
+
+    text, = pool.recognize([img], timeout=timeout)
+    pixel, pid = text.split(" ")
+
+    return tuple(int(v) for v in pixel.split(",")), int(pid)
+
+
+def test_parse_tesseract_config():
+
+    assert _parse_tesseract_config("") == ({}, {})
+
+    assert _parse_tesseract_config("--psm 6 --oem 1 --tessdata-dir '/usr/share/tess data' --dpi 300 -c tessedit_char_whitelist=0123") == (
+        {"psm": 6, "oem": 1, "path": "/usr/share/tess data"},
+        {"user_defined_dpi": "300", "tessedit_char_whitelist": "0123"}
+    )
+
+    # a value may contain the separator
+    assert _parse_tesseract_config("-c name=a=b") == ({}, {"name": "a=b"})
+
+    for config in ("--psm", "--dpi", "-c", "-c tessedit_char_whitelist", "-l rus", "--psm six"):
+        with pytest.raises(ValueError):
+            _parse_tesseract_config(config)
+
+
+def test_to_rgb():
+
+    img = np.zeros((2, 3, 4), dtype=np.uint8)
+    img[:, :] = (10, 20, 30, 40)
+
+    assert np.array_equal(_to_rgb(img[:, :, :3])[0, 0], (30, 20, 10))
+    assert np.array_equal(_to_rgb(img)[0, 0], (30, 20, 10, 40))
+
+    # grayscale images are passed as they are
+    gray_img = img[:, :, 0]
+    assert _to_rgb(gray_img) is gray_img
+
+
+def test_pool_recognize(fake_tesserocr):
+
+    pool = TesseractEnginePool("eng", "--dpi 300", 1)
+
+    try:
+        bgr_img = np.zeros((4, 4, 3), dtype=np.uint8)
+        bgr_img[:, :] = (10, 20, 30)
+
+        # the engine receives the pixels in the RGB order
+        pixel, pid = _recognize_pixel(pool, bgr_img)
+        assert pixel == (30, 20, 10)
+
+        # the engine is kept alive, and serves the following requests too
+        pixel, next_pid = _recognize_pixel(pool, _command_image(7))
+        assert pixel == (7,)
+        assert next_pid == pid
+    finally:
+        pool.close()
+
+
+def test_pool_timeout(fake_tesserocr):
+
+    pool = TesseractEnginePool("eng", "", 1)
+
+    try:
+        _, pid = _recognize_pixel(pool, _command_image(0))
+
+        with pytest.raises(ErrOperationTimedOut):
+            pool.recognize([_command_image(1)], timeout=1.0)
+
+        # the engine that has timed out has been terminated, and a new one takes its place
+        _, next_pid = _recognize_pixel(pool, _command_image(0))
+        assert next_pid != pid
+    finally:
+        pool.close()
+
+
+def test_pool_crash(fake_tesserocr):
+
+    pool = TesseractEnginePool("eng", "", 1)
+
+    try:
+        _, pid = _recognize_pixel(pool, _command_image(0))
+
+        # the engine crashes while serving the request, which is then retried by a new engine
+        pixel, next_pid = _recognize_pixel(pool, _command_image(2))
+        assert pixel == (2,)
+        assert next_pid != pid
+
+        # an engine crashing again on retry is not retried any further
+        with pytest.raises(ErrGeneral):
+            pool.recognize([_command_image(3)], timeout=30.0)
+
+        _recognize_pixel(pool, _command_image(0))
+    finally:
+        pool.close()
+
+
+def test_pool_startup_error(fake_tesserocr):
+
+    pool = TesseractEnginePool("broken", "", 1)
+
+    try:
+        with pytest.raises(ErrGeneral):
+            pool.recognize([_command_image(0)], timeout=30.0)
+    finally:
+        pool.close()
+
+    with pytest.raises(ErrGeneral):
+        TesseractEnginePool("eng", "--unknown-option", 1).recognize([_command_image(0)], timeout=30.0)
+
+
+def test_pool_close(fake_tesserocr):
+
+    pool = TesseractEnginePool("eng", "", 2)
+
+    _recognize_pixel(pool, _command_image(0))
+
+    # noinspection PyProtectedMember
+    engines = list(pool._idle_engines)
+    assert len(engines) == 1
+
+    pool.close()
+
+    for engine in engines:
+        assert not engine.is_alive()
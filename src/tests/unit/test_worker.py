@@ -0,0 +1,81 @@
+from concurrent.futures import Future
+from typing import List, Tuple
+
+# noinspection PyProtectedMember
+from officialeye._internal.api.worker import worker_initialize
+
+# noinspection PyProtectedMember
+from officialeye._internal.context.singleton import get_internal_context
+
+# noinspection PyProtectedMember
+from officialeye._internal.feedback.abstract import AbstractFeedbackInterface
+
+# noinspection PyProtectedMember
+from officialeye._internal.feedback.verbosity import Verbosity
+
+_REGISTRIES = {
+    "mutator_factories": {},
+    "matcher_factories": {},
+    "supervisor_factories": {},
+    "interpretation_factories": {}
+}
+
+
+class _RecordingFeedbackInterface(AbstractFeedbackInterface):
+    """ Feedback interface recording the warnings reported to it. """
+
+    def __init__(self):
+        super().__init__(Verbosity.DEBUG_VERBOSE)
+        self.warnings: List[Tuple[Verbosity, str]] = []
+
+    def echo(self, *args, **kwargs) -> None:
+        pass
+
+    def info(self, verbosity: Verbosity, message: str, /) -> None:
+        pass
+
+    def warn(self, verbosity: Verbosity, message: str, /) -> None:
+        self.warnings.append((verbosity, message))
+
+    def error(self, verbosity: Verbosity, message: str, /) -> None:
+        pass
+
+    def update_status(self, new_status_text: str, /) -> None:
+        pass
+
+    def dispose(self, exception_type: any = None, exception_value: BaseException | None = None, traceback=None) -> None:
+        pass
+
+    def fork(self, description: str, /) -> AbstractFeedbackInterface:
+        raise NotImplementedError()
+
+    def join(self, child: AbstractFeedbackInterface, future: Future, /) -> None:
+        raise NotImplementedError()
+
+
+def test_worker_initialize_error(tmp_path):
+
+    missing_template_path = str(tmp_path / "missing.yml")
+
+    invalid_template_path = tmp_path / "invalid.yml"
+    invalid_template_path.write_text("id: [")
+
+    # the templates that cannot be loaded do not prevent the worker from starting
+    worker_initialize([missing_template_path, str(invalid_template_path)], install_registries=False, context_key="test", **_REGISTRIES)
+
+    afi = _RecordingFeedbackInterface()
+
+    # the problems are reported by the first task run by the worker, and only by that task
+    with get_internal_context().setup(afi=afi, context_key="test", **_REGISTRIES):
+        pass
+
+    assert len(afi.warnings) == 2
+    assert missing_template_path in afi.warnings[0][1]
+    assert str(invalid_template_path) in afi.warnings[1][1]
+
+    next_afi = _RecordingFeedbackInterface()
+
+    with get_internal_context().setup(afi=next_afi, context_key="test", **_REGISTRIES):
+        pass
+
+    assert next_afi.warnings == []